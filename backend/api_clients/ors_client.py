@@ -1,25 +1,164 @@
 import openrouteservice
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from services.cache_store import LRUCache, SQLiteStore, SingleFlight
+from services.gazetteer import Gazetteer, normalize_address
 
 load_dotenv()
 ORS_API_KEY = os.getenv("ORS_API_KEY")
-client = openrouteservice.Client(key=ORS_API_KEY)
+
+GEOCODE_CACHE_PATH = os.path.join("data", "geocode_cache.sqlite")
+GEOCODE_TTL = 30 * 24 * 3600
+NEGATIVE_GEOCODE_TTL = 24 * 3600
+# Результат довідника кешується ненадовго в пам'яті: ORS, коли відновиться, має пріоритет
+FALLBACK_TTL = 10 * 60
+REQUEST_TIMEOUT = 10
+# Лише локальний довідник вулиць, без запитів до ORS
+GEOCODER_OFFLINE = os.getenv("GEOCODER_OFFLINE", "") == "1"
+
+_client = None
+_client_lock = threading.Lock()
+_MISSING = object()
+
+
+# Клієнт ORS створюється при першому запиті (без ключа модуль імпортується, а ORS просто недоступний)
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = openrouteservice.Client(key=ORS_API_KEY, timeout=REQUEST_TIMEOUT,
+                                              retry_timeout=REQUEST_TIMEOUT)
+    return _client
+
+
+def _default_gazetteer():
+    from services.graph_registry import get_snapshot
+    return Gazetteer(get_snapshot())
+
+
+class Geocoder:
+    """
+    Кешоване геокодування адрес -> [lng, lat]:
+    - ключ — нормалізована адреса (регістр, скорочення «вул.», «пр-т», назва міста)
+    - LRU у пам'яті процесу перед постійним сховищем SQLite з TTL;
+      «не знайдено» кешується коротше, мережеві помилки не кешуються
+    - одночасні запити однієї адреси об'єднуються в один виклик ORS
+    - якщо ORS недоступний або нічого не знайшов — локальний довідник вулиць графа
+    - клієнт ORS і довідник можна передати явно (наприклад, заглушки в тестах)
+    """
+    def __init__(self, client=None, cache_path: str = GEOCODE_CACHE_PATH, gazetteer=_MISSING,
+                 offline: bool = GEOCODER_OFFLINE):
+        self._client = client
+        self.memory = LRUCache(maxsize=4096)
+        self.store = SQLiteStore(cache_path, "geocode", ttl=GEOCODE_TTL) if cache_path else None
+        self.flight = SingleFlight()
+        self.offline = offline
+        self._gazetteer = gazetteer
+        self._gazetteer_lock = threading.Lock()
+
+    @property
+    def client(self):
+        return self._client if self._client is not None else get_client()
+
+    @property
+    def gazetteer(self):
+        if self._gazetteer is _MISSING:
+            with self._gazetteer_lock:
+                if self._gazetteer is _MISSING:
+                    self._gazetteer = _default_gazetteer()
+                    print(f"Довідник вулиць: {len(self._gazetteer)} назв")
+        return self._gazetteer
+
+# Координати [lng, lat] або None
+    def geocode(self, address: str):
+        key = normalize_address(address)
+        if not key:
+            return None
+        value = self.memory.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        if self.store is not None:
+            value = self.store.get(key, _MISSING)
+            if value is not _MISSING:
+                self.memory.set(key, value, ttl=NEGATIVE_GEOCODE_TTL if value is None else GEOCODE_TTL)
+                return value
+        return self.flight.do(key, lambda: self._resolve(key, address))
+
+# Кілька адрес одночасно (порядок зберігається)
+    def geocode_many(self, addresses: list) -> list:
+        if len(addresses) <= 1:
+            return [self.geocode(a) for a in addresses]
+        with ThreadPoolExecutor(max_workers=min(len(addresses), 8)) as executor:
+            return list(executor.map(self.geocode, addresses))
+
+    def _resolve(self, key: str, address: str):
+        if not self.offline:
+            try:
+                coords = self._search(address)
+            except Exception as e:
+                print(f"Помилка геокодування: {e}")
+            else:
+                if coords is not None:
+                    self._store(key, coords, GEOCODE_TTL)
+                    return coords
+
+        # Локальний довідник: у постійне сховище не потрапляє
+        gazetteer = self.gazetteer
+        coords = gazetteer.lookup(address) if gazetteer is not None else None
+        if coords is not None:
+            self.memory.set(key, coords, ttl=FALLBACK_TTL)
+        elif not self.offline:
+            self._store(key, None, NEGATIVE_GEOCODE_TTL)
+        return coords
+
+    def _search(self, address: str):
+        result = self.client.pelias_search(text=address)
+        features = result.get("features") or []
+        if not features:
+            return None
+        return list(features[0]["geometry"]["coordinates"])
+
+    def _store(self, key: str, value, ttl: float) -> None:
+        self.memory.set(key, value, ttl=ttl)
+        if self.store is not None:
+            self.store.set(key, value, ttl=ttl)
+
+
+_geocoder = None
+_geocoder_lock = threading.Lock()
+
+
+def get_geocoder() -> Geocoder:
+    global _geocoder
+    with _geocoder_lock:
+        if _geocoder is None:
+            _geocoder = Geocoder()
+    return _geocoder
+
 
 # Повертає координати [lng, lat] для введеної адреси
 def geocode_address(address):
     try:
-        result = client.pelias_search(text=address)
-        coords = result['features'][0]['geometry']['coordinates']
-        return coords
+        return get_geocoder().geocode(address)
     except Exception as e:
         print(f"Помилка геокодування: {e}")
         return None
 
+
+# Координати для кількох адрес (запити виконуються паралельно)
+def geocode_addresses(addresses: list) -> list:
+    try:
+        return get_geocoder().geocode_many(addresses)
+    except Exception as e:
+        print(f"Помилка геокодування: {e}")
+        return [None] * len(addresses)
+
 # Повертає маршрут GeoJSON + відстань (км), час (год), сегменти маршруту
 def get_route_data(start_coords, end_coords):
     try:
-        response = client.directions(
+        response = get_client().directions(
             coordinates=[start_coords, end_coords],
             profile='driving-car',
             format='geojson',
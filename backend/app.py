@@ -1,11 +1,22 @@
-from flask import Flask, request, render_template
+import json
+import gzip
+import zlib
+import asyncio
+from datetime import datetime
+import numpy as np
+from flask import Flask, Response, jsonify, request, render_template, stream_with_context
 from dotenv import load_dotenv
-from services.routers.astar_fuel_router import AStarFuelRouter
+from services.routers.trip_planner import TripPlanner
+from services.graph_registry import get_spatial_index, get_snapshot
+from services.spatial_index import OutsideCoverageError
+from services.distance_matrix import DistanceMatrix
+from services.fuel_api import get_fuel_consumption, DEFAULT_CONSUMPTION
+from services.route_pipeline import RouteError, plan_route, route_between, DEFAULT_ALTERNATIVES, MAX_ALTERNATIVES
+from services.route_geometry import encode_polyline, path_coordinates
+from services.traffic_overlay import get_traffic_overlay
+from services.traffic_feed import start_traffic_feed
+from services.isochrone import Isochrone, MAX_THRESHOLDS, MIN_CELL_M, MAX_CELL_M, DEFAULT_CELL_M
 from services.routers.dijkstra_router import DijkstraFuelRouter
-from services.routers.ant_colony_router import AntColonyRouter
-from api_clients.ors_client import geocode_address
-from services.poi_service import get_pois_along_route
-from services.instruction_service import InstructionGenerator
 
 # Завантаження змінних середовища
 load_dotenv()
@@ -13,6 +24,25 @@ load_dotenv()
 # Ініціалізація Flask-додатку
 app = Flask(__name__)
 
+# Розмір матриці, починаючи з якого відповідь завжди передається потоком NDJSON
+MATRIX_STREAM_MIN_CELLS = 10_000
+MAX_MATRIX_CELLS = 1_000_000
+# Маршрут із такою кількістю точок у GeoJSON віддається потоком
+ROUTE_STREAM_MIN_POINTS = 5_000
+ROUTE_STREAM_CHUNK = 1_000
+# Менші відповіді не стискаються: gzip-заголовок не окупається
+GZIP_MIN_BYTES = 1_024
+GZIP_LEVEL = 6
+
+# Знімок графа (mmap) і просторовий індекс відкриваються один раз при старті процесу
+# і спільно використовуються всіма маршрутизаторами; граф NetworkX не будується.
+# Процеси пулів (ACO, матриця відстаней) імпортують цей модуль повторно як __mp_main__ —
+# там нічого не запускається
+if __name__ != "__mp_main__":
+    get_spatial_index()
+    start_traffic_feed()
+
+
 @app.route("/")
 def index():
     return render_template("index.html")
@@ -25,6 +55,8 @@ def result():
     car_brand_raw = request.form.get("car_brand")
     fuel_custom_raw = request.form.get("fuel_custom")
     metric = request.form.get("metric", "fuel_weight")
+    # Альтернативні маршрути — лише на запит (окремий, повільніший пошук)
+    alternatives = MAX_ALTERNATIVES if request.form.get("alternatives") else DEFAULT_ALTERNATIVES
 
     print(" Дані з форми:", dict(request.form))
 
@@ -47,103 +79,296 @@ def result():
     except ValueError:
         custom_rate = None
 
-    # Геокодування
-    start_coords = geocode_address(start_address)
-    end_coords = geocode_address(end_address)
-    print(" Старт:", start_coords)
-    print(" Кінець:", end_coords)
+    try:
+        payload = asyncio.run(plan_route(start_address, end_address, car_brand, car_model, car_year,
+                                         custom_rate, metric, alternatives))
+    except RouteError as e:
+        return render_template("error.html", message=str(e))
+
+    # Повернення у шаблон
+    return render_template("result.html", **payload)
+
+
+# Прив'язка точок {"lat": .., "lon": ..} до вузлів графа
+def _snap_points(points) -> list:
+    if not isinstance(points, list) or not points:
+        raise ValueError("Очікується непорожній список точок {lat, lon}")
+    index = get_spatial_index()
+    return [index.nearest_node(float(p["lon"]), float(p["lat"])) for p in points]
+
+
+# Витрата пального із запиту: явна, за авто або середня
+def _request_consumption(data: dict) -> float:
+    if data.get("consumption") is not None:
+        return float(data["consumption"])
+    if data.get("car_brand"):
+        return get_fuel_consumption(data["car_brand"], data.get("car_model", ""), int(data.get("car_year") or 0))
+    return DEFAULT_CONSUMPTION
+
+
+def _json_value(value: float):
+    return value if value != float('inf') else None
+
+
+@app.route("/api/matrix", methods=["POST"])
+def api_matrix():
+    """
+    Матриця відстаней: {"sources": [{lat, lon}, ...], "targets": [...] (за замовчуванням = sources),
+    "metric": "fuel_weight", "consumption": 8.0 | "car_brand"/"car_model"/"car_year", "stream": false}.
+    Недосяжні пари — null. Великі матриці (або stream=true) віддаються як NDJSON:
+    перший рядок — заголовок, далі по рядку {"row": i, "values": [...]} на кожен старт.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        sources = _snap_points(data.get("sources"))
+        targets = _snap_points(data["targets"]) if data.get("targets") is not None else sources
+        matrix = DistanceMatrix(data.get("metric", "fuel_weight"), _request_consumption(data))
+    except OutsideCoverageError as e:
+        return jsonify({"error": str(e)}), 400
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"error": f"Некоректний запит: {e}"}), 400
+
+    cells = len(sources) * len(targets)
+    if cells > MAX_MATRIX_CELLS:
+        return jsonify({"error": f"Завелика матриця: {cells} > {MAX_MATRIX_CELLS} клітинок"}), 413
+
+    osmids = get_snapshot().node_osmid
+    header = {
+        "metric": matrix.metric,
+        "units": matrix.units,
+        "consumption": matrix.avg_consumption,
+        "sources": [int(osmids[n]) for n in sources],
+        "targets": [int(osmids[n]) for n in targets],
+    }
+    rows = matrix.rows(sources, targets)
+
+    if data.get("stream") or cells >= MATRIX_STREAM_MIN_CELLS:
+        def generate():
+            yield json.dumps(header) + "\n"
+            for i, row in enumerate(rows):
+                yield json.dumps({"row": i, "values": [_json_value(v) for v in row]}) + "\n"
+        return _stream_response(generate(), "application/x-ndjson")
+
+    header["matrix"] = [[_json_value(v) for v in row] for row in rows]
+    return _json_response(header)
+
+def _accepts_gzip() -> bool:
+    return "gzip" in request.headers.get("Accept-Encoding", "").lower()
 
-    # Алгоритми в залежності від обраної метрики
-    if metric == "poi_score":
-        algorithms = [("ant_colony", AntColonyRouter(car_brand, car_model, car_year))]
+
+# JSON-відповідь, стиснута gzip, якщо клієнт це підтримує
+def _json_response(body: dict, status: int = 200) -> Response:
+    data = json.dumps(body, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    response = Response(data, status=status, mimetype="application/json")
+    response.vary.add("Accept-Encoding")
+    if _accepts_gzip() and len(data) >= GZIP_MIN_BYTES:
+        response.set_data(gzip.compress(data, compresslevel=GZIP_LEVEL))
+        response.headers["Content-Encoding"] = "gzip"
+    return response
+
+
+# Потокова відповідь: частини стискаються на льоту одним gzip-потоком
+def _stream_response(chunks, mimetype: str) -> Response:
+    if not _accepts_gzip():
+        response = Response(stream_with_context(chunks), mimetype=mimetype)
     else:
-        algorithms = [
-            ("a_star", AStarFuelRouter(car_brand, car_model, car_year)),
-            ("djikstra", DijkstraFuelRouter(car_brand, car_model, car_year)),
-        ]
+        def compressed():
+            compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            for chunk in chunks:
+                data = compressor.compress(chunk.encode("utf-8"))
+                if data:
+                    yield data
+            yield compressor.flush()
+        response = Response(stream_with_context(compressed()), mimetype=mimetype)
+        response.headers["Content-Encoding"] = "gzip"
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+def _point(p) -> tuple:
+    return float(p["lat"]), float(p["lon"])
 
 
-    results = []
+@app.route("/api/trip", methods=["POST"])
+def api_trip():
+    """
+    Поїздка через кілька зупинок: {"start": {lat, lon}, "end": {lat, lon} (за замовчуванням = start),
+    "waypoints": [{lat, lon, name?}, ...], "metric": "fuel_weight", "consumption" | "car_brand"/...}.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        start = _point(data["start"])
+        end = _point(data["end"]) if data.get("end") is not None else start
+        waypoints = data.get("waypoints") or []
+        points = [_point(p) for p in waypoints]
+        planner = TripPlanner(data.get("car_brand", ""), data.get("car_model", ""), int(data.get("car_year") or 0))
+        if data.get("consumption") is not None:
+            planner.avg_consumption = float(data["consumption"])
+            planner.update_weights()
+        trip = planner.plan(start, end, points, weight_type=data.get("metric", "fuel_weight"))
+    except OutsideCoverageError as e:
+        return jsonify({"error": str(e)}), 400
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"error": f"Некоректний запит: {e}"}), 400
+
+    if trip is None:
+        return jsonify({"error": "Деякі зупинки недосяжні"}), 404
+
+    coords = path_coordinates(planner.snapshot, trip["nodes"], full=False)
+    return jsonify({
+        "order": trip["order"],
+        "waypoints": [waypoints[i] for i in trip["order"]],
+        "legs": trip["legs"],
+        "distance_km": round(trip["distance_km"], 3),
+        "fuel": round(trip["fuel"], 3),
+        "duration_min": round(trip["duration_min"], 1),
+        "geojson": {"type": "LineString", "coordinates": coords.tolist()},
+    })
 
-    for name, router in algorithms:
-        if custom_rate is not None:
-            router.avg_consumption = custom_rate
-            if hasattr(router, "update_weights"):
-                router.update_weights()
+# Геометрія маршруту у форматі запиту: GeoJSON LineString або encoded polyline
+def _geometry(coords, fmt: str):
+    if fmt == "polyline":
+        return encode_polyline(coords, 5)
+    if fmt == "polyline6":
+        return encode_polyline(coords, 6)
+    return {"type": "LineString", "coordinates": coords.tolist()}
 
 
+# Координати маршруту (n, 2): повна геометрія ребер зі знімка або вузли (як у шаблоні);
+# edges — ребра, обрані пошуком (у старих записах кешу їх немає)
+def _route_coords(nodes, fallback, full: bool, edges=None) -> np.ndarray:
+    if full and nodes:
         try:
-            if name == "ant_colony":
-                route_nodes, distance_km, fuel, duration_hr = router.find_route(
-                    start_coords[1], start_coords[0],
-                    end_coords[1], end_coords[0]
-                )
-            else:
-                route_nodes, distance_km, fuel, duration_hr = router.find_route(
-                    start_coords[1], start_coords[0],
-                    end_coords[1], end_coords[0],
-                    weight_type=metric
-                )
-
-            if route_nodes:
-                coords = [(router.G.nodes[n]['y'], router.G.nodes[n]['x']) for n in route_nodes]
-                line_coords = [[lon, lat] for lat, lon in coords]
-
-                pois = get_pois_along_route(line_coords)
-                poi_count = len(pois)
-
-                print(f" {name}: dist={distance_km:.2f} km, fuel={fuel:.2f} L, time={duration_hr:.2f} h, pois={poi_count} ")
-
-                results.append({
-                    "name": name,
-                    "router": router,
-                    "route_nodes": route_nodes,
-                    "distance_km": distance_km,
-                    "fuel": fuel,
-                    "duration_hr": duration_hr,
-                    "poi_count": poi_count,
-                    "pois": pois,
-                    "geojson": {
-                        "type": "FeatureCollection",
-                        "features": [{"type": "Feature", "geometry": {
-                            "type": "LineString", "coordinates": line_coords
-                        }}]
-                    }
-                })
-        except Exception as e:
-            return render_template("error.html", message="Система не змогла побудувати маршрут. Некоректний ввод даних.")
-
-    # Вибір найкращого маршруту
-    if not results:
-        return render_template("error.html", message="Маршрут не знайдено жодним з алгоритмів.")
-
-    if metric == "fuel_weight":
-        best = min(results, key=lambda r: r["fuel"])
-    elif metric == "duration":
-        best = min(results, key=lambda r: r["duration_hr"])
-    elif metric == "poi":
-        best = max(results, key=lambda r: r["poi_count"])
-    else:
-        best = results[0]
+            return path_coordinates(get_snapshot(), nodes, full=True, edges=edges)
+        except (KeyError, ValueError) as e:
+            print(f" Геометрія ребер недоступна: {e}")
+    return np.asarray(fallback, dtype=np.float64).reshape(-1, 2)
 
-    print(f" Обрано: {best['name']}")
 
-    # Генерація інструкцій
-    steps = InstructionGenerator.generate(best["router"].G, best["route_nodes"])
+@app.route("/api/route", methods=["POST"])
+def api_route():
+    """
+    Маршрут між двома точками: {"start": {lat, lon}, "end": {lat, lon}, "metric": "fuel_weight",
+    "consumption" | "car_brand"/"car_model"/"car_year",
+    "geometry": "geojson" | "polyline" | "polyline6", "full_geometry": true, "stream": false,
+    "departure": "2026-05-18T08:30" (ISO 8601; для duration_weight — з урахуванням годин пік),
+    "alternatives": 1 (скільки маршрутів повернути, до MAX_ALTERNATIVES; понад 1 — з альтернативами)}.
+    full_geometry — повна геометрія доріг між перехрестями (інакше лише вузли графа).
+    Довгі маршрути у GeoJSON віддаються потоком; відповідь стискається gzip за Accept-Encoding.
+    """
+    data = request.get_json(silent=True) or {}
+    fmt = data.get("geometry", "geojson")
+    if fmt not in ("geojson", "polyline", "polyline6"):
+        return jsonify({"error": f"Невідомий формат геометрії: {fmt}"}), 400
+    try:
+        start_lat, start_lon = _point(data["start"])
+        end_lat, end_lon = _point(data["end"])
+        car_brand, car_model = data.get("car_brand", ""), data.get("car_model", "")
+        car_year = int(data.get("car_year") or 0)
+        custom_rate = float(data["consumption"]) if data.get("consumption") is not None else None
+        departure = datetime.fromisoformat(data["departure"]) if data.get("departure") else None
+        alternatives = int(data.get("alternatives", DEFAULT_ALTERNATIVES))
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"error": f"Некоректний запит: {e}"}), 400
 
-    # Повернення у шаблон
-    return render_template(
-        "result.html",
-        geojson=best["geojson"],
-        distance=round(best["distance_km"], 2),
-        duration=round(best["duration_hr"], 0),
-        fuel=round(best["fuel"], 2),
-        poi_count=best["poi_count"],
-        steps=steps,
-        route_type=best["name"],
-        pois=best.get("pois", []) if best["name"] == "ant_colony" else []
-
-    )
+    try:
+        payload = asyncio.run(route_between([start_lon, start_lat], [end_lon, end_lat], car_brand, car_model,
+                                            car_year, custom_rate, data.get("metric", "fuel_weight"),
+                                            departure=departure, alternatives=alternatives))
+    except RouteError as e:
+        return jsonify({"error": str(e)}), 422
+
+    full = bool(data.get("full_geometry", True))
+    coords = _route_coords(payload.get("nodes"), payload["geojson"]["features"][0]["geometry"]["coordinates"], full,
+                           payload.get("edges"))
+    body = {
+        "route_type": payload["route_type"],
+        "distance_km": payload["distance"],
+        "duration_min": payload["duration"],
+        "fuel": payload["fuel"],
+        "poi_count": payload["poi_count"],
+        "pois": payload["pois"],
+        "instructions": payload["steps"],
+        "alternatives": [
+            {
+                "distance_km": alt["distance"],
+                "duration_min": alt["duration"],
+                "fuel": alt["fuel"],
+                "geometry": _geometry(_route_coords(alt.get("nodes"), alt["coordinates"], full, alt.get("edges")), fmt),
+            }
+            for alt in payload["alternatives"]
+        ],
+    }
+
+    if fmt == "geojson" and (data.get("stream") or len(coords) >= ROUTE_STREAM_MIN_POINTS):
+        # Усе, крім координат, серіалізується одразу; координати — частинами
+        def generate():
+            yield json.dumps(body, ensure_ascii=False)[:-1] + ', "geometry": {"type": "LineString", "coordinates": ['
+            for i in range(0, len(coords), ROUTE_STREAM_CHUNK):
+                chunk = json.dumps(coords[i:i + ROUTE_STREAM_CHUNK].tolist())[1:-1]
+                yield ("," if i else "") + chunk
+            yield "]}}"
+        return _stream_response(generate(), "application/json")
+
+    body["geometry"] = _geometry(coords, fmt)
+    return _json_response(body)
+
+@app.route("/api/traffic", methods=["GET", "POST", "DELETE"])
+def api_traffic():
+    """
+    Затори й перекриття. POST {"updates": [{"edge": 123 | "from"/"to": osmid,
+    "factor": 2.5 | "closed": true | "clear": true, "ttl": 600 | "expires_at": unix-час}, ...]}
+    застосовує пакет однією версією; GET — стан оверлею; DELETE — зняти всі обмеження.
+    """
+    overlay = get_traffic_overlay()
+    if request.method == "DELETE":
+        overlay.clear()
+    elif request.method == "POST":
+        data = request.get_json(silent=True)
+        updates = data.get("updates") if isinstance(data, dict) else data
+        if not isinstance(updates, list):
+            return jsonify({"error": "Очікується список оновлень updates"}), 400
+        result = overlay.apply(updates)
+        return jsonify(result), 200 if result["applied"] or not updates else 400
+    return jsonify(overlay.status())
+
+@app.route("/api/isochrone", methods=["POST"])
+def api_isochrone():
+    """
+    Зони досяжності: {"origin": {lat, lon}, "metric": "duration_weight",
+    "thresholds": [300, 600, 900] (в одиницях метрики: с, л, м), "consumption" | "car_brand"/...,
+    "cell_m": 100, "nodes": false}. Відповідь — GeoJSON FeatureCollection, по полігону на поріг.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        lat, lon = _point(data["origin"])
+        thresholds = [float(t) for t in data["thresholds"]]
+        if not 0 < len(thresholds) <= MAX_THRESHOLDS or min(thresholds) <= 0:
+            raise ValueError(f"потрібно від 1 до {MAX_THRESHOLDS} додатних порогів")
+        cell_m = min(max(float(data.get("cell_m", DEFAULT_CELL_M)), MIN_CELL_M), MAX_CELL_M)
+        router = DijkstraFuelRouter(data.get("car_brand", ""), data.get("car_model", ""),
+                                    int(data.get("car_year") or 0))
+        if data.get("consumption") is not None:
+            router.avg_consumption = float(data["consumption"])
+            router.update_weights()
+        isochrone = Isochrone(router, data.get("metric", "duration_weight"))
+        origin = router._nearest_index(lat, lon)
+    except OutsideCoverageError as e:
+        return jsonify({"error": str(e)}), 400
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"error": f"Некоректний запит: {e}"}), 400
+
+    results = isochrone.compute(origin, thresholds, cell_m, with_nodes=bool(data.get("nodes")))
+    features = []
+    for result in reversed(results):
+        properties = {key: value for key, value in result.items() if key != "polygon"}
+        properties.update({"metric": isochrone.metric, "units": isochrone.units})
+        features.append({"type": "Feature", "geometry": result["polygon"], "properties": properties})
+    return _json_response({
+        "type": "FeatureCollection",
+        "origin": int(get_snapshot().node_osmid[origin]),
+        "features": features,
+    })
 
 if __name__ == "__main__":
     app.run(debug=True)
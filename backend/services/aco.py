@@ -0,0 +1,342 @@
+import os
+import atexit
+import random
+import threading
+import numpy as np
+from multiprocessing import shared_memory
+from services.process_pool import get_context
+
+# Обмеження довжини шляху однієї мурахи (кроків)
+MAX_STEPS = 400
+# Вузол можна відвідати не більше стільки разів
+MAX_VISITS = 2
+
+# Кількість процесів для мурах; 0 або 1 — усі мурахи в поточному процесі
+ACO_WORKERS = int(os.getenv("ACO_WORKERS", str(min(os.cpu_count() or 1, 4))))
+# Мурахи ітерації діляться на партії фіксованого розміру: розбиття (і зерна RNG)
+# не залежать від кількості процесів
+ANTS_PER_BATCH = 4
+# Пул потрібен, лише якщо робота ітерації (мурахи × ребра графа чи коридору) не менша:
+# кожен воркер на ітерацію копіює феромони і будує таблицю переходів за всіма ребрами,
+# а довжина прогулянок росте разом із коридором — для малих запитів передача задач
+# дорожча за самі прогулянки (24 мурахи — коридор від ~8 тис. ребер)
+PARALLEL_MIN_WORK = 200_000
+
+# Коридор: ребра, що дають шлях не довший за DETOUR_RATIO × найкоротший
+DETOUR_RATIO = 1.4
+# Ліміт кроків мурахи в коридорі — пропорційно довжині базового шляху (у ребрах)
+STEPS_PER_BASE_EDGE = 10
+
+# Нижче цього масштабу феромони перенормовуються, щоб уникнути втрати точності
+_MIN_SCALE = 1e-100
+
+
+def walk_ants(offsets: list, targets: list, table: list, source: int, target: int, n_ants: int,
+              rng: random.Random, max_steps: int = MAX_STEPS, backtrack: bool = False) -> list:
+    """
+    Прогулянки n_ants мурах від source до target. Ймовірність переходу ребром e
+    пропорційна table[e] = tau[e] ** alpha * eta[e]. Повертає список шляхів (списки ребер)
+    лише для мурах, які дійшли до цілі; петлі з шляху вирізаються.
+    З backtrack=True мураха в глухому куті повертається на крок назад
+    (кожне повернення теж рахується як крок), а не завершує прогулянку.
+    """
+    paths = []
+    rand = rng.random
+    for _ in range(n_ants):
+        visits = {source: 1}
+        path = []
+        current = source
+        steps = 0
+        while current != target and steps < max_steps:
+            candidates = []
+            total = 0.0
+            for e in range(offsets[current], offsets[current + 1]):
+                w = table[e]
+                if w > 0.0 and visits.get(targets[e], 0) < MAX_VISITS:
+                    candidates.append(e)
+                    total += w
+            if not candidates:
+                if not backtrack or not path:
+                    break
+                visits[current] = MAX_VISITS
+                path.pop()
+                current = targets[path[-1]] if path else source
+                steps += 1
+                continue
+
+            # Рулетка без нормалізації ймовірностей
+            threshold = rand() * total
+            chosen = candidates[-1]
+            for e in candidates:
+                threshold -= table[e]
+                if threshold <= 0.0:
+                    chosen = e
+                    break
+
+            path.append(chosen)
+            current = targets[chosen]
+            visits[current] = visits.get(current, 0) + 1
+            steps += 1
+
+        if current == target:
+            paths.append(_erase_loops(path, targets, source))
+    return paths
+
+
+def _erase_loops(path: list, targets: list, source: int) -> list:
+    position = {source: 0}
+    result = []
+    for e in path:
+        v = targets[e]
+        if v in position:
+            del result[position[v]:]
+            position = {n: i for n, i in position.items() if i <= position[v]}
+        else:
+            result.append(e)
+            position[v] = len(result)
+    return result
+
+
+# --- Процеси-воркери -------------------------------------------------------
+
+_pool = None
+_pool_lock = threading.Lock()
+_worker_cache = {}
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = get_context().Pool(ACO_WORKERS)
+            atexit.register(_pool.terminate)
+    return _pool
+
+
+# Копія масиву зі спільної пам'яті (сегмент одразу закривається)
+def _read_shared(name: str, dtype, size: int) -> np.ndarray:
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        return np.ndarray((size,), dtype=dtype, buffer=shm.buf).copy()
+    finally:
+        shm.close()
+
+
+def _worker_batch(task):
+    query, iteration, graph, tau_name, alpha, source, target, n_ants, seed, max_steps, backtrack = task
+    cached = _worker_cache.get("query")
+    if cached is None or cached[0] != query:
+        # CSR і евристика незмінні протягом запиту — читаються один раз
+        (off_name, num_nodes), (tgt_name, num_edges), eta_name = graph
+        offsets = _read_shared(off_name, np.int64, num_nodes + 1).tolist()
+        targets = _read_shared(tgt_name, np.int64, num_edges).tolist()
+        eta = _read_shared(eta_name, np.float64, num_edges)
+        cached = (query, offsets, targets, eta)
+        _worker_cache["query"] = cached
+    _, offsets, targets, eta = cached
+
+    # Таблиця переходів — одна на ітерацію для всіх партій, що дісталися цьому воркеру
+    table = _worker_cache.get("table")
+    if table is None or table[0] != (query, iteration):
+        tau = _read_shared(tau_name, np.float64, len(eta))
+        table = ((query, iteration), transition_table(tau, eta, alpha))
+        _worker_cache["table"] = table
+    table = table[1]
+    return walk_ants(offsets, targets, table, source, target, n_ants, random.Random(seed), max_steps, backtrack)
+
+
+def transition_table(tau: np.ndarray, eta: np.ndarray, alpha: float) -> list:
+    if alpha == 1.0:
+        return (tau * eta).tolist()
+    return (np.power(tau, alpha) * eta).tolist()
+
+
+class _SharedArrays:
+    """Масиви запиту в спільній пам'яті для воркерів; звільняються після запиту."""
+    def __init__(self):
+        self._blocks = []
+
+    def put(self, values: np.ndarray) -> str:
+        shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+        self._blocks.append(shm)
+        self.write(shm.name, values)
+        return shm.name
+
+    def write(self, name: str, values: np.ndarray) -> None:
+        shm = next(b for b in self._blocks if b.name == name)
+        np.ndarray(values.shape, dtype=values.dtype, buffer=shm.buf)[:] = values
+
+    def close(self) -> None:
+        for shm in self._blocks:
+            shm.close()
+            shm.unlink()
+        self._blocks = []
+
+
+class AntColony:
+    """
+    Мурашиний алгоритм на масивах CSR:
+    - феромони — масив за номером ребра; випаровування ліниве: зберігаються «сирі» значення
+      і глобальний множник, який скорочується у ймовірностях переходу
+    - статична привабливість ребра eta[e] обчислюється один раз на запит
+    - мурахи однієї ітерації розподіляються між процесами; кожна партія має
+      власне зерно RNG, тож результат відтворюваний незалежно від кількості процесів
+    """
+    def __init__(self, offsets: np.ndarray, targets: np.ndarray, cost: np.ndarray, eta: np.ndarray,
+                 alpha: float = 1.0, evaporation: float = 0.5, workers: int = ACO_WORKERS,
+                 max_steps: int = MAX_STEPS, backtrack: bool = False):
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.targets = np.asarray(targets, dtype=np.int64)
+        self.cost = np.asarray(cost, dtype=np.float64)
+        self.eta = np.asarray(eta, dtype=np.float64)
+        self.alpha = alpha
+        self.evaporation = evaporation
+        self.max_steps = max_steps
+        self.backtrack = backtrack
+        self.workers = workers
+
+        self.tau_raw = np.ones(len(self.targets), dtype=np.float64)
+        self.scale = 1.0
+
+# Випаровування: лише зміна глобального множника
+    def evaporate(self) -> None:
+        self.scale *= (1.0 - self.evaporation)
+        if self.scale < _MIN_SCALE:
+            self.tau_raw *= self.scale
+            self.scale = 1.0
+
+# Додає феромон amount на ребра шляху
+    def deposit(self, edges: list, amount: float) -> None:
+        np.add.at(self.tau_raw, edges, amount / self.scale)
+
+    def path_cost(self, edges: list) -> float:
+        return float(self.cost[edges].sum()) if edges else 0.0
+
+    def run(self, source: int, target: int, num_ants: int, num_iterations: int, seed: int = 0,
+            initial_path: list = None, on_iteration=None):
+        """
+        Повертає (найкращий шлях як список ребер, його вартість) або ([], inf).
+        """
+        best_path, best_cost = [], float('inf')
+        if initial_path:
+            self.deposit(initial_path, 10.0)
+            best_path, best_cost = list(initial_path), self.path_cost(initial_path)
+        shared = None
+        try:
+            if self.workers > 1 and num_ants > ANTS_PER_BATCH and num_ants * len(self.targets) >= PARALLEL_MIN_WORK:
+                shared = _SharedArrays()
+                graph = (
+                    (shared.put(self.offsets), len(self.offsets) - 1),
+                    (shared.put(self.targets), len(self.targets)),
+                    shared.put(self.eta),
+                )
+                tau_name = shared.put(self.tau_raw)
+                query = f"{os.getpid()}:{tau_name}"
+                pool = _get_pool()
+
+            offsets = targets = None
+            for iteration in range(num_iterations):
+                batches = self._batches(num_ants)
+                seeds = [f"{seed}:{iteration}:{i}" for i in range(len(batches))]
+                if shared is not None:
+                    shared.write(tau_name, self.tau_raw)
+                    tasks = [(query, iteration, graph, tau_name, self.alpha, source, target, n, s, self.max_steps, self.backtrack)
+                             for n, s in zip(batches, seeds)]
+                    paths = [p for result in pool.map(_worker_batch, tasks) for p in result]
+                else:
+                    if offsets is None:
+                        offsets, targets = self.offsets.tolist(), self.targets.tolist()
+                    table = transition_table(self.tau_raw, self.eta, self.alpha)
+                    paths = [p for n, s in zip(batches, seeds)
+                             for p in walk_ants(offsets, targets, table, source, target, n, random.Random(s),
+                                                self.max_steps, self.backtrack)]
+
+                costs = [self.path_cost(p) for p in paths]
+                for path, cost in zip(paths, costs):
+                    if cost < best_cost:
+                        best_path, best_cost = path, cost
+
+                self.evaporate()
+                for path, cost in zip(paths, costs):
+                    if cost > 0:
+                        self.deposit(path, 1.0 / cost)
+                if on_iteration is not None:
+                    on_iteration(iteration, len(paths), best_cost)
+        finally:
+            if shared is not None:
+                shared.close()
+        return best_path, best_cost
+
+# Розподіл мурах ітерації між партіями
+    @staticmethod
+    def _batches(num_ants: int) -> list:
+        return [min(ANTS_PER_BATCH, num_ants - i) for i in range(0, num_ants, ANTS_PER_BATCH)]
+
+
+class Corridor:
+    """
+    Обмежений підграф для колонії між source і target:
+    - межі прямого й зворотного пошуку (з обмеженням limit) від source і до target
+    - ребро u -> v лишається, якщо d(source, u) + w + d(v, target) <= detour_ratio × d(source, target)
+    - тупики (вузли без виходу або входу в межах коридору) відсікаються заздалегідь
+    Вузли й ребра коридору перенумеровані; nodes/edges — їхні номери в знімку.
+    remaining[v] — відстань від вузла знімка v до target (для евристики мурах).
+    """
+    def __init__(self, engine, source: int, target: int, weights: list, detour_ratio: float = DETOUR_RATIO):
+        _, base_edges = engine.dijkstra(source, target, weights)
+        self.base_edges = base_edges
+        self.size = 0
+        if source == target or not base_edges:
+            return
+
+        w = np.asarray(weights, dtype=np.float64)
+        self.base_length = float(w[base_edges].sum())
+        bound = detour_ratio * self.base_length
+        forward = np.array(engine.shortest_distances(source, weights, limit=bound))
+        backward = np.array(engine.shortest_distances(target, weights, reverse=True, limit=bound))
+        self.remaining = backward
+        self.max_steps = max(MAX_STEPS, STEPS_PER_BASE_EDGE * len(base_edges))
+
+        sources = np.asarray(engine.snapshot.sources, dtype=np.int64)
+        targets = np.asarray(engine.snapshot.targets, dtype=np.int64)
+        mask = forward[sources] + w + backward[targets] <= bound * (1 + 1e-9)
+        mask = self._prune_dead_ends(mask, sources, targets, engine.num_nodes, source, target)
+
+        self.edges = np.flatnonzero(mask)
+        self.nodes = np.union1d(np.union1d(sources[self.edges], targets[self.edges]), [source, target])
+        local = np.full(engine.num_nodes, -1, dtype=np.int64)
+        local[self.nodes] = np.arange(len(self.nodes))
+        self.local = local
+
+        # Ребра знімка відсортовані за вихідним вузлом, тому порядок CSR зберігається
+        self.targets = local[targets[self.edges]]
+        self.offsets = np.zeros(len(self.nodes) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(local[sources[self.edges]], minlength=len(self.nodes)), out=self.offsets[1:])
+        self.source, self.target = int(local[source]), int(local[target])
+        self.size = len(self.edges)
+
+# Ітеративно прибирає тупики: вузли без виходу чи входу в коридорі, а також
+# «глухі кути», де є лише один сусід (з них можна тільки повернутися назад)
+    @staticmethod
+    def _prune_dead_ends(mask, sources, targets, num_nodes: int, source: int, target: int) -> np.ndarray:
+        while True:
+            u, v = sources[mask], targets[mask]
+            out_deg = np.bincount(u, minlength=num_nodes)
+            in_deg = np.bincount(v, minlength=num_nodes)
+            pairs = np.unique(np.stack([np.minimum(u, v), np.maximum(u, v)], axis=1), axis=0)
+            neighbours = np.bincount(pairs.ravel(), minlength=num_nodes)
+            dead = (out_deg == 0) | (in_deg == 0) | (neighbours <= 1)
+            dead[[source, target]] = False
+            remove = mask & (dead[sources] | dead[targets])
+            if not remove.any():
+                return mask
+            mask = mask & ~remove
+
+# Ребра коридору (локальні номери) -> ребра знімка
+    def to_global(self, local_edges: list) -> list:
+        return self.edges[local_edges].tolist()
+
+# Ребра знімка -> ребра коридору (лише ті, що входять у коридор)
+    def to_local(self, edges: list) -> list:
+        position = {e: i for i, e in enumerate(self.edges.tolist())}
+        return [position[e] for e in edges if e in position]
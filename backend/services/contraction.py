@@ -0,0 +1,368 @@
+import os
+import sys
+import json
+import heapq
+import time
+import numpy as np
+from services.edge_weights import EdgeWeights, WEIGHT_MODEL_VERSION
+
+CH_FORMAT_VERSION = 1
+CH_METRICS = ["fuel_weight", "length_weight", "duration_weight"]
+CH_DIR_PREFIX = "ch_"
+
+# fuel_weight пропорційна витраті пального, тому ієрархія будується для 1 л/100км:
+# масштабування ваг не змінює найкоротших шляхів
+REFERENCE_CONSUMPTION = 1.0
+
+INF = float('inf')
+
+ARRAY_DTYPES = {
+    "rank": np.int32,
+    "up_offsets": np.int64,
+    "up_targets": np.int32,
+    "up_weights": np.float64,
+    "up_codes": np.int64,
+    "down_offsets": np.int64,
+    "down_sources": np.int32,
+    "down_weights": np.float64,
+    "down_codes": np.int64,
+}
+
+
+class ContractionHierarchy:
+    """
+    Contraction Hierarchies для однієї метрики.
+
+    Зберігаються два «висхідні» графи у форматі CSR:
+    - up_*: ребра v -> x, де rank[x] > rank[v] (для прямого пошуку від старту)
+    - down_*: ребра u -> v, збережені у вузлі v, де rank[u] > rank[v]
+      (для зворотного пошуку від фінішу)
+
+    Код ребра (*_codes): значення >= 0 — середній вузол shortcut-а,
+    від'ємне значення -(e + 1) — оригінальне ребро e знімка.
+    """
+    def __init__(self, arrays: dict, meta: dict):
+        self.meta = meta
+        self.metric = meta["metric"]
+        for name in ARRAY_DTYPES:
+            setattr(self, name, arrays[name])
+
+        # Списки Python для циклу пошуку
+        self._up = (self.up_offsets.tolist(), self.up_targets.tolist(),
+                    self.up_weights.tolist(), self.up_codes.tolist())
+        self._down = (self.down_offsets.tolist(), self.down_sources.tolist(),
+                      self.down_weights.tolist(), self.down_codes.tolist())
+        self._edge_codes = None
+
+# Чи відповідає ієрархія знімку графа і моделі ваг (інакше її треба перебудувати)
+    def matches(self, snapshot) -> bool:
+        return (self.meta.get("num_nodes") == snapshot.num_nodes
+                and self.meta.get("snapshot_created") == snapshot.meta.get("created")
+                and self.meta.get("weight_model") == WEIGHT_MODEL_VERSION)
+
+    @property
+    def num_shortcuts(self) -> int:
+        return int((self.up_codes >= 0).sum() + (self.down_codes >= 0).sum())
+
+# Словник (u, v) -> код ребра для розпакування shortcut-ів
+    def _codes(self) -> dict:
+        if self._edge_codes is None:
+            codes = {}
+            offsets, targets, _, up_codes = self._up
+            for v in range(len(offsets) - 1):
+                for i in range(offsets[v], offsets[v + 1]):
+                    codes[(v, targets[i])] = up_codes[i]
+            offsets, sources, _, down_codes = self._down
+            for v in range(len(offsets) - 1):
+                for i in range(offsets[v], offsets[v + 1]):
+                    codes[(sources[i], v)] = down_codes[i]
+            self._edge_codes = codes
+        return self._edge_codes
+
+# Розпаковує ребро ієрархії в послідовність оригінальних ребер
+    def _unpack_edge(self, u: int, v: int, code: int) -> list:
+        codes = self._codes()
+        edges = []
+        stack = [(u, v, code)]
+        while stack:
+            a, b, c = stack.pop()
+            if c < 0:
+                edges.append(-c - 1)
+            else:
+                # спочатку (a, mid), потім (mid, b) — тому в стек у зворотному порядку
+                stack.append((c, b, codes[(c, b)]))
+                stack.append((a, c, codes[(a, c)]))
+        return edges
+
+# Двонаправлений пошук в ієрархії
+    def query(self, source: int, target: int):
+        """
+        Повертає (вартість, список оригінальних ребер) або (inf, []), якщо шляху немає.
+        """
+        if source == target:
+            return 0.0, []
+
+        dist = ({source: 0.0}, {target: 0.0})
+        pred = ({source: None}, {target: None})
+        queues = ([(0.0, source)], [(0.0, target)])
+        graphs = (self._up, self._down)
+        best, meet = INF, None
+
+        while queues[0] or queues[1]:
+            top_f = queues[0][0][0] if queues[0] else INF
+            top_b = queues[1][0][0] if queues[1] else INF
+            if min(top_f, top_b) >= best:
+                break
+            side = 0 if top_f <= top_b else 1
+
+            d, u = heapq.heappop(queues[side])
+            own_dist = dist[side]
+            if d > own_dist[u]:
+                continue
+
+            other = dist[1 - side].get(u)
+            if other is not None and d + other < best:
+                best, meet = d + other, u
+
+            offsets, nodes, weights, codes = graphs[side]
+            own_pred = pred[side]
+            for i in range(offsets[u], offsets[u + 1]):
+                v = nodes[i]
+                nd = d + weights[i]
+                if nd < own_dist.get(v, INF):
+                    own_dist[v] = nd
+                    own_pred[v] = (u, codes[i])
+                    heapq.heappush(queues[side], (nd, v))
+
+        if meet is None:
+            return INF, []
+
+        # Прямий ланцюжок: source -> meet
+        hops = []
+        node = meet
+        while pred[0][node] is not None:
+            prev, code = pred[0][node]
+            hops.append((prev, node, code))
+            node = prev
+        hops.reverse()
+        # Зворотний ланцюжок: meet -> target
+        node = meet
+        while pred[1][node] is not None:
+            nxt, code = pred[1][node]
+            hops.append((node, nxt, code))
+            node = nxt
+
+        edges = []
+        for u, v, code in hops:
+            edges.extend(self._unpack_edge(u, v, code))
+        return best, edges
+
+# Повний пошук лише вгору за рангом: {вузол: відстань} (для матриць відстаней із «кошиками»)
+    def upward_search(self, node: int, backward: bool = False) -> dict:
+        offsets, nodes, weights, _ = self._down if backward else self._up
+        dist = {node: 0.0}
+        queue = [(0.0, node)]
+        while queue:
+            d, u = heapq.heappop(queue)
+            if d > dist[u]:
+                continue
+            for i in range(offsets[u], offsets[u + 1]):
+                v = nodes[i]
+                nd = d + weights[i]
+                if nd < dist.get(v, INF):
+                    dist[v] = nd
+                    heapq.heappush(queue, (nd, v))
+        return dist
+
+    def save(self, path: str) -> None:
+        os.makedirs(path, exist_ok=True)
+        for name in ARRAY_DTYPES:
+            np.save(os.path.join(path, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(self.meta, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "ContractionHierarchy":
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format_version") != CH_FORMAT_VERSION:
+            raise ValueError(f"Непідтримувана версія ієрархії: {meta.get('format_version')}")
+        mmap_mode = "r" if mmap else None
+        arrays = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+            for name in ARRAY_DTYPES
+        }
+        return cls(arrays, meta)
+
+
+def hierarchy_path(snapshot_path: str, metric: str) -> str:
+    """
+    Каталог ієрархії всередині знімка графа: data/kyiv_with_poi.snapshot/ch_fuel_weight
+    """
+    return os.path.join(snapshot_path, f"{CH_DIR_PREFIX}{metric}")
+
+
+# Локальний пошук свідків: відстані від u в ще не стягнутому графі без вузла skip
+def _witness_search(out_adj, u, skip, max_cost, settle_limit):
+    dist = {u: 0.0}
+    queue = [(0.0, u)]
+    settled = 0
+    while queue and settled < settle_limit:
+        d, x = heapq.heappop(queue)
+        if d > dist[x]:
+            continue
+        if d > max_cost:
+            break
+        settled += 1
+        for y, (w, _) in out_adj[x].items():
+            if y == skip:
+                continue
+            nd = d + w
+            if nd < dist.get(y, INF):
+                dist[y] = nd
+                heapq.heappush(queue, (nd, y))
+    return dist
+
+
+# Обчислює shortcut-и, потрібні при стягуванні вузла v
+def _shortcuts_for(out_adj, in_adj, v, settle_limit):
+    shortcuts = []
+    outgoing = out_adj[v]
+    if not outgoing:
+        return shortcuts
+    max_out = max(w for w, _ in outgoing.values())
+    for u, (w_uv, _) in in_adj[v].items():
+        witness = _witness_search(out_adj, u, v, w_uv + max_out, settle_limit)
+        for x, (w_vx, _) in outgoing.items():
+            if x == u:
+                continue
+            cost = w_uv + w_vx
+            if witness.get(x, INF) > cost:
+                shortcuts.append((u, x, cost))
+    return shortcuts
+
+
+def build_contraction_hierarchy(snapshot, weights: list, metric: str, settle_limit: int = 60) -> ContractionHierarchy:
+    """
+    Будує Contraction Hierarchies для ваг weights (список за номером ребра знімка).
+    Порядок стягування — за різницею ребер із лінивим оновленням пріоритетів.
+    """
+    start_time = time.time()
+    n = snapshot.num_nodes
+    out_adj = [dict() for _ in range(n)]
+    in_adj = [dict() for _ in range(n)]
+    for e, (u, v) in enumerate(zip(snapshot.sources.tolist(), snapshot.targets.tolist())):
+        if u == v:
+            continue
+        w = weights[e]
+        current = out_adj[u].get(v)
+        if current is None or w < current[0]:
+            out_adj[u][v] = (w, -(e + 1))
+            in_adj[v][u] = (w, -(e + 1))
+
+    deleted_neighbors = [0] * n
+
+    def priority(v):
+        shortcuts = _shortcuts_for(out_adj, in_adj, v, settle_limit)
+        return len(shortcuts) - len(out_adj[v]) - len(in_adj[v]) + deleted_neighbors[v]
+
+    heap = [(priority(v), v) for v in range(n)]
+    heapq.heapify(heap)
+
+    rank = [0] * n
+    contracted = [False] * n
+    up_lists = [None] * n
+    down_lists = [None] * n
+    order = 0
+
+    while heap:
+        _, v = heapq.heappop(heap)
+        if contracted[v]:
+            continue
+        # Ліниве оновлення: якщо пріоритет погіршився — повертаємо вузол у чергу
+        current = priority(v)
+        if heap and current > heap[0][0]:
+            heapq.heappush(heap, (current, v))
+            continue
+
+        shortcuts = _shortcuts_for(out_adj, in_adj, v, settle_limit)
+        rank[v] = order
+        order += 1
+        contracted[v] = True
+
+        # Ребра до ще не стягнутих вузлів ведуть «угору» за рангом
+        up_lists[v] = [(x, w, code) for x, (w, code) in out_adj[v].items()]
+        down_lists[v] = [(u, w, code) for u, (w, code) in in_adj[v].items()]
+
+        for x in out_adj[v]:
+            del in_adj[x][v]
+            deleted_neighbors[x] += 1
+        for u in in_adj[v]:
+            del out_adj[u][v]
+            deleted_neighbors[u] += 1
+        out_adj[v] = {}
+        in_adj[v] = {}
+
+        for u, x, cost in shortcuts:
+            current_edge = out_adj[u].get(x)
+            if current_edge is None or cost < current_edge[0]:
+                out_adj[u][x] = (cost, v)
+                in_adj[x][u] = (cost, v)
+
+        if order % 5000 == 0:
+            print(f" CH '{metric}': стягнуто {order}/{n} вузлів")
+
+    def to_csr(lists):
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum([len(items) for items in lists], out=offsets[1:])
+        flat = [item for items in lists for item in items]
+        return (
+            offsets,
+            np.array([item[0] for item in flat], dtype=np.int32),
+            np.array([item[1] for item in flat], dtype=np.float64),
+            np.array([item[2] for item in flat], dtype=np.int64),
+        )
+
+    up_offsets, up_targets, up_weights, up_codes = to_csr(up_lists)
+    down_offsets, down_sources, down_weights, down_codes = to_csr(down_lists)
+    arrays = {
+        "rank": np.array(rank, dtype=np.int32),
+        "up_offsets": up_offsets,
+        "up_targets": up_targets,
+        "up_weights": up_weights,
+        "up_codes": up_codes,
+        "down_offsets": down_offsets,
+        "down_sources": down_sources,
+        "down_weights": down_weights,
+        "down_codes": down_codes,
+    }
+    meta = {
+        "format_version": CH_FORMAT_VERSION,
+        "metric": metric,
+        "num_nodes": n,
+        "reference_consumption": REFERENCE_CONSUMPTION,
+        "snapshot_created": snapshot.meta.get("created"),
+        "weight_model": WEIGHT_MODEL_VERSION,
+    }
+    ch = ContractionHierarchy(arrays, meta)
+    elapsed = time.time() - start_time
+    print(f" CH '{metric}' побудовано за {elapsed:.1f} с, shortcut-ів: {ch.num_shortcuts}")
+    return ch
+
+
+def build_all(metrics: list = None, filepath: str = None) -> None:
+    """
+    Офлайн-побудова ієрархій для метрик і збереження їх поруч зі знімком графа.
+    """
+    from services.graph_registry import get_snapshot
+
+    snapshot = get_snapshot(filepath)
+    weights = EdgeWeights(snapshot).profile(REFERENCE_CONSUMPTION)
+    for metric in metrics or CH_METRICS:
+        ch = build_contraction_hierarchy(snapshot, weights[metric], metric)
+        ch.save(hierarchy_path(snapshot.path, metric))
+
+
+if __name__ == "__main__":
+    # python -m services.contraction [fuel_weight length_weight duration_weight]
+    build_all(sys.argv[1:] or None)
@@ -0,0 +1,128 @@
+import os
+import atexit
+import threading
+import numpy as np
+from services.process_pool import get_context
+from services.graph_registry import get_engine, get_edge_weights, get_hierarchy
+from services.contraction import REFERENCE_CONSUMPTION
+from services.fuel_api import DEFAULT_CONSUMPTION
+from services.traffic_overlay import TrafficView, get_traffic_overlay, column_name
+
+# Метрики матриці та їхні одиниці
+MATRIX_UNITS = {
+    "fuel_weight": "l",
+    "length_weight": "m",
+    "duration_weight": "s",
+    "poi_weight": "m",
+}
+
+# Кількість процесів для пошуків від різних стартів; 0 або 1 — у поточному процесі
+MATRIX_WORKERS = int(os.getenv("MATRIX_WORKERS", str(min(os.cpu_count() or 1, 4))))
+# Старти діляться на задачі по стільки рядків
+ROWS_PER_TASK = 8
+# Менше стартів — пул не потрібен
+PARALLEL_MIN_SOURCES = 32
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+# Постійний пул процесів (створюється при першому великому запиті; forkserver, а не fork
+# з багатопотокового сервера — див. services.process_pool)
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = get_context().Pool(MATRIX_WORKERS)
+            atexit.register(_pool.terminate)
+    return _pool
+
+
+# Рядки матриці для частини стартів (виконується в процесі пулу)
+def _dijkstra_rows(task) -> list:
+    filepath, metric, avg_consumption, traffic, sources, targets = task
+    engine = get_engine(filepath)
+    weights = get_edge_weights(filepath).profile(avg_consumption)[metric]
+    weights = traffic.patch(column_name(metric, avg_consumption), weights, metric)
+    return [engine.distances_to(source, targets, weights) for source in sources]
+
+
+class DistanceMatrix:
+    """
+    Матриці відстаней «один до багатьох» і «багато до багатьох» за метриками маршрутизаторів:
+    - якщо для метрики побудовано Contraction Hierarchies, використовується алгоритм із
+      «кошиками»: зворотні пошуки вгору від кожної цілі один раз, далі для кожного старту —
+      лише прямий пошук вгору з переглядом кошиків
+    - інакше для кожного старту — один пошук Дейкстри, що зупиняється після досягнення всіх цілей;
+      старти розподіляються між процесами пулу
+    - затори й перекриття враховуються (стан оверлею береться один раз при створенні);
+      якщо оверлей змінює ваги метрики, ієрархія не використовується
+    - rows() віддає рядки по одному в порядку стартів, тож великі матриці можна передавати потоком
+
+    Вузли — індекси знімка; недосяжні пари мають значення inf.
+    """
+    def __init__(self, metric: str = "fuel_weight", avg_consumption: float = DEFAULT_CONSUMPTION,
+                 use_hierarchy: bool = True, parallel: bool = True, filepath: str = None,
+                 traffic: TrafficView = None):
+        if metric not in MATRIX_UNITS:
+            raise ValueError(f"Невідома метрика: {metric}")
+        self.metric = metric
+        self.avg_consumption = float(avg_consumption)
+        self.use_hierarchy = use_hierarchy
+        self.parallel = parallel
+        self.filepath = filepath
+        self.traffic = traffic if traffic is not None else get_traffic_overlay().view()
+
+    @property
+    def units(self) -> str:
+        return MATRIX_UNITS[self.metric]
+
+# Рядки матриці (списки відстаней до targets) у порядку sources
+    def rows(self, sources: list, targets: list):
+        sources = [int(s) for s in sources]
+        targets = [int(t) for t in targets]
+        ch = None
+        if self.use_hierarchy and not self.traffic.affects(self.metric):
+            ch = get_hierarchy(self.metric, self.filepath)
+        if ch is not None:
+            yield from self._bucket_rows(ch, sources, targets)
+        else:
+            yield from self._dijkstra_rows(sources, targets)
+
+# Уся матриця як масив NumPy (джерела × цілі)
+    def compute(self, sources: list, targets: list) -> np.ndarray:
+        matrix = np.full((len(sources), len(targets)), np.inf)
+        for i, row in enumerate(self.rows(sources, targets)):
+            matrix[i] = row
+        return matrix
+
+# Рядок «один до багатьох»
+    def one_to_many(self, source: int, targets: list) -> list:
+        return next(self.rows([source], targets))
+
+    def _dijkstra_rows(self, sources: list, targets: list):
+        tasks = [(self.filepath, self.metric, self.avg_consumption, self.traffic, sources[i:i + ROWS_PER_TASK], targets)
+                 for i in range(0, len(sources), ROWS_PER_TASK)]
+        if self.parallel and MATRIX_WORKERS > 1 and len(sources) >= PARALLEL_MIN_SOURCES:
+            chunks = _get_pool().imap(_dijkstra_rows, tasks)
+        else:
+            chunks = map(_dijkstra_rows, tasks)
+        for chunk in chunks:
+            yield from chunk
+
+    def _bucket_rows(self, ch, sources: list, targets: list):
+        scale = self.avg_consumption / REFERENCE_CONSUMPTION if self.metric == "fuel_weight" else 1.0
+
+        # Кошики: вузол -> [(номер цілі, відстань від вузла до цілі)]
+        buckets = {}
+        for j, target in enumerate(targets):
+            for node, d in ch.upward_search(target, backward=True).items():
+                buckets.setdefault(node, []).append((j, d))
+
+        for source in sources:
+            row = [float('inf')] * len(targets)
+            for node, d in ch.upward_search(source).items():
+                for j, db in buckets.get(node, ()):
+                    if d + db < row[j]:
+                        row[j] = d + db
+            yield [value * scale for value in row]
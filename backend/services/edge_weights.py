@@ -0,0 +1,107 @@
+import numpy as np
+from services.cache_store import LRUCache
+from services.geo import haversine_m
+
+# Версія моделі ваг: змінюється разом зі швидкостями чи коефіцієнтами,
+# щоб попередньо побудовані ієрархії CH вважались застарілими
+WEIGHT_MODEL_VERSION = 2
+
+# Середня швидкість за класом дороги, км/год
+SPEED_KMH = {
+    "motorway": 90, "trunk": 90,
+    "primary": 60, "secondary": 60,
+    "tertiary": 40, "residential": 40,
+    "living_street": 20, "service": 20,
+}
+DEFAULT_SPEED_KMH = 30
+
+# Коефіцієнт витрати пального за класом дороги
+FUEL_COEFFICIENTS = {
+    "motorway": 0.9, "trunk": 0.9,
+    "residential": 1.2, "living_street": 1.2, "service": 1.2,
+}
+DEFAULT_FUEL_COEFFICIENT = 1.0
+
+PROFILE_CACHE_SIZE = 32
+
+
+def estimate_speed_kmh(highway: str) -> float:
+    return SPEED_KMH.get(highway, DEFAULT_SPEED_KMH)
+
+
+def _min_ratio(weights: np.ndarray, span: np.ndarray) -> float:
+    # Ребра з нульовою прямою (петлі, збіжні вузли) оцінку не обмежують
+    mask = span > 0
+    if not mask.any():
+        return 0.0
+    return float(np.min(weights[mask] / span[mask]))
+
+
+class EdgeWeights:
+    """
+    Векторизовані ваги ребер знімка графа:
+    - коефіцієнти беруться з таблиць за кодом класу дороги (без циклу по ребрах)
+    - довжина, тривалість і poi_score не залежать від авто і рахуються один раз
+    - poi_weight — «нецікава» відстань: довжина ребра, поділена на (1 + poi_count),
+      тобто невід'ємна вага, що менша на ребрах поруч із пам'ятками
+    - fuel_weight — колонка «пальне на 1 л/100км», помножена на витрату авто;
+      профілі ваг кешуються за значенням витрати
+    - cost_per_metre — найменша вага на метр прямої між кінцями ребра для кожної метрики:
+      відстань по великому колу, помножена на неї, є допустимою евристикою A*
+    """
+    def __init__(self, snapshot):
+        classes = snapshot.highway_classes
+        speed = np.array([estimate_speed_kmh(c) for c in classes], dtype=np.float64)
+        coeff = np.array([FUEL_COEFFICIENTS.get(c, DEFAULT_FUEL_COEFFICIENT) for c in classes], dtype=np.float64)
+        highway = np.asarray(snapshot.highway)
+
+        self.length = np.asarray(snapshot.length, dtype=np.float64)
+        self.duration = self.length / 1000 / speed[highway] * 3600
+        self.fuel_per_unit = self.length / 100_000 * coeff[highway]
+        self.poi_score = 1.0 / (1.0 + np.asarray(snapshot.poi_count, dtype=np.float64))
+        self.poi_distance = self.length * self.poi_score
+
+        # Пряма між кінцями ребра (м) і мінімальна вага на метр за кожною метрикою
+        x, y = np.asarray(snapshot.node_x), np.asarray(snapshot.node_y)
+        sources, targets = np.asarray(snapshot.sources), np.asarray(snapshot.targets)
+        span = haversine_m(x[sources], y[sources], x[targets], y[targets])
+        self._per_metre = {
+            "fuel_weight": _min_ratio(self.fuel_per_unit, span),
+            "length_weight": _min_ratio(self.length, span),
+            "duration_weight": _min_ratio(self.duration, span),
+            "poi_weight": _min_ratio(self.poi_distance, span),
+        }
+
+        # Списки Python для ядра пошуку спільні для всіх профілів
+        self._length_list = self.length.tolist()
+        self._duration_list = self.duration.tolist()
+        self._poi_list = self.poi_distance.tolist()
+        self._profiles = LRUCache(maxsize=PROFILE_CACHE_SIZE)
+
+# Масив витрати пального (л) на кожному ребрі для витрати avg_consumption л/100км
+    def fuel(self, avg_consumption: float) -> np.ndarray:
+        return self.fuel_per_unit * float(avg_consumption)
+
+# Найменша вага метрики на метр відстані по прямій (для fuel_weight — з урахуванням витрати)
+    def cost_per_metre(self, metric: str, avg_consumption: float = 1.0) -> float:
+        try:
+            value = self._per_metre[metric]
+        except KeyError:
+            raise ValueError(f"Невідома метрика: {metric}")
+        if metric == "fuel_weight":
+            value *= float(avg_consumption)
+        return value
+
+# Ваги ребер для авто з витратою avg_consumption (списки тільки для читання)
+    def profile(self, avg_consumption: float) -> dict:
+        key = round(float(avg_consumption), 3)
+        weights = self._profiles.get(key)
+        if weights is None:
+            weights = {
+                "fuel_weight": self.fuel(key).tolist(),
+                "length_weight": self._length_list,
+                "duration_weight": self._duration_list,
+                "poi_weight": self._poi_list,
+            }
+            self._profiles.set(key, weights)
+        return weights
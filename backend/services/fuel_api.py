@@ -1,11 +1,66 @@
-import requests
+import os
+import csv
+import threading
+from services.cache_store import LRUCache, SQLiteStore, SingleFlight
+from services.http_session import pooled_session
 
-BASE_URL = "https://www.fueleconomy.gov/ws/rest"
+BASE_URL = os.getenv("FUEL_API_URL", "https://www.fueleconomy.gov/ws/rest")
 
 HEADERS = {
     "Accept": "application/json"
 }
 
+REQUEST_TIMEOUT = 5
+
+# Середня витрата, якщо дані про авто відсутні
+DEFAULT_CONSUMPTION = 8.0
+
+FUEL_CACHE_PATH = os.path.join("data", "fuel_cache.sqlite")
+VEHICLE_TABLE_PATH = os.path.join("data", "vehicles.csv")
+CACHE_TTL = 30 * 24 * 3600
+NEGATIVE_CACHE_TTL = 24 * 3600
+
+_session = pooled_session()
+_MISSING = object()
+
+
+class VehicleNotFound(Exception):
+    """API відповіло, але конфігурацію авто або дані про витрату не знайдено."""
+
+
+def _fetch_consumption(make: str, model: str, year: int) -> float:
+    """
+    Запит до fueleconomy.gov. Піднімає VehicleNotFound, якщо авто немає в базі,
+    і requests.RequestException — при мережевих помилках.
+    """
+    response = _session.get(
+        f"{BASE_URL}/vehicle/menu/options",
+        params={"year": year, "make": make, "model": model},
+        headers=HEADERS,
+        timeout=REQUEST_TIMEOUT,
+    )
+    response.raise_for_status()
+    options = response.json().get("menuItem")
+    if not options:
+        raise VehicleNotFound("Не знайдено жодної конфігурації")
+    # API повертає об'єкт замість списку, якщо конфігурація одна
+    if isinstance(options, dict):
+        options = [options]
+    vehicle_id = options[0]["value"]
+
+    response = _session.get(f"{BASE_URL}/vehicle/{vehicle_id}", headers=HEADERS, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    info = response.json()
+
+    city = info.get("city08")
+    highway = info.get("highway08")
+    if not (city and highway):
+        raise VehicleNotFound("Дані про витрату пального відсутні")
+
+    avg_mpg = (float(city) + float(highway)) / 2
+    l_per_100km = 235.2 / avg_mpg
+    return round(l_per_100km, 1)
+
 
 def get_fuel_consumption_from_api(make: str, model: str, year: int):
     """
@@ -13,45 +68,109 @@ def get_fuel_consumption_from_api(make: str, model: str, year: int):
     Повертає float або None, якщо дані не знайдено.
     """
     print(f" Запит до API: {year} {make} {model}")
-
-    # Отримає список конфігурацій (vehicles)
     try:
-        response = requests.get(
-            f"{BASE_URL}/vehicle/menu/options",
-            params={"year": year, "make": make, "model": model},
-            headers=HEADERS
-        )
-        response.raise_for_status()
-        data = response.json()
-
-        # Дістає перший vehicleId
-        options = data.get("menuItem")
-        if not options:
-            print("Не знайдено жодної конфігурації")
-            return None
-
-        vehicle_id = options[0]["value"]
+        return _fetch_consumption(make, model, year)
+    except VehicleNotFound as e:
+        print(e)
+        return None
     except Exception as e:
-        print(f"Помилка при отриманні ID: {e}")
+        print(f"Помилка при запиті даних про авто: {e}")
         return None
 
-    #  Отримає інформацію про авто
-    try:
-        response = requests.get(f"{BASE_URL}/vehicle/{vehicle_id}", headers=HEADERS)
-        response.raise_for_status()
-        info = response.json()
-
-        city = info.get("city08")
-        highway = info.get("highway08")
-
-        if city and highway:
-            avg_mpg = (float(city) + float(highway)) / 2
-            l_per_100km = 235.2 / avg_mpg
-            return round(l_per_100km, 1)
-        else:
-            print("Дані про витрату пального відсутні")
+
+class FuelConsumptionService:
+    """
+    Кешований сервіс витрати пального (make, model, year -> л/100км):
+    - LRU у пам'яті процесу перед постійним сховищем SQLite з TTL
+    - негативне кешування авто, яких немає в базі API
+    - об'єднання одночасних запитів для одного авто в один HTTP-виклик
+    - офлайн-таблиця авто (CSV), з якою можна працювати без зовнішніх викликів
+    """
+    def __init__(self, cache_path: str = FUEL_CACHE_PATH, table_path: str = VEHICLE_TABLE_PATH,
+                 offline: bool = None):
+        self.memory = LRUCache(maxsize=4096)
+        self.store = SQLiteStore(cache_path, "fuel_consumption", ttl=CACHE_TTL)
+        self.flight = SingleFlight()
+        self.table = {}
+        if offline is None:
+            offline = os.getenv("FUEL_API_OFFLINE", "") == "1"
+        self.offline = offline
+        if table_path and os.path.exists(table_path):
+            self.preload(table_path)
+
+    @staticmethod
+    def key(make: str, model: str, year: int) -> str:
+        return f"{(make or '').strip().lower()}|{(model or '').strip().lower()}|{int(year or 0)}"
+
+# Завантажує таблицю авто: CSV з колонками make, model, year, l_per_100km
+    def preload(self, path: str) -> int:
+        with open(path, encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                try:
+                    value = float(row["l_per_100km"])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                self.table[self.key(row.get("make"), row.get("model"), row.get("year") or 0)] = value
+        print(f"Завантажено таблицю авто: {len(self.table)} записів")
+        return len(self.table)
+
+# Пошук у таблиці: точний рік, потім запис без року (year = 0)
+    def _from_table(self, make: str, model: str, year: int):
+        value = self.table.get(self.key(make, model, year))
+        if value is None:
+            value = self.table.get(self.key(make, model, 0))
+        return value
+
+# Витрата пального або None, якщо авто невідоме
+    def lookup(self, make: str, model: str, year: int):
+        key = self.key(make, model, year)
+        value = self.memory.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        value = self._from_table(make, model, year)
+        if value is None:
+            value = self.store.get(key, _MISSING)
+            if value is _MISSING:
+                if self.offline:
+                    return None
+                value = self.flight.do(key, lambda: self._fetch_and_store(key, make, model, year))
+        self.memory.set(key, value, ttl=NEGATIVE_CACHE_TTL if value is None else CACHE_TTL)
+        return value
+
+    def _fetch_and_store(self, key: str, make: str, model: str, year: int):
+        print(f" Запит до API: {year} {make} {model}")
+        try:
+            value = _fetch_consumption(make, model, year)
+        except VehicleNotFound as e:
+            # невідоме авто кешується коротше, щоб не питати API на кожен запит
+            print(e)
+            self.store.set(key, None, ttl=NEGATIVE_CACHE_TTL)
             return None
+        self.store.set(key, value)
+        return value
 
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_fuel_service() -> FuelConsumptionService:
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = FuelConsumptionService()
+    return _service
+
+
+def get_fuel_consumption(make: str, model: str, year: int) -> float:
+    """
+    Середня витрата пального (л/100км) через кешований сервіс.
+    Для невідомих авто повертає DEFAULT_CONSUMPTION; мережеві помилки не кешуються.
+    """
+    try:
+        value = get_fuel_service().lookup(make, model, year)
     except Exception as e:
-        print(f"Помилка при запиті даних про авто: {e}")
-        return None
\ No newline at end of file
+        print(f"Помилка при отриманні витрати пального: {e}")
+        return DEFAULT_CONSUMPTION
+    return DEFAULT_CONSUMPTION if value is None else value
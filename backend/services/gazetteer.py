@@ -0,0 +1,104 @@
+import re
+import difflib
+import numpy as np
+
+# Скорочення типів вулиць -> повна форма
+_ABBREVIATIONS = {
+    "вул": "вулиця",
+    "пров": "провулок",
+    "пр": "проспект",
+    "просп": "проспект",
+    "пр-т": "проспект",
+    "бул": "бульвар",
+    "б-р": "бульвар",
+    "пл": "площа",
+    "наб": "набережна",
+    "шос": "шосе",
+}
+# Типи вулиць: ігноруються при порівнянні назв («Хрещатик» = «вулиця Хрещатик»)
+_STREET_TYPES = {"вулиця", "провулок", "проспект", "бульвар", "площа", "набережна", "шосе", "узвіз", "майдан"}
+# Місто й країна в адресі нічого не уточнюють для графа Києва
+_PLACE_WORDS = {"м", "місто", "київ", "kyiv", "kiev", "україна", "ukraine"}
+
+FUZZY_CUTOFF = 0.85
+
+_TOKEN_RE = re.compile(r"[\w'ʼ’-]+")
+
+
+def normalize_address(address: str) -> str:
+    """
+    Нормалізована адреса для ключів кешу: нижній регістр, без розділових знаків,
+    з розгорнутими скороченнями і без назви міста/країни.
+    """
+    tokens = []
+    for token in _TOKEN_RE.findall((address or "").lower().replace("’", "ʼ").replace("'", "ʼ")):
+        token = _ABBREVIATIONS.get(token, token)
+        if token not in _PLACE_WORDS:
+            tokens.append(token)
+    return " ".join(tokens)
+
+
+def _street_key(text: str) -> str:
+    # Назва без типу вулиці; порядок слів не важливий
+    return " ".join(sorted(t for t in text.split() if t not in _STREET_TYPES))
+
+
+def _is_house_number(token: str) -> bool:
+    return token[0].isdigit() and not token.endswith(("-й", "-а", "-ша", "-га", "-тя", "-та", "-ма"))
+
+
+class Gazetteer:
+    """
+    Локальний довідник вулиць із назв ребер знімка графа (колонка name):
+    - для кожної назви — точка на вулиці, найближча до медіани середин її ребер
+    - пошук за нормалізованою назвою без типу вулиці й номера будинку,
+      а якщо точного збігу немає — найближча назва (difflib)
+
+    Номери будинків не розрізняються: адреса прив'язується до вулиці.
+    """
+    def __init__(self, snapshot):
+        names = np.asarray(snapshot.name)
+        mask = names >= 0
+        edges = np.nonzero(mask)[0]
+        x, y = np.asarray(snapshot.node_x), np.asarray(snapshot.node_y)
+        sources, targets = np.asarray(snapshot.sources)[edges], np.asarray(snapshot.targets)[edges]
+        mid_x = (x[sources] + x[targets]) / 2
+        mid_y = (y[sources] + y[targets]) / 2
+
+        # Групування ребер за назвою
+        order = np.argsort(names[edges], kind="stable")
+        codes = names[edges][order]
+        bounds = np.flatnonzero(np.diff(codes)) + 1
+        self.streets = {}
+        for group in np.split(order, bounds):
+            if not len(group):
+                continue
+            gx, gy = mid_x[group], mid_y[group]
+            best = int(np.argmin(np.hypot(gx - np.median(gx), gy - np.median(gy))))
+            key = _street_key(normalize_address(snapshot.strings[int(names[edges][group[0]])]))
+            if key:
+                self.streets.setdefault(key, [float(gx[best]), float(gy[best])])
+        self._keys = list(self.streets)
+
+    def __len__(self) -> int:
+        return len(self.streets)
+
+# Координати [lon, lat] вулиці з адреси або None
+    def lookup(self, address: str):
+        tokens = normalize_address(address).split()
+        # Номер будинку (і все після нього) відкидається
+        for i, token in enumerate(tokens):
+            if i > 0 and _is_house_number(token):
+                tokens = tokens[:i]
+                break
+        key = _street_key(" ".join(tokens))
+        if not key:
+            return None
+
+        coords = self.streets.get(key)
+        if coords is None:
+            match = difflib.get_close_matches(key, self._keys, n=1, cutoff=FUZZY_CUTOFF)
+            if not match:
+                return None
+            coords = self.streets[match[0]]
+        return list(coords)
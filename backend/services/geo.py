@@ -0,0 +1,62 @@
+import math
+import numpy as np
+
+EARTH_RADIUS_M = 6_371_008.8
+
+
+def haversine_m(lon1, lat1, lon2, lat2):
+    """
+    Відстань по великому колу в метрах (працює як зі скалярами, так і з масивами NumPy).
+    """
+    lon1, lat1, lon2, lat2 = map(np.radians, (lon1, lat1, lon2, lat2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def haversine_point_m(lon1: float, lat1: float, lon2: float, lat2: float) -> float:
+    """
+    Те саме для однієї пари точок (float): без накладних витрат NumPy на скалярах.
+    """
+    lat1, lat2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(min(a, 1.0)))
+
+
+class LocalProjection:
+    """
+    Локальна рівнопроміжна проєкція (метри) навколо опорної точки.
+    Для масштабу міста похибка — частки відсотка, на відміну від «* 111000» для градусів.
+    """
+    def __init__(self, lon0: float, lat0: float):
+        self.lon0 = float(lon0)
+        self.lat0 = float(lat0)
+        self.kx = np.radians(1.0) * EARTH_RADIUS_M * np.cos(np.radians(self.lat0))
+        self.ky = np.radians(1.0) * EARTH_RADIUS_M
+
+    @classmethod
+    def around(cls, lons, lats) -> "LocalProjection":
+        lons, lats = np.asarray(lons), np.asarray(lats)
+        return cls((lons.min() + lons.max()) / 2, (lats.min() + lats.max()) / 2)
+
+# (lon, lat) -> (x, y) у метрах
+    def forward(self, lons, lats):
+        return (np.asarray(lons) - self.lon0) * self.kx, (np.asarray(lats) - self.lat0) * self.ky
+
+# (x, y) у метрах -> (lon, lat)
+    def inverse(self, xs, ys):
+        return np.asarray(xs) / self.kx + self.lon0, np.asarray(ys) / self.ky + self.lat0
+
+
+def point_segment_distance(px, py, ax, ay, bx, by):
+    """
+    Векторизована відстань від точок до відрізків (у проєкційних координатах).
+    Повертає (відстань, параметр t у [0, 1] проєкції точки на відрізок).
+    """
+    dx, dy = bx - ax, by - ay
+    seg_len2 = dx * dx + dy * dy
+    with np.errstate(invalid="ignore", divide="ignore"):
+        t = ((px - ax) * dx + (py - ay) * dy) / seg_len2
+    t = np.clip(np.nan_to_num(t, nan=0.0), 0.0, 1.0)
+    cx, cy = ax + t * dx, ay + t * dy
+    return np.hypot(px - cx, py - cy), t
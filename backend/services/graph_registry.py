@@ -0,0 +1,212 @@
+import os
+import threading
+from services.graph_service import load_kyiv_snapshot
+from services.graph_snapshot import GraphSnapshot
+from services.routing_core import RoutingEngine
+from services.contraction import ContractionHierarchy, hierarchy_path
+from services.spatial_index import GraphSpatialIndex
+from services.edge_weights import EdgeWeights
+from services.landmarks import Landmarks, landmarks_path
+from services.speed_profiles import SpeedProfiles, TimeDependentSpeeds, speed_profiles_path
+
+
+class GraphRegistry:
+    """
+    Реєстр графів на рівні процесу:
+    - відкриває бінарний знімок графа (mmap) лише один раз
+      (GraphML розбирається тільки для компіляції знімка)
+    - граф NetworkX не відновлюється: маршрутизатори й API працюють лише зі знімком
+    - ваги ребер сюди не записуються: спільні лише векторизовані колонки ваг (EdgeWeights),
+      а кожен маршрутизатор тримає власний профіль ваг для своєї витрати пального
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshots = {}
+        self._engines = {}
+        self._hierarchies = {}
+        self._spatial_indexes = {}
+        self._edge_weights = {}
+        self._landmarks = {}
+        self._speeds = {}
+
+# Повертає спільний знімок графа (масиви NumPy)
+    def snapshot(self, filepath: str = None) -> GraphSnapshot:
+        snapshot = self._snapshots.get(filepath)
+        if snapshot is not None:
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshots.get(filepath)
+            if snapshot is None:
+                snapshot = load_kyiv_snapshot(filepath)
+                self._snapshots[filepath] = snapshot
+        return snapshot
+
+# Повертає спільне ядро пошуку на масивах CSR
+    def engine(self, filepath: str = None) -> RoutingEngine:
+        engine = self._engines.get(filepath)
+        if engine is not None:
+            return engine
+
+        snapshot = self.snapshot(filepath)
+        with self._lock:
+            engine = self._engines.get(filepath)
+            if engine is None:
+                engine = RoutingEngine(snapshot)
+                self._engines[filepath] = engine
+        return engine
+
+# Повертає просторовий індекс вузлів і ребер (будується один раз)
+    def spatial_index(self, filepath: str = None) -> GraphSpatialIndex:
+        index = self._spatial_indexes.get(filepath)
+        if index is not None:
+            return index
+
+        snapshot = self.snapshot(filepath)
+        with self._lock:
+            index = self._spatial_indexes.get(filepath)
+            if index is None:
+                index = GraphSpatialIndex(snapshot)
+                self._spatial_indexes[filepath] = index
+        return index
+
+# Повертає векторизовані колонки ваг ребер (рахуються один раз на знімок)
+    def edge_weights(self, filepath: str = None) -> EdgeWeights:
+        weights = self._edge_weights.get(filepath)
+        if weights is not None:
+            return weights
+
+        snapshot = self.snapshot(filepath)
+        with self._lock:
+            weights = self._edge_weights.get(filepath)
+            if weights is None:
+                weights = EdgeWeights(snapshot)
+                self._edge_weights[filepath] = weights
+        return weights
+
+# Повертає Contraction Hierarchies для метрики або None, якщо її не побудовано
+    def hierarchy(self, metric: str, filepath: str = None):
+        key = (filepath, metric)
+        ch = self._hierarchies.get(key)
+        if ch is not None:
+            return ch
+
+        snapshot = self.snapshot(filepath)
+        path = hierarchy_path(snapshot.path, metric)
+        if not os.path.isdir(path):
+            return None
+        with self._lock:
+            ch = self._hierarchies.get(key)
+            if ch is None:
+                print(f"Завантаження CH для метрики '{metric}': {path}")
+                ch = ContractionHierarchy.load(path)
+                if not ch.matches(snapshot):
+                    print(f"CH для метрики '{metric}' застаріла — потрібна перебудова")
+                    return None
+                self._hierarchies[key] = ch
+        return ch
+
+# Повертає орієнтири ALT або None, якщо їх не побудовано чи вони застарілі
+    def landmarks(self, filepath: str = None):
+        landmarks = self._landmarks.get(filepath)
+        if landmarks is not None:
+            return landmarks
+
+        snapshot = self.snapshot(filepath)
+        path = landmarks_path(snapshot.path)
+        if not os.path.isdir(path):
+            return None
+        with self._lock:
+            landmarks = self._landmarks.get(filepath)
+            if landmarks is None:
+                print(f"Завантаження орієнтирів ALT: {path}")
+                landmarks = Landmarks.load(path)
+                if not landmarks.matches(snapshot):
+                    print("Орієнтири ALT застарілі — потрібна перебудова")
+                    return None
+                self._landmarks[filepath] = landmarks
+        return landmarks
+
+# Повертає залежні від часу швидкості: профілі зі знімка або вбудовані за класами доріг
+    def speeds(self, filepath: str = None) -> TimeDependentSpeeds:
+        speeds = self._speeds.get(filepath)
+        if speeds is not None:
+            return speeds
+
+        snapshot = self.snapshot(filepath)
+        weights = self.edge_weights(filepath)
+        path = speed_profiles_path(snapshot.path)
+        with self._lock:
+            speeds = self._speeds.get(filepath)
+            if speeds is None:
+                if os.path.isfile(path):
+                    print(f"Завантаження профілів швидкості: {path}")
+                    profiles = SpeedProfiles.load(path)
+                else:
+                    profiles = SpeedProfiles.default(snapshot.highway_classes)
+                speeds = TimeDependentSpeeds(snapshot, weights, profiles)
+                self._speeds[filepath] = speeds
+        return speeds
+
+# Скидає завантажені графи (наприклад, після оновлення файлу)
+    def clear(self) -> None:
+        with self._lock:
+            self._snapshots.clear()
+            self._engines.clear()
+            self._hierarchies.clear()
+            self._spatial_indexes.clear()
+            self._edge_weights.clear()
+            self._landmarks.clear()
+            self._speeds.clear()
+
+
+registry = GraphRegistry()
+
+
+def get_snapshot(filepath: str = None) -> GraphSnapshot:
+    """
+    Повертає спільний для всього процесу бінарний знімок графа Києва.
+    """
+    return registry.snapshot(filepath)
+
+
+def get_engine(filepath: str = None) -> RoutingEngine:
+    """
+    Повертає спільне для всього процесу ядро пошуку маршрутів.
+    """
+    return registry.engine(filepath)
+
+
+def get_hierarchy(metric: str, filepath: str = None):
+    """
+    Повертає спільну для процесу Contraction Hierarchies для метрики (або None).
+    """
+    return registry.hierarchy(metric, filepath)
+
+
+def get_spatial_index(filepath: str = None) -> GraphSpatialIndex:
+    """
+    Повертає спільний для процесу просторовий індекс для прив'язки координат до графа.
+    """
+    return registry.spatial_index(filepath)
+
+
+def get_edge_weights(filepath: str = None) -> EdgeWeights:
+    """
+    Повертає спільні для процесу колонки ваг ребер (профілі кешуються за витратою пального).
+    """
+    return registry.edge_weights(filepath)
+
+
+def get_landmarks(filepath: str = None):
+    """
+    Повертає спільні для процесу орієнтири ALT (або None, якщо їх не побудовано).
+    """
+    return registry.landmarks(filepath)
+
+
+def get_speeds(filepath: str = None) -> TimeDependentSpeeds:
+    """
+    Повертає спільні для процесу залежні від часу швидкості ребер.
+    """
+    return registry.speeds(filepath)
@@ -1,9 +1,11 @@
 import os
 import osmnx as ox
 import networkx as nx
+from services.graph_snapshot import GraphSnapshot, compile_snapshot, is_stale
 
 GRAPHML_DIR = "data"
 GRAPHML_FILENAME = "kyiv_with_poi.graphml"
+SNAPSHOT_SUFFIX = ".snapshot"
 
 def load_kyiv_graph(filepath: str = None) -> nx.MultiDiGraph:
     """
@@ -22,4 +24,28 @@ def load_kyiv_graph(filepath: str = None) -> nx.MultiDiGraph:
         ox.save_graphml(G, filepath)
         print(f"Граф збережено в {filepath}")
         return G
-    
\ No newline at end of file
+
+
+def snapshot_path_for(graphml_path: str) -> str:
+    """
+    Каталог бінарного знімка поруч із GraphML: data/kyiv_with_poi.snapshot
+    """
+    return os.path.splitext(graphml_path)[0] + SNAPSHOT_SUFFIX
+
+
+def load_kyiv_snapshot(filepath: str = None) -> GraphSnapshot:
+    """
+    Завантажує бінарний знімок графа (через mmap). Якщо знімка немає або
+    GraphML новіший — компілює знімок із GraphML один раз і зберігає його.
+    """
+    if filepath is None:
+        filepath = os.path.join(GRAPHML_DIR, GRAPHML_FILENAME)
+    snapshot_path = snapshot_path_for(filepath)
+
+    if is_stale(snapshot_path, filepath):
+        G = load_kyiv_graph(filepath)
+        print(f"Компіляція знімка графа: {snapshot_path}")
+        compile_snapshot(G, source=filepath).save(snapshot_path)
+
+    print(f"Завантаження знімка графа: {snapshot_path}")
+    return GraphSnapshot.load(snapshot_path)
@@ -0,0 +1,289 @@
+import os
+import sys
+import json
+import time
+import numpy as np
+import networkx as nx
+
+SNAPSHOT_FORMAT_VERSION = 1
+META_FILENAME = "meta.json"
+
+# Масиви знімка: ім'я файлу -> тип даних
+ARRAY_DTYPES = {
+    "node_osmid": np.int64,
+    "node_x": np.float64,
+    "node_y": np.float64,
+    "offsets": np.int64,
+    "sources": np.int32,
+    "targets": np.int32,
+    "edge_key": np.int32,
+    "length": np.float64,
+    "highway": np.uint8,
+    "poi_count": np.int32,
+    "name": np.int32,
+    "ref": np.int32,
+    "geom_offsets": np.int64,
+    "geom_x": np.float64,
+    "geom_y": np.float64,
+}
+
+
+class GraphSnapshot:
+    """
+    Скомпільований знімок графа у вигляді масивів NumPy:
+    - вузли: node_osmid, node_x, node_y (індекс вузла — позиція в масиві)
+    - суміжність у форматі CSR: offsets[i]:offsets[i + 1] — вихідні ребра вузла i,
+      sources/targets — індекси кінців ребра, edge_key — ключ паралельного ребра
+    - колонки ребер: length (м), highway (код класу дороги), poi_count,
+      name/ref (індекс у таблиці рядків, -1 якщо відсутній)
+    - геометрія ребер: geom_offsets[e]:geom_offsets[e + 1] — точки у geom_x/geom_y
+    - додаткові колонки ребер (meta["extra_columns"]), наприклад лічильники POI за категоріями
+
+    Кожен масив зберігається окремим .npy-файлом, тому знімок можна відкрити
+    через mmap, і кілька воркерів спільно використовують ті самі сторінки пам'яті.
+    """
+    def __init__(self, arrays: dict, meta: dict, path: str = None):
+        self.path = path
+        self.meta = meta
+        self.highway_classes = meta["highway_classes"]
+        self.strings = meta["strings"]
+        for name in ARRAY_DTYPES:
+            setattr(self, name, arrays[name])
+        self.extra_columns = {name: arrays[name] for name in meta.get("extra_columns", [])}
+        self._index = None
+        self._reverse = None
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.node_osmid)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.targets)
+
+# Відображення osmid -> індекс вузла (будується при першому зверненні)
+    def index_of(self, osmid) -> int:
+        if self._index is None:
+            self._index = {int(n): i for i, n in enumerate(self.node_osmid.tolist())}
+        return self._index[int(osmid)]
+
+# Зворотна суміжність: rev_edges[rev_offsets[v]:rev_offsets[v + 1]] — ребра, що входять у v
+    def reverse_csr(self):
+        if self._reverse is None:
+            targets = np.asarray(self.targets)
+            rev_offsets = np.zeros(self.num_nodes + 1, dtype=np.int64)
+            np.cumsum(np.bincount(targets, minlength=self.num_nodes), out=rev_offsets[1:])
+            rev_edges = np.argsort(targets, kind="stable").astype(np.int64)
+            self._reverse = (rev_offsets, rev_edges)
+        return self._reverse
+
+# Назва класу дороги для ребра
+    def highway_of(self, edge: int) -> str:
+        return self.highway_classes[self.highway[edge]]
+
+# Рядок із таблиці рядків (назва вулиці або ref)
+    def string(self, idx: int):
+        return self.strings[idx] if idx >= 0 else None
+
+# Зберігає знімок у каталог (кожен масив — окремий .npy)
+    def save(self, path: str) -> None:
+        os.makedirs(path, exist_ok=True)
+        for name in ARRAY_DTYPES:
+            np.save(os.path.join(path, f"{name}.npy"), getattr(self, name))
+        for name, values in self.extra_columns.items():
+            np.save(os.path.join(path, f"{name}.npy"), values)
+        # meta.json пишеться останнім: його наявність означає, що знімок повний
+        self.path = path
+        self._write_meta()
+
+    def _write_meta(self) -> None:
+        tmp = os.path.join(self.path, META_FILENAME + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.meta, f, ensure_ascii=False)
+        os.replace(tmp, os.path.join(self.path, META_FILENAME))
+
+# Колонка ребер за назвою (основна або додаткова)
+    def column(self, name: str) -> np.ndarray:
+        if name in ARRAY_DTYPES:
+            return getattr(self, name)
+        return self.extra_columns[name]
+
+# Замінює колонку ребер і записує її у каталог знімка
+    def write_column(self, name: str, values) -> None:
+        """
+        Файл замінюється атомарно (тимчасовий файл + os.replace), тому процеси,
+        які вже відкрили знімок через mmap, дочитують стару версію без помилок.
+        """
+        values = np.asarray(values, dtype=ARRAY_DTYPES.get(name, np.int32))
+        if len(values) != self.num_edges:
+            raise ValueError(f"Колонка '{name}': {len(values)} значень замість {self.num_edges}")
+        if name in ARRAY_DTYPES:
+            setattr(self, name, values)
+        else:
+            self.extra_columns[name] = values
+            self.meta["extra_columns"] = sorted(self.extra_columns)
+        self.meta.setdefault("columns_updated", {})[name] = time.time()
+        if self.path is None:
+            return
+        tmp = os.path.join(self.path, f"{name}.tmp.npy")
+        np.save(tmp, values)
+        os.replace(tmp, os.path.join(self.path, f"{name}.npy"))
+        self._write_meta()
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "GraphSnapshot":
+        with open(os.path.join(path, META_FILENAME), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"Непідтримувана версія знімка: {meta.get('format_version')}")
+
+        mmap_mode = "r" if mmap else None
+        arrays = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+            for name in list(ARRAY_DTYPES) + meta.get("extra_columns", [])
+        }
+        return cls(arrays, meta, path)
+
+
+def _first(value):
+    """GraphML-атрибути OSMnx можуть бути списками — беремо перше значення."""
+    if isinstance(value, list):
+        return value[0] if value else None
+    return value
+
+
+def _to_int(value) -> int:
+    try:
+        return int(float(_first(value)))
+    except (TypeError, ValueError):
+        return 0
+
+
+def compile_snapshot(G: nx.MultiDiGraph, source: str = None) -> GraphSnapshot:
+    """
+    Компілює граф NetworkX у масиви знімка. Петлі (u == v) відкидаються.
+    """
+    nodes = list(G.nodes)
+    index = {n: i for i, n in enumerate(nodes)}
+    node_x = np.array([float(G.nodes[n]["x"]) for n in nodes], dtype=np.float64)
+    node_y = np.array([float(G.nodes[n]["y"]) for n in nodes], dtype=np.float64)
+
+    highway_classes = [""]
+    highway_codes = {"": 0}
+    strings = []
+    string_codes = {}
+
+    def string_code(value):
+        value = _first(value)
+        if value is None or value == "":
+            return -1
+        value = str(value)
+        if value not in string_codes:
+            string_codes[value] = len(strings)
+            strings.append(value)
+        return string_codes[value]
+
+    edges = []
+    for u, v, k, data in G.edges(keys=True, data=True):
+        if u == v:
+            continue
+        highway = str(_first(data.get("highway", "")) or "")
+        if highway not in highway_codes:
+            highway_codes[highway] = len(highway_classes)
+            highway_classes.append(highway)
+        geometry = data.get("geometry")
+        coords = list(geometry.coords) if geometry is not None else []
+        edges.append((
+            index[u], index[v], k,
+            float(_first(data.get("length", 1.0)) or 1.0),
+            highway_codes[highway],
+            _to_int(data.get("poi_count", 0)),
+            string_code(data.get("name")),
+            string_code(data.get("ref")),
+            coords,
+        ))
+
+    # Сортування за вихідним вузлом дає CSR-порядок
+    edges.sort(key=lambda e: e[0])
+    num_edges = len(edges)
+
+    sources = np.array([e[0] for e in edges], dtype=np.int32)
+    offsets = np.zeros(len(nodes) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=len(nodes)), out=offsets[1:])
+
+    geom_lengths = np.array([len(e[8]) for e in edges], dtype=np.int64)
+    geom_offsets = np.zeros(num_edges + 1, dtype=np.int64)
+    np.cumsum(geom_lengths, out=geom_offsets[1:])
+    geom_points = [p for e in edges for p in e[8]]
+
+    arrays = {
+        "node_osmid": np.array(nodes, dtype=np.int64),
+        "node_x": node_x,
+        "node_y": node_y,
+        "offsets": offsets,
+        "sources": sources,
+        "targets": np.array([e[1] for e in edges], dtype=np.int32),
+        "edge_key": np.array([e[2] for e in edges], dtype=np.int32),
+        "length": np.array([e[3] for e in edges], dtype=np.float64),
+        "highway": np.array([e[4] for e in edges], dtype=np.uint8),
+        "poi_count": np.array([e[5] for e in edges], dtype=np.int32),
+        "name": np.array([e[6] for e in edges], dtype=np.int32),
+        "ref": np.array([e[7] for e in edges], dtype=np.int32),
+        "geom_offsets": geom_offsets,
+        "geom_x": np.array([p[0] for p in geom_points], dtype=np.float64),
+        "geom_y": np.array([p[1] for p in geom_points], dtype=np.float64),
+    }
+
+    meta = {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "created": time.time(),
+        "num_nodes": len(nodes),
+        "num_edges": num_edges,
+        "highway_classes": highway_classes,
+        "strings": strings,
+        "graph": {k: v for k, v in G.graph.items() if isinstance(v, (str, int, float, bool))},
+    }
+    if source is not None and os.path.exists(source):
+        stat = os.stat(source)
+        meta["source"] = {"path": source, "mtime": stat.st_mtime, "size": stat.st_size}
+    return GraphSnapshot(arrays, meta)
+
+
+def convert_graphml(graphml_path: str, snapshot_path: str) -> GraphSnapshot:
+    """
+    Конвертує GraphML у бінарний знімок і зберігає його в каталог snapshot_path.
+    """
+    import osmnx as ox
+
+    print(f"Конвертація {graphml_path} -> {snapshot_path}")
+    G = ox.load_graphml(graphml_path)
+    snapshot = compile_snapshot(G, source=graphml_path)
+    snapshot.save(snapshot_path)
+    print(f"Знімок збережено: {snapshot.num_nodes} вузлів, {snapshot.num_edges} ребер")
+    return snapshot
+
+
+def is_stale(snapshot_path: str, graphml_path: str) -> bool:
+    """
+    Перевіряє, чи знімок відсутній або старіший за вихідний GraphML.
+    """
+    meta_path = os.path.join(snapshot_path, META_FILENAME)
+    if not os.path.exists(meta_path):
+        return True
+    if not os.path.exists(graphml_path):
+        return False
+    with open(meta_path, encoding="utf-8") as f:
+        source = json.load(f).get("source")
+    if source is None:
+        return False
+    stat = os.stat(graphml_path)
+    return stat.st_mtime > source["mtime"] or stat.st_size != source["size"]
+
+
+if __name__ == "__main__":
+    # python -m services.graph_snapshot data/kyiv_with_poi.graphml data/kyiv_with_poi.snapshot
+    if len(sys.argv) != 3:
+        print("Використання: python -m services.graph_snapshot <graphml> <каталог знімка>")
+        sys.exit(1)
+    convert_graphml(sys.argv[1], sys.argv[2])
+    print("Запущені сервери побачать новий знімок (і скинуть кеш маршрутів) після перезапуску")
@@ -0,0 +1,22 @@
+import os
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Розмір пулу з'єднань на хост: не менше за кількість потоків, що одночасно ходять до API
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "16"))
+# Повтори лише для тимчасових помилок сервера і з'єднання
+HTTP_RETRIES = Retry(total=2, connect=2, read=0, backoff_factor=0.3,
+                     status_forcelist=(502, 503, 504), allowed_methods=None)
+
+
+def pooled_session(pool_size: int = HTTP_POOL_SIZE, retries: Retry = HTTP_RETRIES) -> requests.Session:
+    """
+    Сесія requests із keep-alive пулом з'єднань потрібного розміру
+    (за замовчуванням пул на хост — лише 10 з'єднань, зайві відкриваються й закриваються щоразу).
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retries)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
@@ -1,52 +1,154 @@
-import math
+import numpy as np
+from services.route_geometry import path_edges
+from services.graph_registry import get_edge_weights
+
+# Межі кута повороту (градуси) між типами маневрів
+TURN_STRAIGHT = 20
+TURN_SLIGHT = 45
+TURN_NORMAL = 135
+TURN_SHARP = 170
+# Поворот щонайменше на такий кут — окремий крок навіть без зміни вулиці
+MANEUVER_MIN_ANGLE = 60
+
+# Типи маневрів за модулем кута (межі — вище) і текст дії для кожного
+TURN_TYPES = ("straight", "slight", "turn", "sharp", "uturn")
+ACTIONS = {
+    "depart": "Виїжджайте на",
+    "straight": "Продовжуйте прямо на",
+    "slight_right": "Тримайтеся праворуч на",
+    "slight_left": "Тримайтеся ліворуч на",
+    "turn_right": "Поверніть праворуч на",
+    "turn_left": "Поверніть ліворуч на",
+    "sharp_right": "Різко поверніть праворуч на",
+    "sharp_left": "Різко поверніть ліворуч на",
+    "uturn": "Розверніться на",
+}
+UNNAMED_ROAD = "дорогу без назви"
+ARRIVE_TEXT = "Ви прибули до місця призначення"
+
 
 class InstructionGenerator:
     """
-    Генерує покрокові інструкції для маршруту на основі графа OSMnx і списку вузлів.
+    Покрокові інструкції для маршруту за знімком графа, без циклу Python по ребрах:
+    - ребра шляху, їхні назви, довжини й тривалості беруться з колонок знімка масивами
+    - напрямок в'їзду і виїзду з ребра — за його геометрією (перший і останній відрізки),
+      тож кут повороту на перехресті реальний, а не між кінцями вигнутої дороги
+    - кут повороту зі знаком (праворуч додатний) визначає тип маневру: прямо, плавно,
+      поворот, різко, розворот
+    - новий крок — там, де змінюється вулиця або поворот не менший за MANEUVER_MIN_ANGLE
+
+    steps() повертає структуровані кроки, render() — текст для шаблону.
     """
     @staticmethod
-    def compute_bearing(a: tuple, b: tuple) -> float:
-        lat1, lon1 = math.radians(a[0]), math.radians(a[1])
-        lat2, lon2 = math.radians(b[0]), math.radians(b[1])
-        dlon = lon2 - lon1
-        x = math.sin(dlon) * math.cos(lat2)
-        y = math.cos(lat1)*math.sin(lat2) - math.sin(lat1)*math.cos(lat2)*math.cos(dlon)
-        theta = math.degrees(math.atan2(x, y))
-        return (theta + 360) % 360
+    def bearings(lon1, lat1, lon2, lat2) -> np.ndarray:
+        """Азимути (градуси від півночі за годинниковою стрілкою) для масивів точок."""
+        lat1, lat2 = np.radians(lat1), np.radians(lat2)
+        dlon = np.radians(np.asarray(lon2) - np.asarray(lon1))
+        x = np.sin(dlon) * np.cos(lat2)
+        y = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(dlon)
+        return np.degrees(np.arctan2(x, y)) % 360
+
+# Азимути в'їзду на ребра і виїзду з них (за геометрією, якщо вона є)
+    @classmethod
+    def edge_bearings(cls, snapshot, edges: np.ndarray):
+        node_x, node_y = np.asarray(snapshot.node_x), np.asarray(snapshot.node_y)
+        geom_x, geom_y = np.asarray(snapshot.geom_x), np.asarray(snapshot.geom_y)
+        geom_offsets = np.asarray(snapshot.geom_offsets)
+        sources, targets = np.asarray(snapshot.sources)[edges], np.asarray(snapshot.targets)[edges]
+        start, end = geom_offsets[edges], geom_offsets[edges + 1]
+        curved = end - start >= 2
+        # Без геометрії ребро — відрізок між вузлами; індекси-заглушки лише для безпечного доступу
+        first, second = np.where(curved, start, 0), np.where(curved, start + 1, 0)
+        before_last, last = np.where(curved, end - 2, 0), np.where(curved, end - 1, 0)
+
+        def point(geom_index, node, geom, nodes):
+            return np.where(curved, geom[geom_index], nodes[node]) if len(geom) else nodes[node]
+
+        entry = cls.bearings(point(first, sources, geom_x, node_x), point(first, sources, geom_y, node_y),
+                             point(second, targets, geom_x, node_x), point(second, targets, geom_y, node_y))
+        exit_ = cls.bearings(point(before_last, sources, geom_x, node_x), point(before_last, sources, geom_y, node_y),
+                             point(last, targets, geom_x, node_x), point(last, targets, geom_y, node_y))
+        return entry, exit_
+
+    @classmethod
+    def steps(cls, snapshot, path: list, duration=None, edges: list = None) -> list:
+        """
+        Кроки маршруту за списком osmid вузлів:
+        [{"maneuver", "angle", "street", "distance_m", "duration_s", "location": [lon, lat]}, ...].
+        duration — тривалість ребер, с (за замовчуванням — за звичайною швидкістю класу дороги).
+        edges — ребра шляху з пошуку (номери ребер знімка); без них відновлюються за вузлами.
+        Перший крок — "depart", останній — "arrive"; кут — поворот на початку кроку
+        (праворуч додатний).
+        """
+        if len(path) < 2:
+            return []
+        nodes = np.fromiter((snapshot.index_of(n) for n in path), dtype=np.int64, count=len(path))
+        edges = np.asarray(edges, dtype=np.int64) if edges is not None else path_edges(snapshot, nodes)
+
+        # Вулиця ребра: назва, інакше ref (-1 — без назви)
+        names = np.asarray(snapshot.name)[edges]
+        streets = np.where(names >= 0, names, np.asarray(snapshot.ref)[edges])
+
+        # Кут повороту між сусідніми ребрами, (-180, 180]
+        entry, exit_ = cls.edge_bearings(snapshot, edges)
+        angles = np.zeros(len(edges))
+        angles[1:] = 180 - (180 - (entry[1:] - exit_[:-1])) % 360
+
+        # Початки кроків: перше ребро, зміна вулиці, різкий поворот
+        starts = np.flatnonzero(np.r_[True, (streets[1:] != streets[:-1])
+                                      | (np.abs(angles[1:]) >= MANEUVER_MIN_ANGLE)])
+        length = np.asarray(snapshot.length)[edges]
+        if duration is None:
+            duration = get_edge_weights().duration
+        seconds = np.asarray(duration, dtype=np.float64)[edges]
+        distances = np.add.reduceat(length, starts)
+        durations = np.add.reduceat(seconds, starts)
+
+        step_angles = angles[starts]
+        kinds = np.digitize(np.abs(step_angles), (TURN_STRAIGHT, TURN_SLIGHT, TURN_NORMAL, TURN_SHARP))
+        node_x, node_y = np.asarray(snapshot.node_x), np.asarray(snapshot.node_y)
+        at = nodes[starts]
+
+        result = []
+        for i, (kind, angle, street, distance, seconds_, x, y) in enumerate(zip(
+                kinds.tolist(), step_angles.tolist(), streets[starts].tolist(), distances.tolist(),
+                durations.tolist(), node_x[at].tolist(), node_y[at].tolist())):
+            maneuver = TURN_TYPES[kind]
+            if i == 0:
+                maneuver = "depart"
+            elif maneuver not in ("straight", "uturn"):
+                maneuver += "_right" if angle > 0 else "_left"
+            result.append({
+                "maneuver": maneuver,
+                "angle": round(angle),
+                "street": snapshot.string(street),
+                "distance_m": round(distance, 1),
+                "duration_s": round(seconds_, 1),
+                "location": [x, y],
+            })
+        last = int(nodes[-1])
+        result.append({
+            "maneuver": "arrive", "angle": 0, "street": result[-1]["street"],
+            "distance_m": 0.0, "duration_s": 0.0,
+            "location": [float(node_x[last]), float(node_y[last])],
+        })
+        return result
+
+    @staticmethod
+    def render(step: dict) -> str:
+        """Текст кроку: «Поверніть праворуч на вул. X і їдьте 1.2 км»."""
+        if step["maneuver"] == "arrive":
+            return ARRIVE_TEXT
+        text = f"{ACTIONS[step['maneuver']]} {step['street'] or UNNAMED_ROAD}"
+        distance = step["distance_m"]
+        if distance >= 1000:
+            return f"{text} і їдьте {distance / 1000:.1f} км"
+        return f"{text} і їдьте {max(round(distance, -1), 10):.0f} м"
 
     @classmethod
-    def generate(cls, G, path: list) -> list:
-        # Групування ребер за назвою дороги
-        segments = []
-        prev_name = None
-        seg_edges = []
-        for u, v in zip(path[:-1], path[1:]):
-            data = G.get_edge_data(u, v, 0) or {}
-            name = data.get("name") or data.get("ref") or "невідомій дорозі"
-            if name != prev_name and prev_name is not None:
-                segments.append((prev_name, seg_edges))
-                seg_edges = []
-            seg_edges.append((u, v))
-            prev_name = name
-        segments.append((prev_name, seg_edges))
-
-        # Генерація тексту
-        instructions = []
-        prev_bearing = None
-        for idx, (road_name, edges) in enumerate(segments):
-            u0, v0 = edges[0]
-            a = (G.nodes[u0]["y"], G.nodes[u0]["x"])
-            b = (G.nodes[v0]["y"], G.nodes[v0]["x"])
-            bearing = cls.compute_bearing(a, b)
-
-            if idx == 0:
-                instructions.append(f"Виїжджайте на {road_name}")
-            else:
-                # обчислити різницю кутів
-                diff = (bearing - prev_bearing + 360) % 360
-                turn = "праворуч" if diff < 180 else "ліворуч"
-                instructions.append(f"Поверніть {turn} на {road_name}")
-
-            prev_bearing = bearing
-
-        return instructions
+    def generate(cls, snapshot, path: list, duration=None, edges: list = None) -> list:
+        """Кроки з текстом ("text") — для шаблону і JSON API."""
+        steps = cls.steps(snapshot, path, duration, edges)
+        for step in steps:
+            step["text"] = cls.render(step)
+        return steps
@@ -0,0 +1,186 @@
+import os
+import threading
+import numpy as np
+import shapely
+from shapely.geometry import mapping
+from services.cache_store import LRUCache
+from services.distance_matrix import MATRIX_UNITS
+from services.geo import LocalProjection
+from services.route_cache import graph_version
+from services.routers.dijkstra_router import DijkstraFuelRouter
+
+ISOCHRONE_CACHE_SIZE = int(os.getenv("ISOCHRONE_CACHE_SIZE", "256"))
+ISOCHRONE_CACHE_TTL = 3600
+MAX_THRESHOLDS = 10
+# Розмір клітинки сітки полігона, м
+DEFAULT_CELL_M = 100
+MIN_CELL_M, MAX_CELL_M = 25, 1000
+# Дірки, менші за стільки клітинок, заповнюються (двори, квартали без доріг)
+MAX_HOLE_CELLS = 16
+
+
+class Isochrone:
+    """
+    Досяжність від точки за метрикою маршрутизаторів (час, пальне, довжина, POI):
+    - один пошук Дейкстри «один до всіх», обмежений найбільшим порогом, відповідає
+      на всі пороги одразу; ваги — ті самі, що в DijkstraFuelRouter (витрата авто, затори)
+    - результат пошуку кешується за (вузол старту, метрика, витрата, версії графа і заторів);
+      запит із меншими порогами використовує вже збережений пошук
+    - полігон — об'єднання клітинок сітки, через які проходять досяжні вузли і досяжні
+      частини ребер (ребро, на яке бюджету вистачає частково, враховується до точки,
+      де бюджет закінчується); малі дірки заповнюються, межа спрощується
+
+    Пороги задаються в одиницях метрики (MATRIX_UNITS: с, л, м).
+    """
+    def __init__(self, router: DijkstraFuelRouter, metric: str = "duration_weight"):
+        if metric not in MATRIX_UNITS:
+            raise ValueError(f"Невідома метрика: {metric}")
+        self.router = router
+        self.metric = metric
+        self.snapshot = router.snapshot
+        self.weights = router.metric_weights(metric)
+
+    @property
+    def units(self) -> str:
+        return MATRIX_UNITS[self.metric]
+
+    def _cache_key(self, origin: int) -> tuple:
+        return (int(origin), self.metric, round(float(self.router.avg_consumption), 3),
+                graph_version(self.snapshot), self.router.traffic.version)
+
+# Відстані до всіх вузлів у межах limit (масив NumPy, inf — недосяжні)
+    def distances(self, origin: int, limit: float) -> np.ndarray:
+        cache = get_isochrone_cache()
+        key = self._cache_key(origin)
+        cached = cache.get(key)
+        if cached is not None and cached[0] >= limit:
+            return cached[1]
+        dist = np.asarray(self.router.engine.shortest_distances(origin, self.weights, limit=limit))
+        cache.set(key, (limit, dist))
+        return dist
+
+    def compute(self, origin: int, thresholds: list, cell_m: float = DEFAULT_CELL_M,
+                with_nodes: bool = False) -> list:
+        """
+        Для кожного порогу (за зростанням): {"threshold", "reachable_nodes", "polygon" (GeoJSON),
+        "area_km2", і за with_nodes — "nodes" (osmid) та "costs"}.
+        """
+        thresholds = sorted(float(t) for t in thresholds)
+        dist = self.distances(origin, thresholds[-1])
+        snapshot = self.snapshot
+        node_x, node_y = np.asarray(snapshot.node_x), np.asarray(snapshot.node_y)
+        projection = LocalProjection(float(node_x[origin]), float(node_y[origin]))
+        x, y = projection.forward(node_x, node_y)
+
+        # Ребра, що виходять із досяжних вузлів (для найбільшого порогу)
+        sources, targets = np.asarray(snapshot.sources), np.asarray(snapshot.targets)
+        reached = np.isfinite(dist)
+        edge_mask = reached[sources]
+        e_src, e_tgt = sources[edge_mask], targets[edge_mask]
+        e_cost = np.asarray(self.weights, dtype=np.float64)[edge_mask]
+        e_len = np.hypot(x[e_tgt] - x[e_src], y[e_tgt] - y[e_src])
+
+        results = []
+        for threshold in thresholds:
+            mask = dist <= threshold
+            with np.errstate(invalid="ignore", divide="ignore"):
+                share = np.clip((threshold - dist[e_src]) / e_cost, 0.0, 1.0)
+            share = np.where(np.isfinite(share), share, 0.0)
+            polygon = _grid_polygon(x[mask], y[mask], x[e_src], y[e_src], x[e_tgt], y[e_tgt],
+                                    e_len * share, share, cell_m)
+            if not polygon.is_empty:
+                polygon = shapely.transform(polygon, lambda c: np.column_stack(projection.inverse(c[:, 0], c[:, 1])))
+            result = {
+                "threshold": threshold,
+                "reachable_nodes": int(mask.sum()),
+                "polygon": mapping(polygon) if not polygon.is_empty else None,
+                "area_km2": round(_area_km2(polygon, projection), 3) if not polygon.is_empty else 0.0,
+            }
+            if with_nodes:
+                nodes = np.flatnonzero(mask)
+                result["nodes"] = np.asarray(snapshot.node_osmid)[nodes].tolist()
+                result["costs"] = dist[nodes].tolist()
+            results.append(result)
+        return results
+
+
+def _grid_polygon(px, py, ax, ay, bx, by, reach_len, share, cell_m):
+    # Точки: досяжні вузли і точки вздовж досяжних частин ребер з кроком не більше клітинки
+    active = reach_len > 0
+    ax, ay, bx, by = ax[active], ay[active], bx[active], by[active]
+    reach_len, share = reach_len[active], share[active]
+    counts = np.ceil(reach_len / cell_m).astype(np.int64) + 1
+    edge_index = np.repeat(np.arange(len(counts)), counts)
+    step = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    t = step / np.maximum(counts - 1, 1)[edge_index] * share[edge_index]
+    xs = np.concatenate([px, ax[edge_index] + (bx - ax)[edge_index] * t])
+    ys = np.concatenate([py, ay[edge_index] + (by - ay)[edge_index] * t])
+    if not len(xs):
+        return shapely.Polygon()
+
+    # Растр клітинок із запасом по краях для морфологічного замикання
+    ix = np.floor(xs / cell_m).astype(np.int64)
+    iy = np.floor(ys / cell_m).astype(np.int64)
+    x0, y0 = ix.min() - 2, iy.min() - 2
+    grid = np.zeros((iy.max() - y0 + 3, ix.max() - x0 + 3), dtype=bool)
+    grid[iy - y0, ix - x0] = True
+    # Замикання 3x3 закриває щілини в одну клітинку; клітинки, що торкаються лише кутами,
+    # з'єднуються явно (інакше об'єднання дає окремі частини MultiPolygon)
+    grid = _bridge_diagonals(~_dilate(~_dilate(grid)))
+
+    # Відрізки рядків замість окремих клітинок: об'єднується в рази менше прямокутників,
+    # у цілих координатах сітки (без похибок округлення)
+    edges = np.diff(np.pad(grid, ((0, 0), (1, 1))).astype(np.int8), axis=1)
+    rows, starts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)
+    merged = shapely.union_all(shapely.box(starts, rows, ends, rows + 1))
+    merged = _fill_holes(merged, MAX_HOLE_CELLS)
+    merged = shapely.transform(merged, lambda c: (c + (x0, y0)) * cell_m)
+    return merged.simplify(cell_m / 2)
+
+
+# Розширення растра на одну клітинку в усі боки (включно з діагоналями)
+def _dilate(grid: np.ndarray) -> np.ndarray:
+    rows = grid.copy()
+    rows[1:] |= grid[:-1]
+    rows[:-1] |= grid[1:]
+    result = rows.copy()
+    result[:, 1:] |= rows[:, :-1]
+    result[:, :-1] |= rows[:, 1:]
+    return result
+
+
+def _bridge_diagonals(grid: np.ndarray) -> np.ndarray:
+    a, b, c, d = grid[:-1, :-1], grid[:-1, 1:], grid[1:, :-1], grid[1:, 1:]
+    main = a & d & ~b & ~c
+    anti = b & c & ~a & ~d
+    grid = grid.copy()
+    grid[:-1, 1:] |= main
+    grid[:-1, :-1] |= anti
+    return grid
+
+
+def _fill_holes(geometry, max_area: float):
+    polygons = shapely.get_parts(geometry)
+    filled = []
+    for polygon in polygons:
+        holes = [ring for ring in polygon.interiors if shapely.Polygon(ring).area > max_area]
+        filled.append(shapely.Polygon(polygon.exterior, holes))
+    return shapely.MultiPolygon(filled) if len(filled) > 1 else filled[0]
+
+
+def _area_km2(polygon, projection: LocalProjection) -> float:
+    projected = shapely.transform(polygon, lambda c: np.column_stack(projection.forward(c[:, 0], c[:, 1])))
+    return projected.area / 1e6
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_isochrone_cache() -> LRUCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LRUCache(maxsize=ISOCHRONE_CACHE_SIZE, ttl=ISOCHRONE_CACHE_TTL)
+    return _cache
@@ -0,0 +1,199 @@
+import os
+import sys
+import json
+import time
+import numpy as np
+from services.edge_weights import EdgeWeights, WEIGHT_MODEL_VERSION
+from services.contraction import REFERENCE_CONSUMPTION
+
+LANDMARKS_FORMAT_VERSION = 1
+LANDMARKS_DIRNAME = "landmarks"
+LANDMARK_METRICS = ["fuel_weight", "length_weight", "duration_weight", "poi_weight"]
+DEFAULT_NUM_LANDMARKS = 16
+# Скільки орієнтирів бере один запит: ті, що дають найкращу оцінку для пари старт-фініш
+ACTIVE_LANDMARKS = 4
+
+INF = float('inf')
+
+
+class Landmarks:
+    """
+    Орієнтири для евристики ALT (A*, Landmarks, Triangle inequality).
+
+    Для кожного орієнтира L і метрики зберігаються відстані d(L, v) (from_<метрика>.npy)
+    та d(v, L) (to_<метрика>.npy) для всіх вузлів — масиви форми (орієнтири, вузли).
+    З нерівності трикутника: d(v, t) >= max(d(L, t) - d(L, v), d(v, L) - d(t, L)).
+
+    fuel_weight зберігається для REFERENCE_CONSUMPTION і масштабується витратою авто.
+    """
+    def __init__(self, nodes: np.ndarray, arrays: dict, meta: dict):
+        self.nodes = nodes
+        self.meta = meta
+        self.metrics = list(meta["metrics"])
+        self._from = {m: arrays[f"from_{m}"] for m in self.metrics}
+        self._to = {m: arrays[f"to_{m}"] for m in self.metrics}
+
+# Чи відповідають орієнтири знімку графа і моделі ваг
+    def matches(self, snapshot) -> bool:
+        return (self.meta.get("num_nodes") == snapshot.num_nodes
+                and self.meta.get("snapshot_created") == snapshot.meta.get("created")
+                and self.meta.get("weight_model") == WEIGHT_MODEL_VERSION)
+
+    @property
+    def count(self) -> int:
+        return len(self.nodes)
+
+# Орієнтири (номери рядків), що дають найбільшу нижню оцінку d(source, target)
+    def active(self, metric: str, source: int, target: int, count: int = ACTIVE_LANDMARKS) -> list:
+        d_from, d_to = self._from[metric], self._to[metric]
+        with np.errstate(invalid="ignore"):
+            bounds = np.maximum(d_from[:, target] - d_from[:, source], d_to[:, source] - d_to[:, target])
+        bounds = np.where(np.isfinite(bounds), bounds, -1.0)
+        return np.argsort(-bounds, kind="stable")[:count].tolist()
+
+# Нижні оцінки d(source, v) і d(v, target) для одного вузла v (функції, лише активні орієнтири)
+    def bounds(self, metric: str, source: int, target: int, avg_consumption: float = 1.0,
+               count: int = ACTIVE_LANDMARKS):
+        """
+        Для всіх вузлів нічого не рахується: пошук A* викликає функції лише для вузлів,
+        до яких дійшов. Оцінка через підмножину орієнтирів теж допустима й узгоджена,
+        лише менш точна.
+        """
+        if metric not in self._from:
+            raise ValueError(f"Орієнтири для метрики '{metric}' не побудовано")
+        d_from, d_to = self._from[metric], self._to[metric]
+        scale = avg_consumption / REFERENCE_CONSUMPTION if metric == "fuel_weight" else 1.0
+        # Рядки — звичайні масиви, а не memmap: item() для скаляра в кілька разів швидший
+        rows = [
+            (np.asarray(d_from[L]), np.asarray(d_to[L]), float(d_from[L, source]), float(d_to[L, source]),
+             float(d_from[L, target]), float(d_to[L, target]))
+            for L in self.active(metric, source, target, count)
+        ]
+
+        # Недосяжні орієнтири (inf або nan) нічого не обмежують
+        def from_source(node: int) -> float:
+            best = 0.0
+            for row_from, row_to, from_s, to_s, _, _ in rows:
+                value = row_from.item(node) - from_s
+                if best < value < INF:
+                    best = value
+                value = to_s - row_to.item(node)
+                if best < value < INF:
+                    best = value
+            return best * scale
+
+        def to_target(node: int) -> float:
+            best = 0.0
+            for row_from, row_to, _, _, from_t, to_t in rows:
+                value = from_t - row_from.item(node)
+                if best < value < INF:
+                    best = value
+                value = row_to.item(node) - to_t
+                if best < value < INF:
+                    best = value
+            return best * scale
+
+        return from_source, to_target
+
+    def save(self, path: str) -> None:
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "nodes.npy"), self.nodes)
+        for metric in self.metrics:
+            np.save(os.path.join(path, f"from_{metric}.npy"), self._from[metric])
+            np.save(os.path.join(path, f"to_{metric}.npy"), self._to[metric])
+        with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(self.meta, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "Landmarks":
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format_version") != LANDMARKS_FORMAT_VERSION:
+            raise ValueError(f"Непідтримувана версія орієнтирів: {meta.get('format_version')}")
+        mmap_mode = "r" if mmap else None
+        nodes = np.load(os.path.join(path, "nodes.npy"))
+        arrays = {}
+        for metric in meta["metrics"]:
+            for prefix in ("from", "to"):
+                name = f"{prefix}_{metric}"
+                arrays[name] = np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+        return cls(nodes, arrays, meta)
+
+
+def landmarks_path(snapshot_path: str) -> str:
+    """
+    Каталог орієнтирів всередині знімка графа: data/kyiv_with_poi.snapshot/landmarks
+    """
+    return os.path.join(snapshot_path, LANDMARKS_DIRNAME)
+
+
+# Вибір орієнтирів «найдальший від уже вибраних» за довжиною (в обидва боки)
+def select_landmarks(engine, weights: list, count: int) -> list:
+    num_nodes = engine.num_nodes
+    if num_nodes == 0:
+        return []
+
+    # Перший орієнтир — найдальший досяжний вузол від довільного стартового
+    start = np.asarray(engine.shortest_distances(0, weights))
+    start[~np.isfinite(start)] = -1.0
+    chosen = [int(np.argmax(start))]
+    nearest = np.full(num_nodes, INF)
+    while len(chosen) < min(count, num_nodes):
+        last = chosen[-1]
+        forward = np.asarray(engine.shortest_distances(last, weights))
+        backward = np.asarray(engine.shortest_distances(last, weights, reverse=True))
+        nearest = np.minimum(nearest, np.minimum(forward, backward))
+        candidates = np.where(np.isfinite(nearest), nearest, -1.0)
+        candidates[chosen] = -1.0
+        best = int(np.argmax(candidates))
+        if candidates[best] <= 0:
+            break
+        chosen.append(best)
+    return chosen
+
+
+def build_landmarks(snapshot, engine, count: int = DEFAULT_NUM_LANDMARKS, metrics: list = None) -> Landmarks:
+    """
+    Офлайн-обчислення відстаней від і до орієнтирів для кожної метрики.
+    """
+    start_time = time.time()
+    metrics = metrics or LANDMARK_METRICS
+    weights = EdgeWeights(snapshot).profile(REFERENCE_CONSUMPTION)
+    nodes = select_landmarks(engine, weights["length_weight"], count)
+
+    arrays = {}
+    for metric in metrics:
+        w = weights[metric]
+        arrays[f"from_{metric}"] = np.array([engine.shortest_distances(L, w) for L in nodes], dtype=np.float64)
+        arrays[f"to_{metric}"] = np.array([engine.shortest_distances(L, w, reverse=True) for L in nodes],
+                                          dtype=np.float64)
+
+    meta = {
+        "format_version": LANDMARKS_FORMAT_VERSION,
+        "metrics": metrics,
+        "num_nodes": snapshot.num_nodes,
+        "snapshot_created": snapshot.meta.get("created"),
+        "weight_model": WEIGHT_MODEL_VERSION,
+        "reference_consumption": REFERENCE_CONSUMPTION,
+        "created": time.time(),
+    }
+    landmarks = Landmarks(np.array(nodes, dtype=np.int32), arrays, meta)
+    elapsed = time.time() - start_time
+    print(f" Орієнтири ALT ({len(nodes)}) для {len(metrics)} метрик побудовано за {elapsed:.1f} с")
+    return landmarks
+
+
+def build_all(count: int = DEFAULT_NUM_LANDMARKS, filepath: str = None) -> None:
+    """
+    Будує орієнтири для всіх метрик і зберігає їх поруч зі знімком графа.
+    """
+    from services.graph_registry import get_snapshot, get_engine
+
+    snapshot = get_snapshot(filepath)
+    landmarks = build_landmarks(snapshot, get_engine(filepath), count)
+    landmarks.save(landmarks_path(snapshot.path))
+
+
+if __name__ == "__main__":
+    # python -m services.landmarks [кількість орієнтирів]
+    build_all(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_NUM_LANDMARKS)
@@ -0,0 +1,316 @@
+import os
+import sys
+import argparse
+import numpy as np
+from multiprocessing import Pool
+from services.geo import point_segment_distance
+from services.poi_index import PoiIndex, build_poi_index, get_poi_index
+from services.spatial_index import GraphSpatialIndex, GridIndex, edge_points
+
+# Колонка ребер -> категорія POI ("key=value" або лише "key" для будь-якого значення)
+DEFAULT_CATEGORIES = {"poi_count": "tourism=museum"}
+BUFFER_M = 500
+
+STATE_FILENAME = "poi_state.npz"
+
+# Менше POI немає сенсу роздавати процесам — запуск пулу дорожчий за підрахунок
+PARALLEL_MIN_POIS = 2000
+# Якщо змінилась більша частка ребер, інкрементальний перерахунок не дає виграшу
+FULL_RECOUNT_SHARE = 0.5
+
+_HASH_X = np.uint64(0x9E3779B97F4A7C15)
+_HASH_Y = np.uint64(0xC2B2AE3D27D4EB4F)
+_HASH_I = np.uint64(0x165667B19E3779F9)
+
+
+class EdgeSegments:
+    """
+    Відрізки геометрії ребер (усіх або підмножини) для підрахунку POI в буфері:
+    bbox кожного відрізка розширено на буфер, тому для точки достатньо однієї клітинки сітки.
+    """
+    def __init__(self, index: GraphSpatialIndex, buffer_m: float = BUFFER_M, edge_mask=None):
+        if edge_mask is None:
+            seg = np.arange(len(index.seg_edge))
+        else:
+            seg = np.flatnonzero(edge_mask[index.seg_edge])
+        self.buffer_m = float(buffer_m)
+        self.num_edges = index.snapshot.num_edges
+        self.edge = index.seg_edge[seg]
+        self.ax, self.ay = index.seg_ax[seg], index.seg_ay[seg]
+        self.bx, self.by = index.seg_bx[seg], index.seg_by[seg]
+        self.grid = GridIndex(
+            np.minimum(self.ax, self.bx) - self.buffer_m, np.minimum(self.ay, self.by) - self.buffer_m,
+            np.maximum(self.ax, self.bx) + self.buffer_m, np.maximum(self.ay, self.by) + self.buffer_m,
+            max(self.buffer_m, 1.0),
+        )
+
+# Ребра, до геометрії яких від точки не більше buffer_m метрів
+    def edges_near(self, x: float, y: float) -> np.ndarray:
+        ids = self.grid.query_bbox(x, y, x, y)
+        if not len(ids):
+            return ids
+        d, _ = point_segment_distance(x, y, self.ax[ids], self.ay[ids], self.bx[ids], self.by[ids])
+        return np.unique(self.edge[ids[d <= self.buffer_m]])
+
+# Кількість точок у буфері кожного ребра
+    def count(self, px, py) -> np.ndarray:
+        counts = np.zeros(self.num_edges, dtype=np.int32)
+        for x, y in zip(np.asarray(px).tolist(), np.asarray(py).tolist()):
+            counts[self.edges_near(x, y)] += 1
+        return counts
+
+
+_worker_segments = None
+
+
+def _init_worker(segments: EdgeSegments) -> None:
+    global _worker_segments
+    _worker_segments = segments
+
+
+def _count_chunk(chunk):
+    return _worker_segments.count(*chunk)
+
+
+def count_points(segments: EdgeSegments, px, py, workers: int = 1) -> np.ndarray:
+    """
+    Підрахунок точок (px, py у проєкції індексу) для кожного ребра.
+    Для великої кількості точок вони діляться між процесами.
+    """
+    px, py = np.asarray(px), np.asarray(py)
+    if workers <= 1 or len(px) < PARALLEL_MIN_POIS:
+        return segments.count(px, py)
+
+    chunks = [(cx, cy) for cx, cy in zip(np.array_split(px, workers * 4), np.array_split(py, workers * 4))]
+    with Pool(workers, initializer=_init_worker, initargs=(segments,)) as pool:
+        return np.sum(pool.map(_count_chunk, chunks), axis=0, dtype=np.int32)
+
+
+def edge_geometry_hash(snapshot) -> np.ndarray:
+    """
+    64-бітний відбиток геометрії кожного ребра (координати округлено до 1e-7°).
+    """
+    pt_edge, pt_local, lons, lats = edge_points(snapshot)
+    qx = np.round(lons * 1e7).astype(np.int64).astype(np.uint64)
+    qy = np.round(lats * 1e7).astype(np.int64).astype(np.uint64)
+    h = (qx * _HASH_X) ^ (qy * _HASH_Y) ^ ((pt_local.astype(np.uint64) + np.uint64(1)) * _HASH_I)
+    starts = np.searchsorted(pt_edge, np.arange(snapshot.num_edges))
+    return np.bitwise_xor.reduceat(h, starts) if len(h) else np.zeros(0, dtype=np.uint64)
+
+
+def category_mask(poi_index: PoiIndex, category: str) -> np.ndarray:
+    if "=" in category:
+        return poi_index.category == category
+    return np.array([r["key"] == category for r in poi_index.records], dtype=bool)
+
+
+def _edge_keys(snapshot) -> np.ndarray:
+    osmid = np.asarray(snapshot.node_osmid)
+    return np.stack([
+        osmid[np.asarray(snapshot.sources)],
+        osmid[np.asarray(snapshot.targets)],
+        np.asarray(snapshot.edge_key, dtype=np.int64),
+    ], axis=1)
+
+
+def load_state(path: str):
+    if not path or not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
+
+
+def save_state(path: str, state: dict) -> None:
+    tmp = path + ".tmp.npz"
+    np.savez(tmp, **state)
+    os.replace(tmp, path)
+
+
+class PoiEnrichment:
+    """
+    Збагачення ребер графа кількістю POI в буфері навколо геометрії:
+    - POI імпортуються один раз у локальний індекс (services.poi_index), без запиту на кожне ребро
+    - кожна категорія записується окремою колонкою ребер
+    - стан попереднього запуску (відбитки геометрії ребер і набір POI) дозволяє
+      перераховувати лише ребра, чия геометрія змінилась або поруч із якими змінились POI
+    """
+    def __init__(self, snapshot, poi_index: PoiIndex, buffer_m: float = BUFFER_M, workers: int = None):
+        self.snapshot = snapshot
+        self.poi_index = poi_index
+        self.buffer_m = float(buffer_m)
+        self.workers = workers or os.cpu_count() or 1
+        self.index = GraphSpatialIndex(snapshot)
+        self.keys = _edge_keys(snapshot)
+        self.geom_hash = edge_geometry_hash(snapshot)
+        self._segments = None
+
+    @property
+    def segments(self) -> EdgeSegments:
+        if self._segments is None:
+            self._segments = EdgeSegments(self.index, self.buffer_m)
+        return self._segments
+
+# POI категорії: ідентифікатори та координати lon/lat
+    def _category_points(self, category: str):
+        mask = category_mask(self.poi_index, category)
+        ids = np.array([r["id"] for r in self.poi_index.records], dtype=str)[mask]
+        lon, lat = self.poi_index.lon[mask], self.poi_index.lat[mask]
+        return ids, lon, lat
+
+# Позиція кожного поточного ребра у попередньому стані (-1 для нових ребер)
+    def _previous_positions(self, state: dict) -> np.ndarray:
+        old = {tuple(k): i for i, k in enumerate(state["edge_keys"].tolist())}
+        return np.array([old.get(tuple(k), -1) for k in self.keys.tolist()], dtype=np.int64)
+
+# Координати POI, що з'явились, зникли або змінили положення (старі й нові позиції)
+    @staticmethod
+    def _changed_points(old_ids, old_lon, old_lat, ids, lon, lat):
+        old = dict(zip(old_ids.tolist(), zip(old_lon.tolist(), old_lat.tolist())))
+        new = dict(zip(ids.tolist(), zip(lon.tolist(), lat.tolist())))
+        points = [p for i, p in old.items() if new.get(i) != p]
+        points += [p for i, p in new.items() if old.get(i) != p]
+        return points
+
+    def _count(self, lon, lat, edge_mask=None) -> np.ndarray:
+        px, py = self.index.projection.forward(lon, lat)
+        if edge_mask is None:
+            return count_points(self.segments, px, py, self.workers)
+        return count_points(EdgeSegments(self.index, self.buffer_m, edge_mask), px, py, self.workers)
+
+# Лічильники для однієї колонки: інкрементально, якщо стан сумісний
+    def _count_column(self, column: str, category: str, state, positions):
+        ids, lon, lat = self._category_points(category)
+        if state is None or f"count__{column}" not in state or str(state[f"category__{column}"]) != category:
+            print(f"  {column} ({category}): повний підрахунок, {len(ids)} POI")
+            return self._count(lon, lat), (ids, lon, lat)
+
+        known = positions >= 0
+        safe = np.where(known, positions, 0)
+        counts = np.where(known, state[f"count__{column}"][safe], 0).astype(np.int32)
+        affected = ~known | (self.geom_hash != state["geom_hash"][safe])
+
+        changed = self._changed_points(
+            state[f"poi_ids__{column}"], state[f"poi_lon__{column}"], state[f"poi_lat__{column}"], ids, lon, lat
+        )
+        if changed:
+            cx, cy = self.index.projection.forward(*np.array(changed).T)
+            for x, y in zip(cx.tolist(), cy.tolist()):
+                affected[self.segments.edges_near(x, y)] = True
+
+        num_affected = int(affected.sum())
+        print(f"  {column} ({category}): змінено POI {len(changed)}, перерахунок ребер {num_affected}")
+        if num_affected > FULL_RECOUNT_SHARE * len(affected):
+            counts = self._count(lon, lat)
+        elif num_affected:
+            counts[affected] = self._count(lon, lat, affected)[affected]
+        return counts, (ids, lon, lat)
+
+    def run(self, categories: dict = None, state_path: str = None, incremental: bool = True) -> dict:
+        """
+        Рахує POI для кожної колонки categories {колонка: категорія}.
+        Повертає {колонка: масив лічильників за індексом ребра знімка}.
+        """
+        categories = categories or DEFAULT_CATEGORIES
+        state = load_state(state_path) if incremental else None
+        if state is not None and float(state["buffer_m"]) != self.buffer_m:
+            state = None
+        positions = self._previous_positions(state) if state is not None else None
+
+        result = {}
+        new_state = {"edge_keys": self.keys, "geom_hash": self.geom_hash, "buffer_m": np.float64(self.buffer_m)}
+        for column, category in categories.items():
+            counts, (ids, lon, lat) = self._count_column(column, category, state, positions)
+            result[column] = counts
+            new_state.update({
+                f"count__{column}": counts,
+                f"category__{column}": np.array(category),
+                f"poi_ids__{column}": ids,
+                f"poi_lon__{column}": lon,
+                f"poi_lat__{column}": lat,
+            })
+        if state_path:
+            save_state(state_path, new_state)
+        return result
+
+
+def _load_poi_index(poi_sources=None) -> PoiIndex:
+    if poi_sources:
+        return build_poi_index(poi_sources)
+    return get_poi_index() or build_poi_index()
+
+
+def enrich_snapshot(snapshot, categories: dict = None, poi_index: PoiIndex = None, buffer_m: float = BUFFER_M,
+                    workers: int = None, incremental: bool = True) -> dict:
+    """
+    Записує лічильники POI у колонки ребер бінарного знімка (на місці, атомарно).
+    """
+    poi_index = poi_index or _load_poi_index()
+    state_path = os.path.join(snapshot.path, STATE_FILENAME) if snapshot.path else None
+    counts = PoiEnrichment(snapshot, poi_index, buffer_m, workers).run(categories, state_path, incremental)
+    for column, values in counts.items():
+        snapshot.write_column(column, values)
+    return counts
+
+
+def enrich_graphml(src: str, dst: str, categories: dict = None, poi_index: PoiIndex = None,
+                   buffer_m: float = BUFFER_M, workers: int = None, incremental: bool = True):
+    """
+    Варіант для GraphML: читає src, додає колонки POI до атрибутів ребер і зберігає dst.
+    """
+    import osmnx as ox
+    from services.graph_snapshot import compile_snapshot
+
+    poi_index = poi_index or _load_poi_index()
+    G = ox.load_graphml(src)
+    snapshot = compile_snapshot(G, source=src)
+    state_path = os.path.splitext(dst)[0] + "." + STATE_FILENAME
+    counts = PoiEnrichment(snapshot, poi_index, buffer_m, workers).run(categories, state_path, incremental)
+
+    values = {column: c.tolist() for column, c in counts.items()}
+    for e, (u, v, k) in enumerate(_edge_keys(snapshot).tolist()):
+        data = G.edges[u, v, k]
+        for column, column_values in values.items():
+            data[column] = column_values[e]
+    # петлі не потрапляють у знімок
+    for u, v, k, data in G.edges(keys=True, data=True):
+        if u == v:
+            for column in values:
+                data[column] = 0
+    ox.save_graphml(G, dst)
+    print(f"Граф із POI збережено в {dst}")
+    return G
+
+
+def _parse_categories(items) -> dict:
+    categories = {}
+    for item in items or []:
+        column, _, category = item.partition(":")
+        if not category:
+            raise ValueError(f"Очікується колонка:категорія, отримано '{item}'")
+        categories[column] = category
+    return categories or dict(DEFAULT_CATEGORIES)
+
+
+if __name__ == "__main__":
+    # python -m services.poi_enrichment [--category poi_count:tourism=museum ...] [--full]
+    # python -m services.poi_enrichment --graphml data/kyiv.graphml data/kyiv_with_poi.graphml
+    parser = argparse.ArgumentParser(description="Підрахунок POI вздовж ребер графа")
+    parser.add_argument("--category", action="append", help="колонка:категорія, напр. poi_historic:historic")
+    parser.add_argument("--buffer", type=float, default=BUFFER_M)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--full", action="store_true", help="перерахувати всі ребра")
+    parser.add_argument("--poi", nargs="*", help="джерела POI (.osm або JSON Overpass) замість data/pois.json")
+    parser.add_argument("--graphml", nargs=2, metavar=("SRC", "DST"), help="збагатити GraphML замість знімка")
+    args = parser.parse_args()
+
+    categories = _parse_categories(args.category)
+    pois = _load_poi_index(args.poi)
+    if args.graphml:
+        enrich_graphml(*args.graphml, categories, pois, args.buffer, args.workers, not args.full)
+        sys.exit(0)
+
+    from services.graph_service import load_kyiv_snapshot
+    snap = load_kyiv_snapshot()
+    enrich_snapshot(snap, categories, pois, args.buffer, args.workers, not args.full)
+    print(f"Колонки POI оновлено у знімку {snap.path}")
+    print("Запущені сервери побачать нові колонки (і скинуть кеш маршрутів) після перезапуску")
@@ -0,0 +1,217 @@
+import os
+import sys
+import glob
+import json
+import threading
+import xml.etree.ElementTree as ET
+import numpy as np
+from services.geo import LocalProjection, point_segment_distance
+from services.spatial_index import GridIndex
+
+POI_INDEX_PATH = os.path.join("data", "pois.json")
+OVERPASS_CACHE_DIR = "cache"
+
+# Теги, що імпортуються в локальний індекс POI
+POI_KEYS = ("tourism", "historic")
+
+CELL_SIZE_M = 250
+# Обмеження розміру матриці «точки × відрізки» при векторизованому обчисленні
+_CHUNK_ELEMENTS = 2_000_000
+
+
+def _element_center(el: dict, node_coords: dict):
+    """Координати (lon, lat) елемента Overpass: вузол, center або центроїд вузлів way."""
+    if "lon" in el and "lat" in el:
+        return el["lon"], el["lat"]
+    if "center" in el:
+        return el["center"]["lon"], el["center"]["lat"]
+    coords = [node_coords[n] for n in el.get("nodes", []) if n in node_coords]
+    if coords:
+        return sum(c[0] for c in coords) / len(coords), sum(c[1] for c in coords) / len(coords)
+    return None
+
+
+def poi_records(elements, node_coords: dict, keys=POI_KEYS) -> list:
+    """Перетворює елементи OSM з тегами keys на записи POI (id, key, value, name, lon, lat)."""
+    records = []
+    for el in elements:
+        tags = el.get("tags") or {}
+        for key in keys:
+            if key not in tags:
+                continue
+            center = _element_center(el, node_coords)
+            if center is None:
+                break
+            records.append({
+                "id": f"{el.get('type', 'node')}/{el.get('id')}",
+                "key": key,
+                "value": tags[key],
+                "name": tags.get("name", "Без назви"),
+                "lon": float(center[0]),
+                "lat": float(center[1]),
+            })
+            break
+    return records
+
+
+def import_overpass_json(paths, keys=POI_KEYS) -> list:
+    """
+    Імпортує POI з відповідей Overpass (JSON), у тому числі з кешу OSMnx.
+    """
+    records = {}
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            continue
+        elements = data.get("elements", [])
+        node_coords = {el["id"]: (el["lon"], el["lat"]) for el in elements if el.get("type") == "node" and "lon" in el}
+        for record in poi_records(elements, node_coords, keys):
+            records[record["id"]] = record
+    return list(records.values())
+
+
+def import_osm_xml(path: str, keys=POI_KEYS) -> list:
+    """
+    Імпортує POI з OSM XML-витягу (.osm). Для way координати — центроїд його вузлів.
+    """
+    node_coords = {}
+    elements = []
+    for _, elem in ET.iterparse(path, events=("end",)):
+        if elem.tag not in ("node", "way", "relation"):
+            continue
+        tags = {t.get("k"): t.get("v") for t in elem.findall("tag")}
+        el = {"type": elem.tag, "id": int(elem.get("id")), "tags": tags}
+        if elem.tag == "node":
+            lon, lat = float(elem.get("lon")), float(elem.get("lat"))
+            node_coords[el["id"]] = (lon, lat)
+            el["lon"], el["lat"] = lon, lat
+        elif elem.tag == "way":
+            el["nodes"] = [int(nd.get("ref")) for nd in elem.findall("nd")]
+        if any(key in tags for key in keys):
+            elements.append(el)
+        elem.clear()
+    return poi_records(elements, node_coords, keys)
+
+
+class PoiIndex:
+    """
+    Локальний просторовий індекс POI:
+    - точки в локальній метричній проєкції, сітка для відбору кандидатів
+    - пошук POI в буфері навколо маршруту з векторизованою відстанню до відрізків
+    """
+    def __init__(self, records: list, cell_size_m: float = CELL_SIZE_M):
+        self.records = records
+        self.lon = np.array([r["lon"] for r in records], dtype=np.float64)
+        self.lat = np.array([r["lat"] for r in records], dtype=np.float64)
+        self.category = np.array([f"{r['key']}={r['value']}" for r in records], dtype=object)
+        if records:
+            self.projection = LocalProjection.around(self.lon, self.lat)
+        else:
+            self.projection = LocalProjection(30.52, 50.45)
+        self.x, self.y = self.projection.forward(self.lon, self.lat)
+        self.grid = GridIndex(self.x, self.y, self.x, self.y, cell_size_m)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+# Кандидати поблизу відрізків (клітинки bbox кожного відрізка, розширені на буфер)
+    def _candidates(self, ax, ay, bx, by, buffer_m: float) -> np.ndarray:
+        chunks = [
+            self.grid.query_bbox(min(x0, x1) - buffer_m, min(y0, y1) - buffer_m,
+                                 max(x0, x1) + buffer_m, max(y0, y1) + buffer_m)
+            for x0, y0, x1, y1 in zip(ax.tolist(), ay.tolist(), bx.tolist(), by.tolist())
+        ]
+        if not chunks:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(chunks))
+
+# Мінімальна відстань від точок до ламаної (векторизовано, частинами)
+    @staticmethod
+    def _distance_to_line(px, py, ax, ay, bx, by) -> np.ndarray:
+        result = np.empty(len(px))
+        step = max(1, _CHUNK_ELEMENTS // max(len(ax), 1))
+        for start in range(0, len(px), step):
+            end = start + step
+            d, _ = point_segment_distance(
+                px[start:end, None], py[start:end, None], ax[None, :], ay[None, :], bx[None, :], by[None, :]
+            )
+            result[start:end] = d.min(axis=1)
+        return result
+
+# POI в межах buffer_m метрів від маршруту [[lon, lat], ...]
+    def query_route(self, route_coords, buffer_m: float = 500, category: str = None) -> list:
+        coords = np.asarray(route_coords, dtype=np.float64).reshape(-1, 2)
+        if len(self) == 0 or len(coords) == 0:
+            return []
+        if len(coords) == 1:
+            coords = np.vstack([coords, coords])
+
+        xs, ys = self.projection.forward(coords[:, 0], coords[:, 1])
+        ax, ay, bx, by = xs[:-1], ys[:-1], xs[1:], ys[1:]
+
+        ids = self._candidates(ax, ay, bx, by, buffer_m)
+        if category is not None and len(ids):
+            ids = ids[self.category[ids] == category]
+        if not len(ids):
+            return []
+
+        distance = self._distance_to_line(self.x[ids], self.y[ids], ax, ay, bx, by)
+        found = ids[distance <= buffer_m]
+        return [
+            {"name": self.records[i]["name"], "lat": self.records[i]["lat"], "lon": self.records[i]["lon"]}
+            for i in found.tolist()
+        ]
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.records, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str) -> "PoiIndex":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+
+def build_poi_index(sources=None, path: str = POI_INDEX_PATH) -> PoiIndex:
+    """
+    Будує індекс POI з OSM-витягів (.osm) або JSON-відповідей Overpass і зберігає його.
+    Без аргументів імпортує кеш Overpass (каталог cache/).
+    """
+    if not sources:
+        sources = sorted(glob.glob(os.path.join(OVERPASS_CACHE_DIR, "*.json")))
+    records = {}
+    for source in sources:
+        if source.endswith(".osm"):
+            imported = import_osm_xml(source)
+        else:
+            imported = import_overpass_json([source])
+        for record in imported:
+            records[record["id"]] = record
+
+    index = PoiIndex(list(records.values()))
+    index.save(path)
+    print(f"Індекс POI збережено: {len(index)} об'єктів -> {path}")
+    return index
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_poi_index(path: str = POI_INDEX_PATH):
+    """
+    Повертає спільний індекс POI або None, якщо локальний індекс ще не побудовано.
+    """
+    global _index
+    with _index_lock:
+        if _index is None and os.path.exists(path):
+            _index = PoiIndex.load(path)
+            print(f"Завантажено індекс POI: {len(_index)} об'єктів")
+    return _index
+
+
+if __name__ == "__main__":
+    # python -m services.poi_index [kyiv.osm | overpass.json ...]
+    build_poi_index(sys.argv[1:])
@@ -1,18 +1,27 @@
-import requests
-from shapely.geometry import LineString, Point
+from services.poi_index import PoiIndex, get_poi_index, poi_records
+from services.http_session import pooled_session
 
 OVERPASS_URL = "https://overpass-api.de/api/interpreter"
+REQUEST_TIMEOUT = 30
+
+_session = pooled_session()
 
 def get_pois_along_route(route_coords, key="tourism", value="museum", buffer_m=500):
     """
     Повертає POI (назви, координати), які знаходяться в межах буфера від маршруту.
+    Спершу використовується локальний індекс POI (python -m services.poi_index),
+    а якщо його немає — запит до Overpass для bbox маршруту.
     """
-    from shapely.geometry import LineString, Point
-    import requests
+    index = get_poi_index()
+    if index is not None:
+        return index.query_route(route_coords, buffer_m, category=f"{key}={value}")
+    return _get_pois_from_overpass(route_coords, key, value, buffer_m)
+
 
-    OVERPASS_URL = "https://overpass-api.de/api/interpreter"
-    line = LineString(route_coords)
-    minlon, minlat, maxlon, maxlat = line.bounds
+def _get_pois_from_overpass(route_coords, key, value, buffer_m):
+    lons = [c[0] for c in route_coords]
+    lats = [c[1] for c in route_coords]
+    minlon, minlat, maxlon, maxlat = min(lons), min(lats), max(lons), max(lats)
 
     query = f"""
     [out:json][timeout:25];
@@ -25,29 +34,14 @@ def get_pois_along_route(route_coords, key="tourism", value="museum", buffer_m=5
     """
 
     try:
-        response = requests.post(OVERPASS_URL, data={"data": query})
+        response = _session.post(OVERPASS_URL, data={"data": query}, timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
         data = response.json()
 
-        pois = []
-
-        for el in data.get("elements", []):
-            if "lon" in el and "lat" in el:
-                point = Point(el["lon"], el["lat"])
-                coords = (el["lat"], el["lon"])
-            elif "center" in el:
-                point = Point(el["center"]["lon"], el["center"]["lat"])
-                coords = (el["center"]["lat"], el["center"]["lon"])
-            else:
-                continue
-
-            if line.distance(point) * 111000 <= buffer_m:
-                name = el.get("tags", {}).get("name", "Без назви")
-                pois.append({"name": name, "lat": coords[0], "lon": coords[1]})
-
-        return pois
+        # Та сама метрична перевірка буфера, що й у локальному індексі
+        records = poi_records(data.get("elements", []), {}, keys=(key,))
+        return PoiIndex(records).query_route(route_coords, buffer_m)
 
     except Exception as e:
         print(f" Помилка при отриманні POI: {e}")
         return []
-
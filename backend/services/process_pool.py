@@ -0,0 +1,21 @@
+import multiprocessing
+
+# Модулі, які сервер forkserver імпортує один раз: робочі процеси успадковують їх готовими
+PRELOAD_MODULES = ["services.aco", "services.distance_matrix"]
+
+
+def get_context():
+    """
+    Контекст multiprocessing для постійних пулів процесів.
+    Сервер багатопотоковий (Flask, пули потоків маршрутизації, стрічка трафіку), а fork
+    копіює процес разом із блокуваннями, захопленими іншими потоками, — дочірній процес
+    може зависнути назавжди. forkserver створює робочі процеси з окремого однопотокового
+    процесу; де його немає (Windows) — spawn. В обох випадках робочий процес повторно
+    імпортує головний модуль як __mp_main__, тож запуск служб на рівні модуля треба
+    пропускати для цього імені (див. app.py).
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(PRELOAD_MODULES)
+        return context
+    return multiprocessing.get_context("spawn")
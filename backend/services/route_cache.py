@@ -0,0 +1,107 @@
+import os
+import threading
+from services.cache_store import LRUCache, SQLiteStore, SingleFlight
+from services.edge_weights import WEIGHT_MODEL_VERSION
+
+ROUTE_CACHE_SIZE = int(os.getenv("ROUTE_CACHE_SIZE", "2048"))
+ROUTE_CACHE_TTL = 24 * 3600
+# Спільний між процесами рівень кешу (SQLite) вмикається шляхом до файлу
+ROUTE_CACHE_PATH = os.getenv("ROUTE_CACHE_PATH", "")
+
+_MISSING = object()
+
+
+def graph_version(snapshot) -> str:
+    """
+    Версія графа для ключів кешу — того знімка, за яким маршрутизує цей процес:
+    змінюється при перезаписі колонок знімка в цьому процесі (write_column) або зміні моделі ваг.
+    Реєстр відкриває знімок один раз, тож перекомпіляція знімка чи перезапис колонок
+    іншим процесом (python -m services.poi_enrichment) не діють ні на маршрути, ні на цю
+    версію до перезапуску сервера. meta.json з диска навмисно не перечитується: інакше
+    результати за старими масивами записувались би в кеш (і в спільний SQLite) під новою версією.
+    """
+    meta = snapshot.meta
+    updated = max((meta.get("columns_updated") or {}).values(), default=0)
+    return f"{meta.get('created')}:{updated}:{WEIGHT_MODEL_VERSION}"
+
+
+class RouteCache:
+    """
+    Кеш готових результатів маршрутизації:
+    - ключ — (вузол старту, вузол фінішу, метрика, витрата пального, версія графа,
+      кількість запитаних маршрутів і, для залежних від часу маршрутів, інтервал часу відправлення),
+      тож різні адреси, що прив'язуються до одних вузлів, поділяють запис
+    - LRU у пам'яті процесу перед необов'язковим спільним сховищем SQLite з TTL
+    - при зміні версії графа кеш у пам'яті очищується, а записи SQLite
+      зі старою версією просто більше не збігаються за ключем; зміни знімка на диску
+      потрапляють у версію лише після перезапуску (див. graph_version)
+    - одночасні однакові запити обчислюються один раз
+    """
+    def __init__(self, maxsize: int = ROUTE_CACHE_SIZE, path: str = ROUTE_CACHE_PATH, ttl: float = ROUTE_CACHE_TTL):
+        self.memory = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.store = SQLiteStore(path, "route_results", ttl=ttl) if path else None
+        self.flight = SingleFlight()
+        self._version = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(origin: int, destination: int, metric: str, avg_consumption: float, version: str,
+            departure_slot: int = None, alternatives: int = 1) -> str:
+        key = f"{version}|{int(origin)}|{int(destination)}|{metric}|{round(float(avg_consumption), 3)}"
+        if alternatives > 1:
+            key = f"{key}|a{int(alternatives)}"
+        return key if departure_slot is None else f"{key}|{int(departure_slot)}"
+
+# Скидає кеш у пам'яті, якщо версія графа змінилась
+    def check_version(self, version: str) -> None:
+        with self._lock:
+            if self._version != version:
+                if self._version is not None:
+                    print("Граф змінився — кеш маршрутів очищено")
+                self.memory.clear()
+                self._version = version
+
+    def get(self, key: str, default=None):
+        value = self.memory.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        if self.store is not None:
+            value = self.store.get(key, _MISSING)
+            if value is not _MISSING:
+                self.memory.set(key, value)
+                return value
+        return default
+
+    def set(self, key: str, value) -> None:
+        self.memory.set(key, value)
+        if self.store is not None:
+            self.store.set(key, value)
+
+# Результат із кешу або обчислений compute() (винятки не кешуються)
+    def get_or_compute(self, key: str, compute):
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            print(" Маршрут узято з кешу")
+            return value
+
+        def compute_and_store():
+            result = compute()
+            self.set(key, result)
+            return result
+
+        return self.flight.do(key, compute_and_store)
+
+    def clear(self) -> None:
+        self.memory.clear()
+
+
+_route_cache = None
+_route_cache_lock = threading.Lock()
+
+
+def get_route_cache() -> RouteCache:
+    global _route_cache
+    with _route_cache_lock:
+        if _route_cache is None:
+            _route_cache = RouteCache()
+    return _route_cache
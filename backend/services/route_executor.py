@@ -0,0 +1,96 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from services.spatial_index import OutsideCoverageError
+
+# Кількість потоків для одночасного запуску груп алгоритмів
+ROUTE_WORKERS = int(os.getenv("ROUTE_WORKERS", "4"))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=ROUTE_WORKERS, thread_name_prefix="route")
+    return _executor
+
+
+class RouteExecutor:
+    """
+    Запуск алгоритмів маршрутизації для одного запиту:
+    - алгоритми поділені на групи; групи виконуються одночасно в пулі потоків
+    - у групах — пари (назва, фабрика): маршрутизатор створюється (ваги, оверлей, орієнтири)
+      лише тоді, коли група до нього дійшла; створені доступні в self.routers за назвою
+    - у групі — алгоритми, що дають той самий (оптимальний за метрикою) шлях,
+      від найшвидшого до найповільнішого: наступний запускається, лише якщо
+      попередній не знайшов шлях або впав, тож надлишкові пошуки не виконуються
+    - однакові шляхи з різних груп залишаються лише один раз
+    - POI та інструкції тут не рахуються: це робиться лише для обраного маршруту
+    """
+    def __init__(self, groups: list):
+        self.groups = groups
+        self.routers = {}
+
+# Результати груп у порядку груп: словники з name, router, route_nodes, edges і метриками
+    def run(self, start_lat: float, start_lon: float, end_lat: float, end_lon: float, route_kwargs) -> list:
+        futures = [
+            _get_executor().submit(self._run_group, group, (start_lat, start_lon, end_lat, end_lon), route_kwargs)
+            for group in self.groups
+        ]
+        results = []
+        seen = set()
+        errors = []
+        for future in futures:
+            try:
+                result = future.result()
+            except OutsideCoverageError:
+                raise
+            except Exception as e:
+                errors.append(e)
+                continue
+            if result is None:
+                continue
+            path = tuple(result["route_nodes"])
+            if path in seen:
+                print(f" {result['name']}: такий самий шлях уже знайдено")
+                continue
+            seen.add(path)
+            results.append(result)
+
+        if not results and errors:
+            raise errors[0]
+        return results
+
+    def _run_group(self, group: list, coords: tuple, route_kwargs):
+        error = None
+        for name, factory in group:
+            start_time = time.time()
+            try:
+                router = factory()
+                self.routers[name] = router
+                route_nodes, distance_km, fuel, duration_hr = router.find_route(*coords, **route_kwargs(name))
+            except OutsideCoverageError:
+                raise
+            except Exception as e:
+                print(f" {name}: помилка {e}")
+                error = e
+                continue
+            if route_nodes:
+                print(f" {name}: dist={distance_km:.2f} km, fuel={fuel:.2f} L, time={duration_hr:.2f} h "
+                      f"({time.time() - start_time:.3f} с)")
+                return {
+                    "name": name,
+                    "router": router,
+                    "route_nodes": route_nodes,
+                    "edges": [int(e) for e in router.route_edges],
+                    "distance_km": distance_km,
+                    "fuel": fuel,
+                    "duration_hr": duration_hr,
+                }
+        if error is not None:
+            raise error
+        return None
@@ -0,0 +1,100 @@
+import numpy as np
+
+# Точність encoded polyline: 5 знаків (Google, Leaflet) або 6 (OSRM, Valhalla)
+POLYLINE_PRECISIONS = (5, 6)
+
+
+def path_edges(snapshot, nodes) -> np.ndarray:
+    """
+    Ребра знімка вздовж шляху з індексів вузлів — запасний варіант, коли ребра маршруту
+    невідомі (наприклад, записи кешу без "edges"). З паралельних ребер береться найкоротше:
+    маршрутизатор за іншою метрикою (пальне, час) міг обрати інше, тож ребра з пошуку
+    (router.route_edges) завжди точніші. Піднімає ValueError, якщо сусідні вузли шляху
+    не з'єднані ребром.
+    """
+    nodes = np.asarray(nodes, dtype=np.int64)
+    if len(nodes) < 2:
+        return np.empty(0, dtype=np.int64)
+    offsets = np.asarray(snapshot.offsets)
+    u, v = nodes[:-1], nodes[1:]
+    # Усі вихідні ребра вузлів шляху одним масивом: (крок шляху, ребро)
+    starts = offsets[u]
+    counts = offsets[u + 1] - starts
+    step = np.repeat(np.arange(len(u)), counts)
+    candidates = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + starts[step]
+    match = np.asarray(snapshot.targets)[candidates] == v[step]
+    step, candidates = step[match], candidates[match]
+    missing = np.setdiff1d(np.arange(len(u)), step)
+    if len(missing):
+        i = int(missing[0])
+        raise ValueError(f"Між вузлами {nodes[i]} і {nodes[i + 1]} немає ребра")
+    # Найкоротше з паралельних ребер: сортування за (крок, довжина), перше в кожному кроці
+    order = np.lexsort((np.asarray(snapshot.length)[candidates], step))
+    step, candidates = step[order], candidates[order]
+    first = np.flatnonzero(np.r_[True, step[1:] != step[:-1]])
+    return candidates[first].astype(np.int64)
+
+
+def path_coordinates(snapshot, osmids: list, full: bool = True, edges: list = None) -> np.ndarray:
+    """
+    Координати шляху масивом (n, 2) у порядку [lon, lat]:
+    - full=False — лише вузли графа
+    - full=True — повна геометрія ребер (вигини доріг між перехрестями);
+      спільна точка двох сусідніх ребер не дублюється
+    edges — ребра шляху з пошуку; без них ребра відновлюються за вузлами (path_edges).
+    """
+    nodes = np.fromiter((snapshot.index_of(n) for n in osmids), dtype=np.int64, count=len(osmids))
+    node_coords = np.column_stack((np.asarray(snapshot.node_x)[nodes], np.asarray(snapshot.node_y)[nodes]))
+    if not full or len(nodes) < 2:
+        return node_coords
+
+    edges = np.asarray(edges, dtype=np.int64) if edges is not None else path_edges(snapshot, nodes)
+    geom_offsets = np.asarray(snapshot.geom_offsets)
+    starts, ends = geom_offsets[edges], geom_offsets[edges + 1]
+    parts = [node_coords[:1]]
+    for i, (start, end) in enumerate(zip(starts.tolist(), ends.tolist())):
+        if end - start >= 2:
+            # Перша точка геометрії збігається з кінцем попереднього ребра
+            parts.append(np.column_stack((snapshot.geom_x[start + 1:end], snapshot.geom_y[start + 1:end])))
+        else:
+            parts.append(node_coords[i + 1:i + 2])
+    return np.concatenate(parts)
+
+
+def encode_polyline(coords, precision: int = 5) -> str:
+    """
+    Encoded polyline (алгоритм Google) для координат [[lon, lat], ...].
+    Рядок у рази коротший за список пар чисел у JSON.
+    """
+    if precision not in POLYLINE_PRECISIONS:
+        raise ValueError(f"Непідтримувана точність polyline: {precision}")
+    points = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    if not len(points):
+        return ""
+    # Формат зберігає пари (lat, lon) як різниці з попередньою точкою
+    scaled = np.round(points[:, ::-1] * 10 ** precision).astype(np.int64)
+    deltas = np.diff(scaled, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+    values = np.where(deltas < 0, ~(deltas << 1), deltas << 1).tolist()
+
+    chunks = []
+    for value in values:
+        while value >= 0x20:
+            chunks.append(chr((0x20 | (value & 0x1f)) + 63))
+            value >>= 5
+        chunks.append(chr(value + 63))
+    return "".join(chunks)
+
+
+def decode_polyline(encoded: str, precision: int = 5) -> list:
+    """Зворотне до encode_polyline: [[lon, lat], ...]."""
+    values = []
+    value = shift = 0
+    for char in encoded:
+        byte = ord(char) - 63
+        value |= (byte & 0x1f) << shift
+        shift += 5
+        if byte < 0x20:
+            values.append(~(value >> 1) if value & 1 else value >> 1)
+            value = shift = 0
+    points = np.cumsum(np.asarray(values, dtype=np.int64).reshape(-1, 2), axis=0) / 10 ** precision
+    return points[:, ::-1].tolist()
@@ -0,0 +1,301 @@
+import os
+import asyncio
+import threading
+from functools import partial
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from api_clients.ors_client import geocode_address
+from services.routers.astar_fuel_router import AStarFuelRouter
+from services.routers.ch_router import CHRouter
+from services.routers.ant_colony_router import AntColonyRouter
+from services.routers.pareto_router import ParetoRouter
+from services.routers.plateau_router import PlateauRouter
+from services.routers.time_dependent_router import TimeDependentRouter
+from services.speed_profiles import week_seconds
+from services.traffic_overlay import get_traffic_overlay
+from services.poi_service import get_pois_along_route
+from services.instruction_service import InstructionGenerator
+from services.route_geometry import path_coordinates
+from services.graph_registry import get_spatial_index, get_snapshot, get_edge_weights, get_hierarchy
+from services.spatial_index import OutsideCoverageError
+from services.route_cache import get_route_cache, graph_version
+from services.route_executor import RouteExecutor
+from services.fuel_api import get_fuel_consumption, DEFAULT_CONSUMPTION
+
+# Тайм-аути етапів запиту, с
+GEOCODE_TIMEOUT = 15
+FUEL_TIMEOUT = 10
+POI_TIMEOUT = 20
+ROUTING_TIMEOUT = 120
+
+# Скільки маршрутів (основний і альтернативи) повертати за замовчуванням і щонайбільше;
+# альтернативи шукаються методом плато, лише якщо їх запитано
+DEFAULT_ALTERNATIVES = 1
+MAX_ALTERNATIVES = 4
+
+# Час відправлення округлюється до інтервалу: маршрути в межах інтервалу поділяють запис кешу
+DEPARTURE_SLOT_SECONDS = 15 * 60
+
+# Потоки для зовнішніх викликів (очікують на мережу) і для обчислення маршрутів
+IO_WORKERS = int(os.getenv("IO_WORKERS", "16"))
+ROUTING_WORKERS = int(os.getenv("ROUTING_WORKERS", "4"))
+# Потоки, що чекають на кеш маршрутів і обчислення запиту; окремий пул, бо обчислення
+# саме ставить задачі в "io" і "routing" — у спільному пулі вони чекали б на власних сусідів
+REQUEST_WORKERS = int(os.getenv("REQUEST_WORKERS", "16"))
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+class RouteError(Exception):
+    """Маршрут не побудовано; повідомлення показується користувачу."""
+
+
+def _get_executor(name: str, workers: int) -> ThreadPoolExecutor:
+    with _executors_lock:
+        executor = _executors.get(name)
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+            _executors[name] = executor
+    return executor
+
+
+# Виклик блокуючої функції в пулі потоків із тайм-аутом
+async def _call(pool: str, timeout: float, fn, *args):
+    executor = _get_executor(pool, IO_WORKERS if pool == "io" else ROUTING_WORKERS)
+    loop = asyncio.get_running_loop()
+    return await asyncio.wait_for(loop.run_in_executor(executor, fn, *args), timeout)
+
+
+# Розрахунок маршруту всіма алгоритмами (CPU); повертає (найкращий маршрут, альтернативи)
+# (departure — час відправлення для залежного від часу пошуку за duration_weight;
+# traffic — стан оверлею заторів запиту, спільний для всіх алгоритмів;
+# alternatives — скільки маршрутів повернути разом з основним)
+def build_routes(car_brand, car_model, car_year, custom_rate, metric, start_coords, end_coords,
+                 departure: datetime = None, traffic=None, alternatives: int = DEFAULT_ALTERNATIVES):
+    if traffic is None:
+        traffic = get_traffic_overlay().view()
+
+    # Фабрики маршрутизаторів: створюються лише ті, до яких дійде виконавець
+    # (витрата відома — без повторних запитів до сервісу пального)
+    def router(cls, **options):
+        return partial(cls, car_brand, car_model, car_year, avg_consumption=custom_rate, traffic=traffic,
+                       **options)
+
+    # Алгоритми в залежності від обраної метрики: у групі — взаємозамінні алгоритми
+    # (той самий оптимальний шлях), від найшвидшого; групи виконуються одночасно
+    if departure is not None and metric == "duration_weight":
+        groups = [[("time_dependent", router(TimeDependentRouter))]]
+    elif metric == "poi_score":
+        groups = [
+            [("ant_colony", router(AntColonyRouter))],
+            [("pareto", router(ParetoRouter))],
+        ]
+    elif alternatives > 1:
+        # Найкоротший маршрут і альтернативи за тією ж метрикою — одна пара пошуків методом плато
+        # (перший маршрут плато — оптимальний); A* — лише якщо плато-пошук упав
+        groups = [[
+            ("plateau", router(PlateauRouter, max_alternatives=alternatives - 1)),
+            ("a_star", router(AStarFuelRouter)),
+        ]]
+    else:
+        # Без альтернатив — лише точний пошук: плато-пошук (два обмежені дерева) у рази повільніший.
+        # Contraction Hierarchies — першою, якщо ієрархію для метрики побудовано і оверлей
+        # не змінює ваги метрики (ієрархія — для базових ваг); інакше двонапрямний A*
+        group = [("a_star", router(AStarFuelRouter))]
+        if get_hierarchy(metric) is not None and not traffic.affects(metric):
+            group.insert(0, ("ch", router(CHRouter)))
+        groups = [group]
+
+    def route_kwargs(name):
+        if name == "time_dependent":
+            return {"weight_type": metric, "departure": departure}
+        return {} if name == "ant_colony" else {"weight_type": metric}
+
+    executor = RouteExecutor(groups)
+    try:
+        results = executor.run(start_coords[1], start_coords[0], end_coords[1], end_coords[0], route_kwargs)
+    except OutsideCoverageError as e:
+        print(f" {e}")
+        raise RouteError("Адреса знаходиться поза зоною покриття карти Києва.")
+    except Exception:
+        raise RouteError("Система не змогла побудувати маршрут. Некоректний ввод даних.")
+
+    snapshot = get_snapshot()
+    for r in results:
+        r["line_coords"] = path_coordinates(snapshot, r["route_nodes"], full=False).tolist()
+
+    # Вибір найкращого маршруту
+    if not results:
+        raise RouteError("Маршрут не знайдено жодним з алгоритмів.")
+
+    if metric == "fuel_weight":
+        best = min(results, key=lambda r: r["fuel"])
+    elif metric == "duration":
+        best = min(results, key=lambda r: r["duration_hr"])
+    elif metric == "poi":
+        best = max(results, key=lambda r: len(get_pois_along_route(r["line_coords"])))
+    else:
+        best = results[0]
+
+    print(f" Обрано: {best['name']}")
+
+    # Альтернативні маршрути: плато за метрикою або фронт Парето для POI
+    # (роутер береться з виконавця: його власний шлях міг бути відкинутий як дублікат)
+    limit, alternatives = alternatives - 1, []
+    for name, instance in executor.routers.items():
+        if name not in ("pareto", "plateau"):
+            continue
+        for alt in instance.alternatives:
+            if alt["nodes"] == best["route_nodes"]:
+                continue
+            alternatives.append({
+                "distance": round(alt["distance_km"], 2),
+                "duration": round(alt["duration_min"], 0),
+                "fuel": round(alt["fuel"], 2),
+                "coordinates": path_coordinates(snapshot, alt["nodes"], full=False).tolist(),
+                "nodes": [int(n) for n in alt["nodes"]],
+                "edges": [int(e) for e in alt["edges"]],
+            })
+
+    return best, alternatives[:limit]
+
+
+# Дані для шаблону (серіалізуються в JSON для кешу)
+def route_payload(best: dict, alternatives: list, pois: list, steps: list) -> dict:
+    geojson = {
+        "type": "FeatureCollection",
+        "features": [{"type": "Feature", "geometry": {
+            "type": "LineString", "coordinates": best["line_coords"]
+        }}]
+    }
+    return {
+        "geojson": geojson,
+        "distance": round(best["distance_km"], 2),
+        "duration": round(best["duration_hr"], 0),
+        "fuel": round(best["fuel"], 2),
+        "poi_count": len(pois),
+        "steps": steps,
+        "route_type": best["name"],
+        "pois": pois if best["name"] == "ant_colony" else [],
+        "alternatives": alternatives,
+        # osmid вузлів і ребра знімка, обрані пошуком: для повної геометрії в JSON API
+        "nodes": [int(n) for n in best["route_nodes"]],
+        "edges": best["edges"],
+    }
+
+
+# Кроки маршруту; тривалість — колонка знімка з тим самим станом заторів, що й пошук
+def _instructions(traffic, nodes: list, edges: list) -> list:
+    duration = traffic.apply_array(get_edge_weights().duration, "duration_weight")
+    return InstructionGenerator.generate(get_snapshot(), nodes, duration, edges)
+
+
+async def _compute(car_brand, car_model, car_year, custom_rate, metric, start_coords, end_coords,
+                   departure: datetime = None, traffic=None, alternatives: int = DEFAULT_ALTERNATIVES) -> dict:
+    try:
+        best, alternatives = await _call("routing", ROUTING_TIMEOUT, build_routes, car_brand, car_model,
+                                         car_year, custom_rate, metric, start_coords, end_coords, departure,
+                                         traffic, alternatives)
+    except asyncio.TimeoutError:
+        raise RouteError("Система не встигла побудувати маршрут. Спробуйте пізніше.")
+
+    # POI (мережа або локальний індекс) та інструкції — одночасно і лише для обраного маршруту
+    pois, steps = await asyncio.gather(
+        _call("io", POI_TIMEOUT, get_pois_along_route, best["line_coords"]),
+        _call("routing", ROUTING_TIMEOUT, _instructions, traffic, best["route_nodes"], best["edges"]),
+        return_exceptions=True,
+    )
+    if isinstance(pois, BaseException):
+        print(f" POI недоступні: {pois!r}")
+        pois = []
+    if isinstance(steps, BaseException):
+        print(f" Інструкції недоступні: {steps!r}")
+        steps = []
+    return route_payload(best, alternatives, pois, steps)
+
+
+# Витрата пального для кешу: задана користувачем або за авто (DEFAULT_CONSUMPTION, якщо API недоступне)
+async def _consumption(car_brand: str, car_model: str, car_year: int, custom_rate: float) -> float:
+    if custom_rate is not None:
+        return custom_rate
+    try:
+        return await _call("io", FUEL_TIMEOUT, get_fuel_consumption, car_brand, car_model, car_year)
+    except Exception as e:
+        print(f" Витрата пального недоступна: {e!r}")
+        return DEFAULT_CONSUMPTION
+
+
+async def plan_route(start_address: str, end_address: str, car_brand: str, car_model: str, car_year: int,
+                     custom_rate: float, metric: str, alternatives: int = DEFAULT_ALTERNATIVES) -> dict:
+    """
+    Асинхронний конвеєр запиту маршруту:
+    1. геокодування обох адрес і витрата пального — одночасно, з тайм-аутами
+    2. прив'язка до графа і кеш результатів
+    3. маршрутизація в окремому пулі потоків (CPU)
+    4. POI та інструкції для обраного маршруту — одночасно
+    Повертає дані для шаблону або піднімає RouteError.
+    """
+    start_coords, end_coords, rate = await asyncio.gather(
+        _call("io", GEOCODE_TIMEOUT, geocode_address, start_address),
+        _call("io", GEOCODE_TIMEOUT, geocode_address, end_address),
+        _consumption(car_brand, car_model, car_year, custom_rate),
+        return_exceptions=True,
+    )
+    print(" Старт:", start_coords)
+    print(" Кінець:", end_coords)
+    if not isinstance(start_coords, list) or not isinstance(end_coords, list):
+        raise RouteError("Не вдалося знайти адресу. Перевірте введені дані.")
+    return await route_between(start_coords, end_coords, car_brand, car_model, car_year, custom_rate, metric, rate,
+                               alternatives=alternatives)
+
+
+async def route_between(start_coords: list, end_coords: list, car_brand: str, car_model: str, car_year: int,
+                        custom_rate: float, metric: str, consumption: float = None,
+                        departure: datetime = None, alternatives: int = DEFAULT_ALTERNATIVES) -> dict:
+    """
+    Маршрут між координатами [lon, lat] (етапи 2-4 plan_route).
+    consumption — витрата для ключа кешу; якщо не задана, визначається за авто.
+    departure — час відправлення: для duration_weight враховуються години пік.
+    alternatives — скільки маршрутів повернути (1..MAX_ALTERNATIVES): основний і альтернативи.
+    """
+    alternatives = min(max(int(alternatives), 1), MAX_ALTERNATIVES)
+    if consumption is None:
+        consumption = await _consumption(car_brand, car_model, car_year, custom_rate)
+
+    # Прив'язка до графа: ключ кешу — вузли, а не сирі координати
+    try:
+        index = get_spatial_index()
+        origin = index.nearest_node(start_coords[0], start_coords[1])
+        destination = index.nearest_node(end_coords[0], end_coords[1])
+    except OutsideCoverageError as e:
+        print(f" {e}")
+        raise RouteError("Адреса знаходиться поза зоною покриття карти Києва.")
+
+    version = graph_version(get_snapshot())
+    route_cache = get_route_cache()
+    route_cache.check_version(version)
+    slot = None
+    if departure is not None and metric == "duration_weight":
+        offset = week_seconds(departure)
+        slot = int(offset // DEPARTURE_SLOT_SECONDS)
+        departure -= timedelta(seconds=offset % DEPARTURE_SLOT_SECONDS)
+    else:
+        departure = None
+    # Стан оверлею заторів береться один раз на запит: його версія — частина ключа кешу,
+    # і той самий стан отримують усі алгоритми та інструкції (але версія трафіку не входить
+    # у версію кешу: зміни часті, а записи для старих версій просто витісняються з LRU)
+    traffic = get_traffic_overlay().view()
+    key = route_cache.key(origin, destination, metric, consumption, f"{version}:t{traffic.version}", slot,
+                          alternatives)
+
+    # Обчислення в окремому циклі подій у потоці пулу: однакові одночасні запити
+    # очікують на один результат (SingleFlight у кеші); маршрутизатори рахують з тією ж
+    # витратою, що й у ключі кешу, без повторного запиту до сервісу пального
+    def compute():
+        return asyncio.run(_compute(car_brand, car_model, car_year, consumption, metric, start_coords, end_coords,
+                                    departure, traffic, alternatives))
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor("requests", REQUEST_WORKERS), route_cache.get_or_compute,
+                                      key, compute)
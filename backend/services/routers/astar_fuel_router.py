@@ -1,51 +1,66 @@
 import time
-import heapq
-import networkx as nx
+import numpy as np
 from services.routers.base_router import BaseRouter
+from services.graph_registry import get_landmarks
+from services.geo import haversine_point_m
 
-# Клас реалізує пошук маршруту за алгоритмом A*
+class LazyValues(dict):
+    """Значення функції вузла, що обчислюється при першому зверненні й запам'ятовується."""
+    def __init__(self, fn):
+        super().__init__()
+        self.fn = fn
+
+    def __missing__(self, node: int) -> float:
+        value = self[node] = self.fn(node)
+        return value
+
+
+# Клас реалізує пошук маршруту за алгоритмом A* (за замовчуванням — двонапрямний)
 class AStarFuelRouter(BaseRouter):
+    """
+    A* з евристикою в одиницях метрики:
+    - відстань по великому колу (м), помножена на найменшу вагу метрики на метр,
+      тож оцінка допустима і узгоджена для пального, часу, довжини й POI
+    - якщо поруч зі знімком побудовано орієнтири (python -m services.landmarks),
+      береться максимум з оцінкою ALT, яка значно точніша на реальній мережі доріг
+    - двонапрямний пошук використовує середній потенціал (h_до_фінішу - h_від_старту) / 2
+    - оцінка рахується ліниво для вузлів, до яких дійшов пошук (з запам'ятовуванням),
+      і лише через кілька орієнтирів, найкращих для пари старт-фініш
+    """
+    def __init__(self, car_brand: str, car_model: str, car_year: int,
+                 bidirectional: bool = True, use_landmarks: bool = True, **kwargs):
+        super().__init__(car_brand, car_model, car_year, **kwargs)
+        self.bidirectional = bidirectional
+        self.landmarks = get_landmarks() if use_landmarks else None
 
-    def __init__(self, car_brand: str, car_model: str, car_year: int):
-        super().__init__(car_brand, car_model, car_year)
+# Нижні оцінки відстаней від start і до goal (функції вузла; рахуються лише для вузлів,
+# до яких дійшов пошук)
+    def _heuristic(self, start: int, goal: int, weight_type: str):
+        per_metre = self.edge_weights.cost_per_metre(weight_type, self.avg_consumption)
+        x, y = np.asarray(self.snapshot.node_x), np.asarray(self.snapshot.node_y)
+        start_x, start_y, goal_x, goal_y = float(x[start]), float(y[start]), float(x[goal]), float(y[goal])
+        alt_from = alt_to = None
+        if self.landmarks is not None and weight_type in self.landmarks.metrics:
+            alt_from, alt_to = self.landmarks.bounds(weight_type, start, goal, self.avg_consumption)
 
-    def _heuristic(self, n1, n2) -> float:
-        # Евклідова відстань між вузлами за координатами
-        x1, y1 = self.G.nodes[n1]['x'], self.G.nodes[n1]['y']
-        x2, y2 = self.G.nodes[n2]['x'], self.G.nodes[n2]['y']
-        return ((x1 - x2)**2 + (y1 - y2)**2) ** 0.5
+        def from_start(node: int) -> float:
+            bound = haversine_point_m(start_x, start_y, x.item(node), y.item(node)) * per_metre
+            return max(bound, alt_from(node)) if alt_from is not None else bound
 
-# Основна реалізація A*
-    def _astar_search(self, start, goal, weight_type: str):
-        open_set = [(0, start)]
-        came_from = {}
-        g_score = {node: float('inf') for node in self.G.nodes}
-        g_score[start] = 0
-        f_score = {node: float('inf') for node in self.G.nodes}
-        f_score[start] = self._heuristic(start, goal)
+        def to_goal(node: int) -> float:
+            bound = haversine_point_m(x.item(node), y.item(node), goal_x, goal_y) * per_metre
+            return max(bound, alt_to(node)) if alt_to is not None else bound
 
-        while open_set:
-            _, current = heapq.heappop(open_set)
-            if current == goal:
-                # Відновлення шляху
-                path = []
-                while current in came_from:
-                    path.append(current)
-                    current = came_from[current]
-                path.append(start)
-                return path[::-1]
+        return from_start, to_goal
 
-            for neighbor in self.G.neighbors(current):
-                # може бути декілька паралельних ребер
-                for key in self.G[current][neighbor]:
-                    weight_value = self.G[current][neighbor][key].get(weight_type, 1)
-                    tentative = g_score[current] + weight_value
-                    if tentative < g_score[neighbor]:
-                        came_from[neighbor] = current
-                        g_score[neighbor] = tentative
-                        f_score[neighbor] = tentative + self._heuristic(neighbor, goal)
-                        heapq.heappush(open_set, (f_score[neighbor], neighbor))
-        return []
+# Основна реалізація A* на масивах CSR
+    def _astar_search(self, start: int, goal: int, weight_type: str):
+        weights = self.metric_weights(weight_type)
+        from_start, to_goal = self._heuristic(start, goal, weight_type)
+        if self.bidirectional:
+            potential = LazyValues(lambda node: (to_goal(node) - from_start(node)) / 2)
+            return self.engine.bidirectional_astar(start, goal, weights, potential)
+        return self.engine.astar(start, goal, weights, LazyValues(to_goal).__getitem__)
 
 # Головна функція для виклику A*
     def find_route(
@@ -57,27 +72,18 @@ class AStarFuelRouter(BaseRouter):
         weight_type: str = "fuel_weight"
     ):
         start_time = time.time()
-        orig = self._nearest(start_lat, start_lon)
-        dest = self._nearest(end_lat, end_lon)
+        orig = self._nearest_index(start_lat, start_lon)
+        dest = self._nearest_index(end_lat, end_lon)
         print(f" A* з метрикою '{weight_type}'")
 
-        try:
-            route = self._astar_search(orig, dest, weight_type)
-        except nx.NetworkXNoPath:
+        nodes, edges = self._astar_search(orig, dest, weight_type)
+        if not edges:
             print("A* не знайшов шлях.")
             return [], 0, 0, 0
 
         # Обчислення метрик
-        total_distance = sum(
-            self.G.edges[u, v, 0]["length"] for u, v in zip(route[:-1], route[1:])
-        )
-        total_fuel     = sum(
-            self.G.edges[u, v, 0]["fuel_weight"] for u, v in zip(route[:-1], route[1:])
-        )
-        total_duration = sum(
-            self.G.edges[u, v, 0]["duration_weight"] for u, v in zip(route[:-1], route[1:])
-        )
+        distance_km, total_fuel, duration_min = self._path_totals(edges)
         elapsed = time.time() - start_time
         print(f"A* виконано за {elapsed:.4f} секунд")
-        return route, total_distance/1000, total_fuel, total_duration/60
-
+        self.route_edges = list(edges)
+        return self._to_osmids(nodes), distance_km, total_fuel, duration_min
@@ -1,87 +1,89 @@
-import time
-import networkx as nx
-import osmnx as ox
-from services.graph_service import load_kyiv_graph
-from services.fuel_api import get_fuel_consumption_from_api
+from services.graph_registry import get_snapshot, get_engine, get_spatial_index, get_edge_weights
+from services.fuel_api import get_fuel_consumption
+from services.traffic_overlay import get_traffic_overlay, column_name
 
 class BaseRouter:
     """
     Базовий клас для всіх алгоритмів маршрутизації:
-    - завантажує граф
-    - отримує витрату пального
-    - розраховує ваги ребер: fuel_weight, length_weight, duration_weight, poi_score
+    - бере спільний бінарний знімок графа з реєстру процесу (масиви NumPy;
+      граф NetworkX не будується)
+    - отримує витрату пального (або бере вже відому avg_consumption без запиту до сервісу)
+    - розраховує власні ваги ребер: fuel_weight, length_weight, duration_weight
+      (ваги зберігаються в self.weights списками за номером ребра знімка,
+      а не в атрибутах спільного графа; колонки рахуються векторизовано в EdgeWeights)
+    - враховує затори й перекриття: стан оверлею (traffic) передається ззовні — один
+      на запит для всіх маршрутизаторів — або береться один раз при створенні,
+      тож усі пошуки бачать ту саму версію
+    - після find_route() у self.route_edges — ребра знайденого шляху (номери ребер знімка):
+      саме ті паралельні ребра, які обрав пошук за метрикою запиту
     """
-    def __init__(self, car_brand: str, car_model: str, car_year: int):
+    def __init__(self, car_brand: str, car_model: str, car_year: int, avg_consumption: float = None,
+                 traffic=None):
         self.car_brand = car_brand
         self.car_model = car_model
         self.car_year = car_year
-        self.avg_consumption = self._get_consumption()
-        self.G = load_kyiv_graph()
+        self.avg_consumption = avg_consumption if avg_consumption is not None else self._get_consumption()
+        self.snapshot = get_snapshot()
+        self.engine = get_engine()
+        self.index = get_spatial_index()
+        self.edge_weights = get_edge_weights()
+        self.traffic = traffic if traffic is not None else get_traffic_overlay().view()
+        self.base_weights = {}
+        self.weights = {}
+        self.route_edges = []
         self._prepare_graph()
 
-# Отримує середню витрату пального через API
+# Отримує середню витрату пального через кешований сервіс
     def _get_consumption(self) -> float:
         try:
-            consumption = get_fuel_consumption_from_api(self.car_brand, self.car_model, self.car_year)
-            print(f"Витрата з API: {consumption} л/100км")
+            consumption = get_fuel_consumption(self.car_brand, self.car_model, self.car_year)
+            print(f"Витрата пального: {consumption} л/100км")
             return consumption
         except Exception as e:
             print(f"Помилка при отриманні витрати пального: {e}")
             return 8.0
 
-# Оцінює середню швидкість для дороги залежно від типу
-    def _estimate_speed_kmh(self, highway: str) -> float:
-        if highway in ["motorway", "trunk"]:
-            return 90
-        if highway in ["primary", "secondary"]:
-            return 60
-        if highway in ["tertiary", "residential"]:
-            return 40
-        if highway in ["living_street", "service"]:
-            return 20
-        return 30
-
-# Основна підготовка графа
+# Профіль ваг для поточної витрати пального (спільні векторизовані колонки, кеш за витратою)
+# з накладеним оверлеєм заторів (від витрати залежить лише колонка пального)
     def _prepare_graph(self) -> None:
-        """Встановлює ваги для всіх ребер графа."""
-        self.G.remove_edges_from(nx.selfloop_edges(self.G))
-        for u, v, k, data in self.G.edges(keys=True, data=True):
-            length_m = data.get("length", 1.0)
-            highway = data.get("highway", "")
-            if isinstance(highway, list):
-                highway = highway[0]
-
-            # коефіцієнт витрати
-            coeff = 1.0
-            if highway in ["motorway", "trunk"]:
-                coeff = 0.8
-            elif highway in ["residential", "living_street", "service"]:
-                coeff = 1.3
+        self.base_weights = self.edge_weights.profile(self.avg_consumption)
+        self.weights = {
+            name: self.traffic.patch(column_name(name, self.avg_consumption), values, name)
+            for name, values in self.base_weights.items()
+        }
 
-            # витрата пального
-            data["fuel_weight"] = (length_m / 100_000) * self.avg_consumption * coeff
-            # довжина
-            data["length_weight"] = length_m
-            # тривалість 
-            speed_kmh = self._estimate_speed_kmh(highway)
-            data["duration_weight"] = (length_m / 1000) / speed_kmh * 3600 if speed_kmh > 0 else length_m / 5
-
- # Оновлює ваги витрати пального для всіх ребер графа            
+# Оновлює ваги після зміни витрати пального (наприклад, введеної вручну)
     def update_weights(self):
-        for u, v, k, data in self.G.edges(keys=True, data=True):
-            length_m = data.get("length", 1.0)
-            highway = data.get("highway", "")
-            if isinstance(highway, list):
-                highway = highway[0]
+        self._prepare_graph()
 
-            coeff = 1.0
-            if highway in ["motorway", "trunk"]:
-                coeff = 0.9
-            elif highway in ["residential", "living_street", "service"]:
-                coeff = 1.2
+# Повертає список ваг ребер за обраною метрикою
+    def metric_weights(self, weight_type: str) -> list:
+        try:
+            return self.weights[weight_type]
+        except KeyError:
+            raise ValueError(f"Невідома метрика: {weight_type}")
+
+# Підсумкові метрики шляху за списком ребер: (км, л, хв)
+# (відстань і пальне — за базовими вагами, час — з урахуванням заторів)
+    def _path_totals(self, edges: list):
+        length = self.base_weights["length_weight"]
+        fuel = self.base_weights["fuel_weight"]
+        duration = self.weights["duration_weight"]
+        total_distance = sum(length[e] for e in edges)
+        total_fuel = sum(fuel[e] for e in edges)
+        total_duration = sum(duration[e] for e in edges)
+        return total_distance / 1000, total_fuel, total_duration / 60
 
-            data["fuel_weight"] = (length_m / 100_000) * self.avg_consumption * coeff
+# Перетворює індекси вузлів знімка на osmid
+    def _to_osmids(self, nodes: list) -> list:
+        osmids = self.snapshot.node_osmid
+        return [int(osmids[i]) for i in nodes]
 
-# Знаходить найближчу вершину графа до заданих координат
+# Знаходить найближчу вершину графа до заданих координат (osmid)
     def _nearest(self, lat: float, lon: float) -> int:
-        return ox.distance.nearest_nodes(self.G, X=lon, Y=lat)
\ No newline at end of file
+        return int(self.snapshot.node_osmid[self._nearest_index(lat, lon)])
+
+# Знаходить найближчу вершину графа (індекс вузла знімка) через просторовий індекс;
+# поза зоною покриття піднімає OutsideCoverageError
+    def _nearest_index(self, lat: float, lon: float) -> int:
+        return self.index.nearest_node(lon, lat)
\ No newline at end of file
@@ -0,0 +1,48 @@
+import time
+from services.routers.base_router import BaseRouter
+from services.graph_registry import get_hierarchy
+
+# Клас реалізує пошук маршруту через Contraction Hierarchies
+class CHRouter(BaseRouter):
+    """
+    Двонаправлений пошук у попередньо побудованих Contraction Hierarchies
+    (python -m services.contraction). Якщо ієрархії для метрики немає,
+    маршрут шукається звичайним Dijkstra на масивах CSR. Так само при активному
+    оверлеї заторів: ієрархія побудована для базових ваг.
+    """
+    def __init__(self, car_brand: str, car_model: str, car_year: int, **kwargs):
+        super().__init__(car_brand, car_model, car_year, **kwargs)
+
+    def find_route(
+        self,
+        start_lat: float,
+        start_lon: float,
+        end_lat: float,
+        end_lon: float,
+        weight_type: str = "fuel_weight"
+    ):
+        start_time = time.time()
+        orig = self._nearest_index(start_lat, start_lon)
+        dest = self._nearest_index(end_lat, end_lon)
+        print(f" CH з метрикою '{weight_type}'")
+
+        ch = get_hierarchy(weight_type)
+        if ch is None or self.traffic.affects(weight_type):
+            print(f" CH для метрики '{weight_type}' недоступна — використовується Dijkstra")
+            _, edges = self.engine.dijkstra(orig, dest, self.metric_weights(weight_type))
+        else:
+            _, edges = ch.query(orig, dest)
+
+        if not edges:
+            print(" CH не знайшов шлях.")
+            return [], 0, 0, 0
+
+        # Вузли шляху з розпакованих оригінальних ребер
+        targets = self.engine.targets
+        nodes = [orig] + [targets[e] for e in edges]
+        distance_km, total_fuel, duration_min = self._path_totals(edges)
+
+        elapsed = time.time() - start_time
+        print(f" CH виконано за {elapsed:.4f} секунд")
+        self.route_edges = list(edges)
+        return self._to_osmids(nodes), distance_km, total_fuel, duration_min
@@ -0,0 +1,174 @@
+import time
+import heapq
+from services.routers.base_router import BaseRouter
+from services.routing_core import INF
+
+# Критерії багатокритеріального пошуку (усі мінімізуються)
+PARETO_CRITERIA = ("fuel_weight", "duration_weight", "poi_weight")
+
+# Мітка ε-домінується, якщо інша не гірша за неї з допуском (1 + ε) за кожним критерієм
+EPSILON = 0.02
+MAX_LABELS_PER_NODE = 8
+MAX_LABELS = 300_000
+MAX_ROUTES = 5
+
+# Метрика з форми -> критерій, за яким обирається маршрут із фронту Парето
+_SELECT_BY = {
+    "fuel_weight": "fuel_weight",
+    "duration_weight": "duration_weight",
+    "length_weight": "length_weight",
+    "poi_score": "poi_weight",
+}
+
+
+def _dominated(cost: tuple, front: list, factor: float) -> bool:
+    for other in front:
+        if all(o <= c * factor for o, c in zip(other, cost)):
+            return True
+    return False
+
+
+# Клас реалізує багатокритеріальний пошук (фронт Парето) за пальним, часом і POI
+class ParetoRouter(BaseRouter):
+    """
+    Пошук міток (label-setting) за трьома критеріями одночасно:
+    - для кожного вузла зберігаються лише недоміновані (з допуском ε) мітки, не більше MAX_LABELS_PER_NODE
+    - нижні межі до фінішу — точні однокритеріальні відстані зворотного пошуку;
+      мітка відкидається, якщо навіть з ними вона домінується вже знайденими маршрутами
+    - черга впорядкована за сумою нормалізованих оцінок, тому перші маршрути знаходяться швидко
+
+    Один пошук дає набір компромісних маршрутів замість кількох повних пошуків
+    з підібраними вручну вагами.
+    """
+    def __init__(self, car_brand: str, car_model: str, car_year: int, epsilon: float = EPSILON,
+                 max_labels_per_node: int = MAX_LABELS_PER_NODE, max_routes: int = MAX_ROUTES, **kwargs):
+        super().__init__(car_brand, car_model, car_year, **kwargs)
+        self.epsilon = epsilon
+        self.max_labels_per_node = max_labels_per_node
+        self.max_routes = max_routes
+        self.alternatives = []
+
+# Фронт Парето між індексами вузлів: список (вартості, ребра)
+    def pareto_search(self, source: int, target: int) -> list:
+        engine = self.engine
+        offsets, targets = engine.offsets, engine.targets
+        costs = [self.metric_weights(c) for c in PARETO_CRITERIA]
+        c0, c1, c2 = costs
+        bounds = [engine.shortest_distances(target, w, reverse=True) for w in costs]
+        h0, h1, h2 = bounds
+        if h0[source] == INF:
+            return []
+
+        # Нормалізація за оптимумом кожного критерію, щоб одиниці були порівнянні
+        s0, s1, s2 = (1.0 / max(b[source], 1e-9) for b in bounds)
+        factor = 1.0 + self.epsilon
+        cap = self.max_labels_per_node
+
+        lab_pred, lab_edge = [-1], [-1]
+        node_front = {}
+        found = []
+        found_costs = []
+        queue = [(0.0, (0.0, 0.0, 0.0), source, 0)]
+
+        while queue and len(lab_pred) < MAX_LABELS:
+            _, g, u, label = heapq.heappop(queue)
+            if u == target:
+                if not _dominated(g, found_costs, factor):
+                    found.append((g, label))
+                    found_costs.append(g)
+                continue
+
+            front = node_front.setdefault(u, [])
+            if len(front) >= cap or _dominated(g, front, factor):
+                continue
+            front.append(g)
+
+            g0, g1, g2 = g
+            for e in range(offsets[u], offsets[u + 1]):
+                v = targets[e]
+                b0 = h0[v]
+                if b0 == INF:
+                    continue
+                n = (g0 + c0[e], g1 + c1[e], g2 + c2[e])
+                f = (n[0] + b0, n[1] + h1[v], n[2] + h2[v])
+                if found_costs and _dominated(f, found_costs, factor):
+                    continue
+                front_v = node_front.get(v)
+                if front_v and _dominated(n, front_v, factor):
+                    continue
+                lab_pred.append(label)
+                lab_edge.append(e)
+                heapq.heappush(queue, (f[0] * s0 + f[1] * s1 + f[2] * s2, n, v, len(lab_pred) - 1))
+
+        routes = []
+        for cost, label in found:
+            edges = []
+            while lab_edge[label] >= 0:
+                edges.append(lab_edge[label])
+                label = lab_pred[label]
+            edges.reverse()
+            routes.append((cost, edges))
+        return routes
+
+# Обмежує фронт: спершу найкращі за кожним критерієм, далі — за сумою нормалізованих вартостей
+    def _select(self, routes: list) -> list:
+        if len(routes) <= self.max_routes:
+            return routes
+        chosen = []
+        for i in range(len(PARETO_CRITERIA)):
+            best = min(routes, key=lambda r: r[0][i])
+            if best not in chosen:
+                chosen.append(best)
+        scale = [max(min(r[0][i] for r in routes), 1e-9) for i in range(len(PARETO_CRITERIA))]
+        rest = sorted(routes, key=lambda r: sum(c / s for c, s in zip(r[0], scale)))
+        for route in rest:
+            if len(chosen) >= self.max_routes:
+                break
+            if route not in chosen:
+                chosen.append(route)
+        return chosen
+
+# Альтернативні маршрути між координатами: список словників з вузлами і метриками
+    def find_routes(self, start_lat: float, start_lon: float, end_lat: float, end_lon: float) -> list:
+        orig = self._nearest_index(start_lat, start_lon)
+        dest = self._nearest_index(end_lat, end_lon)
+        targets = self.engine.targets
+        poi_weight = self.metric_weights("poi_weight")
+
+        routes = []
+        for _, edges in self._select(self.pareto_search(orig, dest)):
+            nodes = [orig] + [targets[e] for e in edges]
+            distance_km, total_fuel, duration_min = self._path_totals(edges)
+            routes.append({
+                "nodes": self._to_osmids(nodes),
+                "edges": edges,
+                "distance_km": distance_km,
+                "fuel": total_fuel,
+                "duration_min": duration_min,
+                "poi_weight": sum(poi_weight[e] for e in edges),
+            })
+        return routes
+
+    def find_route(
+        self,
+        start_lat: float,
+        start_lon: float,
+        end_lat: float,
+        end_lon: float,
+        weight_type: str = "fuel_weight"
+    ):
+        start_time = time.time()
+        print(f" Pareto (пальне / час / POI), вибір за метрикою '{weight_type}'")
+        self.alternatives = self.find_routes(start_lat, start_lon, end_lat, end_lon)
+        if not self.alternatives:
+            print(" Pareto не знайшов шлях.")
+            return [], 0, 0, 0
+
+        criterion = _SELECT_BY.get(weight_type, "fuel_weight")
+        weights = self.metric_weights(criterion)
+        best = min(self.alternatives, key=lambda r: sum(weights[e] for e in r["edges"]))
+
+        elapsed = time.time() - start_time
+        print(f" Pareto виконано за {elapsed:.4f} секунд, маршрутів у фронті: {len(self.alternatives)}")
+        self.route_edges = list(best["edges"])
+        return best["nodes"], best["distance_km"], best["fuel"], best["duration_min"]
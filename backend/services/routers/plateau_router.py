@@ -0,0 +1,162 @@
+import time
+import numpy as np
+from services.routers.base_router import BaseRouter
+from services.routing_core import INF
+
+# Альтернатива не довша за найкращий маршрут більш ніж у STRETCH разів
+STRETCH = 1.3
+# Частка альтернативи (за вагою), спільна з уже обраними маршрутами
+MAX_SHARED = 0.8
+# Мінімальна довжина плато відносно найкращого маршруту: коротке плато —
+# ознака локального обходу, а не самостійного маршруту
+MIN_PLATEAU = 0.05
+MAX_ALTERNATIVES = 3
+
+
+# Клас шукає альтернативні маршрути методом плато
+class PlateauRouter(BaseRouter):
+    """
+    Альтернативи методом плато за однією парою пошуків:
+    - дерево найкоротших шляхів від старту і зворотне дерево до фінішу,
+      обидва обмежені вартістю STRETCH * найкращий маршрут; зворотне — лише
+      по вузлах, через які маршрут вкладається в цю межу
+    - плато — ланцюжок ребер, що входить в обидва дерева; кожне плато дає
+      маршрут «старт -> початок плато -> кінець плато -> фініш»,
+      оптимальний на всій довжині плато (тобто без штучних петель)
+    - кандидати впорядковані за часткою маршруту поза плато; відкидаються
+      петлі і маршрути, що надто збігаються з уже обраними
+
+    Перший маршрут — найкоротший (плато, що містить увесь шлях), далі до
+    max_alternatives альтернатив без жодного додаткового пошуку.
+    """
+    def __init__(self, car_brand: str, car_model: str, car_year: int, stretch: float = STRETCH,
+                 max_shared: float = MAX_SHARED, min_plateau: float = MIN_PLATEAU,
+                 max_alternatives: int = MAX_ALTERNATIVES, **kwargs):
+        super().__init__(car_brand, car_model, car_year, **kwargs)
+        self.stretch = stretch
+        self.max_shared = max_shared
+        self.min_plateau = min_plateau
+        self.max_alternatives = max_alternatives
+        self.alternatives = []
+
+# Маршрути між індексами вузлів: список списків ребер, перший — найкоротший
+    def plateau_search(self, source: int, target: int, weights: list) -> list:
+        engine = self.engine
+        dist_f, pred_f = engine.shortest_path_tree(source, weights, target=target, stretch=self.stretch)
+        best = dist_f[target]
+        if best == INF:
+            return []
+        if source == target:
+            return [[]]
+        # Вузол потрібен, лише якщо маршрут через нього вкладається в межу: відстані
+        # прямого дерева відсікають решту зворотного пошуку
+        dist_b, pred_b = engine.shortest_path_tree(target, weights, reverse=True, limit=best * self.stretch,
+                                                   bound=dist_f)
+
+        sources, targets = self.snapshot.sources, self.snapshot.targets
+        dist_f, dist_b = np.asarray(dist_f), np.asarray(dist_b)
+        pred_f, pred_b = np.asarray(pred_f), np.asarray(pred_b)
+
+        # Ребра обох дерев
+        tree = pred_f[pred_f >= 0]
+        plateau = tree[pred_b[sources[tree]] == tree]
+        in_plateau = np.zeros(len(targets), dtype=bool)
+        in_plateau[plateau] = True
+        # Початок ланцюжка: у його перший вузол не входить ребро плато
+        before = pred_f[sources[plateau]]
+        starts = plateau[(before < 0) | ~in_plateau[np.maximum(before, 0)]]
+
+        candidates = []
+        pred_b_list = pred_b.tolist()
+        targets_list = engine.targets
+        for edge in starts.tolist():
+            a = engine.sources[edge]
+            via = dist_f[a] + dist_b[a]
+            if via > best * self.stretch:
+                continue
+            chain = [edge]
+            while True:
+                following = pred_b_list[targets_list[chain[-1]]]
+                if following < 0 or not in_plateau[following]:
+                    break
+                chain.append(following)
+            b = targets_list[chain[-1]]
+            length = dist_f[b] - dist_f[a]
+            if length < best * self.min_plateau and via > best:
+                continue
+            candidates.append((via - length, via, a, b, chain))
+        candidates.sort(key=lambda c: (c[0], c[1]))
+
+        routes = []
+        chosen = set()
+        pred_f_list = pred_f.tolist()
+        for _, via, a, b, chain in candidates:
+            if len(routes) > self.max_alternatives:
+                break
+            edges = self._unpack_forward(pred_f_list, source, a) + chain + self._unpack_backward(pred_b_list, b, target)
+            nodes = [source] + [targets_list[e] for e in edges]
+            # Петлі виникають, коли шлях до плато і від нього перетинаються
+            if len(set(nodes)) != len(nodes):
+                continue
+            shared = sum(weights[e] for e in edges if e in chosen)
+            if routes and shared > self.max_shared * via:
+                continue
+            routes.append(edges)
+            chosen.update(edges)
+        return routes
+
+    def _unpack_forward(self, pred_f: list, source: int, node: int) -> list:
+        edges = []
+        while node != source:
+            edge = pred_f[node]
+            edges.append(edge)
+            node = self.engine.sources[edge]
+        edges.reverse()
+        return edges
+
+    def _unpack_backward(self, pred_b: list, node: int, target: int) -> list:
+        edges = []
+        while node != target:
+            edge = pred_b[node]
+            edges.append(edge)
+            node = self.engine.targets[edge]
+        return edges
+
+# Маршрути між координатами: список словників з вузлами і метриками, перший — найкоротший
+    def find_routes(self, start_lat: float, start_lon: float, end_lat: float, end_lon: float,
+                    weight_type: str = "fuel_weight") -> list:
+        orig = self._nearest_index(start_lat, start_lon)
+        dest = self._nearest_index(end_lat, end_lon)
+        poi_weight = self.metric_weights("poi_weight")
+        targets = self.engine.targets
+
+        routes = []
+        for edges in self.plateau_search(orig, dest, self.metric_weights(weight_type)):
+            nodes = [orig] + [targets[e] for e in edges]
+            distance_km, total_fuel, duration_min = self._path_totals(edges)
+            routes.append({
+                "nodes": self._to_osmids(nodes),
+                "edges": edges,
+                "distance_km": distance_km,
+                "fuel": total_fuel,
+                "duration_min": duration_min,
+                "poi_weight": sum(poi_weight[e] for e in edges),
+            })
+        return routes
+
+    def find_route(self, start_lat: float, start_lon: float, end_lat: float, end_lon: float,
+                   weight_type: str = "fuel_weight"):
+        start_time = time.time()
+        print(f" Плато-альтернативи з метрикою '{weight_type}'")
+        routes = self.find_routes(start_lat, start_lon, end_lat, end_lon, weight_type)
+        if not routes:
+            self.alternatives = []
+            print(" Плато-пошук не знайшов шлях.")
+            return [], 0, 0, 0
+
+        best = routes[0]
+        self.alternatives = routes[1:]
+        elapsed = time.time() - start_time
+        print(f" Плато-пошук виконано за {elapsed:.4f} секунд, альтернатив: {len(self.alternatives)}")
+        self.route_edges = list(best["edges"])
+        return best["nodes"], best["distance_km"], best["fuel"], best["duration_min"]
@@ -0,0 +1,57 @@
+import time
+from datetime import datetime
+from services.routers.astar_fuel_router import AStarFuelRouter, LazyValues
+from services.graph_registry import get_speeds
+from services.speed_profiles import PROFILE_TIMEZONE, week_seconds
+
+# Клас шукає найшвидший маршрут з урахуванням часу відправлення (години пік)
+class TimeDependentRouter(AStarFuelRouter):
+    """
+    Залежний від часу A*: час проїзду ребра залежить від моменту в'їзду на нього
+    (профілі швидкості services.speed_profiles):
+    - мінімізується лише час у дорозі; пальне і відстань рахуються для знайденого шляху
+    - евристика — допустимі оцінки A* для duration_weight (пряма й ALT), поділені
+      на найбільший коефіцієнт швидкості профілів
+    """
+    def __init__(self, car_brand: str, car_model: str, car_year: int, use_heuristic: bool = True, **kwargs):
+        super().__init__(car_brand, car_model, car_year, bidirectional=False, **kwargs)
+        # Затори й перекриття оверлею множать базову тривалість ребер
+        self.speeds = get_speeds().with_duration(self.metric_weights("duration_weight"))
+        self.use_heuristic = use_heuristic
+
+# Пошук між індексами вузлів: (вузли, ребра, час у дорозі в с)
+    def time_dependent_search(self, start: int, goal: int, departure: datetime = None):
+        heuristic = None
+        if self.use_heuristic:
+            _, to_goal = self._heuristic(start, goal, "duration_weight")
+            max_factor = self.speeds.max_factor
+            heuristic = LazyValues(lambda node: to_goal(node) / max_factor).__getitem__
+        return self.engine.time_dependent_astar(start, goal, week_seconds(departure), self.speeds, heuristic)
+
+    def find_route(
+        self,
+        start_lat: float,
+        start_lon: float,
+        end_lat: float,
+        end_lon: float,
+        weight_type: str = "duration_weight",
+        departure: datetime = None
+    ):
+        if weight_type != "duration_weight":
+            raise ValueError(f"Залежний від часу пошук підтримує лише duration_weight, а не '{weight_type}'")
+        start_time = time.time()
+        orig = self._nearest_index(start_lat, start_lon)
+        dest = self._nearest_index(end_lat, end_lon)
+        departure = departure or datetime.now(PROFILE_TIMEZONE)
+        print(f" Залежний від часу A*, відправлення {departure:%a %H:%M}")
+
+        nodes, edges, seconds = self.time_dependent_search(orig, dest, departure)
+        if not edges:
+            print(" Залежний від часу A* не знайшов шлях.")
+            return [], 0, 0, 0
+
+        distance_km, total_fuel, _ = self._path_totals(edges)
+        elapsed = time.time() - start_time
+        print(f" Залежний від часу A* виконано за {elapsed:.4f} секунд")
+        self.route_edges = list(edges)
+        return self._to_osmids(nodes), distance_km, total_fuel, seconds / 60
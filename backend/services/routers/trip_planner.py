@@ -0,0 +1,64 @@
+import time
+from services.routers.astar_fuel_router import AStarFuelRouter
+from services.distance_matrix import DistanceMatrix
+from services.tsp import solve_path, path_cost, INF
+
+# Клас планує маршрут через кілька зупинок (наприклад, вибрані памʼятки)
+class TripPlanner(AStarFuelRouter):
+    """
+    Маршрут зі старту до фінішу через усі проміжні зупинки:
+    - матриця вартостей між усіма точками рахується один раз (DistanceMatrix:
+      CH із «кошиками», якщо ієрархію побудовано, інакше пошуки Дейкстри в пулі процесів)
+      з тим самим станом оверлею заторів, що й ділянки
+    - порядок зупинок — точний для невеликих наборів, інакше 2-opt / Or-opt (services.tsp)
+    - ділянки між сусідніми зупинками будуються A* тієї ж метрики і зшиваються в один шлях
+    """
+    def __init__(self, car_brand: str, car_model: str, car_year: int, **kwargs):
+        super().__init__(car_brand, car_model, car_year, **kwargs)
+
+# Планування: точки (lat, lon); повертає словник із порядком зупинок, шляхом і метриками
+    def plan(self, start: tuple, end: tuple, waypoints: list, weight_type: str = "fuel_weight") -> dict:
+        """
+        order — номери waypoints у порядку відвідування; legs — метрики кожної ділянки,
+        from/to у них — номери точок [start, *waypoints, end].
+        Повертає None, якщо якась зупинка чи ділянка недосяжна.
+        """
+        start_time = time.time()
+        points = [start] + list(waypoints) + [end]
+        nodes = [self._nearest_index(lat, lon) for lat, lon in points]
+        print(f" Планування поїздки: {len(waypoints)} зупинок, метрика '{weight_type}'")
+
+        matrix = DistanceMatrix(weight_type, self.avg_consumption, traffic=self.traffic).compute(nodes, nodes).tolist()
+        order = solve_path(matrix)
+        if path_cost(matrix, order) == INF:
+            print(" Деякі зупинки недосяжні.")
+            return None
+
+        path_nodes = [nodes[order[0]]]
+        path_edges = []
+        legs = []
+        for a, b in zip(order, order[1:]):
+            leg_edges = []
+            if nodes[a] != nodes[b]:
+                leg_nodes, leg_edges = self._astar_search(nodes[a], nodes[b], weight_type)
+                if not leg_edges:
+                    print(f" Ділянку {a} -> {b} не знайдено.")
+                    return None
+                path_nodes.extend(leg_nodes[1:])
+                path_edges.extend(leg_edges)
+            distance_km, total_fuel, duration_min = self._path_totals(leg_edges)
+            legs.append({"from": a, "to": b, "distance_km": distance_km,
+                         "fuel": total_fuel, "duration_min": duration_min})
+
+        distance_km, total_fuel, duration_min = self._path_totals(path_edges)
+        elapsed = time.time() - start_time
+        print(f" Поїздку сплановано за {elapsed:.4f} секунд")
+        return {
+            "order": [i - 1 for i in order[1:-1]],
+            "nodes": self._to_osmids(path_nodes),
+            "edges": path_edges,
+            "legs": legs,
+            "distance_km": distance_km,
+            "fuel": total_fuel,
+            "duration_min": duration_min,
+        }
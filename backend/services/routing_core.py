@@ -0,0 +1,337 @@
+import heapq
+import threading
+from services.graph_snapshot import GraphSnapshot
+
+INF = float('inf')
+
+
+class _SearchBuffers:
+    """
+    Буфери відстаней і попередників, що перевикористовуються між запитами.
+    Після пошуку скидаються лише змінені елементи (touched), а не весь масив.
+    """
+    def __init__(self, num_nodes: int):
+        self.dist = [INF] * num_nodes
+        self.pred_edge = [-1] * num_nodes
+        self.touched = []
+
+    def reset(self) -> None:
+        dist, pred_edge = self.dist, self.pred_edge
+        for node in self.touched:
+            dist[node] = INF
+            pred_edge[node] = -1
+        self.touched = []
+
+
+class RoutingEngine:
+    """
+    Ядро пошуку маршрутів на масивах CSR:
+    - вузли — цілі індекси знімка, ребра — позиції в масиві targets
+    - ваги передаються списком, індексованим номером ребра
+    - буфери пошуку окремі для кожного потоку і перевикористовуються між запитами
+
+    Масиви знімка один раз перетворюються на списки Python: у циклі релаксації
+    індексація списків значно дешевша, ніж словників NetworkX чи скалярів NumPy.
+    """
+    def __init__(self, snapshot: GraphSnapshot):
+        self.snapshot = snapshot
+        self.num_nodes = snapshot.num_nodes
+        self.offsets = snapshot.offsets.tolist()
+        self.sources = snapshot.sources.tolist()
+        self.targets = snapshot.targets.tolist()
+        self.node_x = snapshot.node_x.tolist()
+        self.node_y = snapshot.node_y.tolist()
+        self._reverse = None
+        self._reverse_lock = threading.Lock()
+        self._local = threading.local()
+
+# Зворотна суміжність у вигляді списків (будується при першому зверненні)
+    def reverse(self):
+        if self._reverse is None:
+            with self._reverse_lock:
+                if self._reverse is None:
+                    rev_offsets, rev_edges = self.snapshot.reverse_csr()
+                    self._reverse = (rev_offsets.tolist(), rev_edges.tolist())
+        return self._reverse
+
+# Повертає буфери поточного потоку (окремі для зворотного напрямку двонапрямного пошуку)
+    def _buffers(self, backward: bool = False) -> _SearchBuffers:
+        name = "backward_buffers" if backward else "buffers"
+        buffers = getattr(self._local, name, None)
+        if buffers is None:
+            buffers = _SearchBuffers(self.num_nodes)
+            setattr(self._local, name, buffers)
+        return buffers
+
+# Відновлює шлях (вузли та ребра) за ланцюжком попередніх ребер
+    def _unpack(self, pred_edge: list, source: int, target: int):
+        edges = []
+        node = target
+        while node != source:
+            edge = pred_edge[node]
+            edges.append(edge)
+            node = self.sources[edge]
+        edges.reverse()
+        nodes = [source] + [self.targets[e] for e in edges]
+        return nodes, edges
+
+# Пошук Дейкстри від source до target
+    def dijkstra(self, source: int, target: int, weights: list):
+        """
+        Повертає (вузли, ребра) найкоротшого шляху або ([], []), якщо шляху немає.
+        """
+        buffers = self._buffers()
+        dist, pred_edge, touched = buffers.dist, buffers.pred_edge, buffers.touched
+        offsets, targets = self.offsets, self.targets
+
+        try:
+            dist[source] = 0.0
+            touched.append(source)
+            queue = [(0.0, source)]
+            while queue:
+                d, u = heapq.heappop(queue)
+                if d > dist[u]:
+                    continue
+                if u == target:
+                    return self._unpack(pred_edge, source, target)
+
+                for e in range(offsets[u], offsets[u + 1]):
+                    v = targets[e]
+                    nd = d + weights[e]
+                    if nd < dist[v]:
+                        if dist[v] == INF:
+                            touched.append(v)
+                        dist[v] = nd
+                        pred_edge[v] = e
+                        heapq.heappush(queue, (nd, v))
+            return [], []
+        finally:
+            buffers.reset()
+
+# Пошук A* від source до target з евристикою heuristic(node) -> float
+    def astar(self, source: int, target: int, weights: list, heuristic):
+        """
+        Повертає (вузли, ребра) шляху або ([], []), якщо шляху немає.
+        """
+        buffers = self._buffers()
+        dist, pred_edge, touched = buffers.dist, buffers.pred_edge, buffers.touched
+        offsets, targets = self.offsets, self.targets
+
+        try:
+            dist[source] = 0.0
+            touched.append(source)
+            queue = [(heuristic(source), 0.0, source)]
+            while queue:
+                _, d, u = heapq.heappop(queue)
+                if d > dist[u]:
+                    continue
+                if u == target:
+                    return self._unpack(pred_edge, source, target)
+
+                for e in range(offsets[u], offsets[u + 1]):
+                    v = targets[e]
+                    nd = d + weights[e]
+                    if nd < dist[v]:
+                        if dist[v] == INF:
+                            touched.append(v)
+                        dist[v] = nd
+                        pred_edge[v] = e
+                        heapq.heappush(queue, (nd + heuristic(v), nd, v))
+            return [], []
+        finally:
+            buffers.reset()
+
+# Залежний від часу A* (або Дейкстра без heuristic): ваги — час проїзду в момент в'їзду на ребро
+    def time_dependent_astar(self, source: int, target: int, departure: float, speeds, heuristic=None):
+        """
+        Мітки вузлів — час прибуття (с від відправлення); speeds — TimeDependentSpeeds
+        (duration, profile_of, table, locate). Коефіцієнти профілів інтерполюються один раз
+        на вузол: відрізок часу спільний для всіх вихідних ребер.
+        Коректний для профілів із властивістю FIFO (пізніший в'їзд не дає раннішого виїзду).
+        Повертає (вузли, ребра, час у дорозі в с) або ([], [], INF), якщо шляху немає.
+        """
+        buffers = self._buffers()
+        dist, pred_edge, touched = buffers.dist, buffers.pred_edge, buffers.touched
+        offsets, targets = self.offsets, self.targets
+        duration, profile_of, table, locate = speeds.duration, speeds.profile_of, speeds.table, speeds.locate
+        if heuristic is None:
+            heuristic = lambda node: 0.0
+
+        try:
+            dist[source] = 0.0
+            touched.append(source)
+            queue = [(heuristic(source), 0.0, source)]
+            while queue:
+                _, d, u = heapq.heappop(queue)
+                if d > dist[u]:
+                    continue
+                if u == target:
+                    nodes, edges = self._unpack(pred_edge, source, target)
+                    return nodes, edges, d
+
+                i, frac = locate(departure + d)
+                for e in range(offsets[u], offsets[u + 1]):
+                    v = targets[e]
+                    row = table[profile_of[e]]
+                    nd = d + duration[e] / (row[i] + (row[i + 1] - row[i]) * frac)
+                    if nd < dist[v]:
+                        if dist[v] == INF:
+                            touched.append(v)
+                        dist[v] = nd
+                        pred_edge[v] = e
+                        heapq.heappush(queue, (nd + heuristic(v), nd, v))
+            return [], [], INF
+        finally:
+            buffers.reset()
+
+# Двонапрямний A* з потенціалом potential[node] (список за індексом вузла)
+    def bidirectional_astar(self, source: int, target: int, weights: list, potential: list):
+        """
+        Прямий пошук від source і зворотний від target на зведених вагах
+        w(u, v) - potential[u] + potential[v]; потенціал має бути узгодженим, наприклад
+        (h_to_target - h_from_source) / 2 для допустимих узгоджених оцінок.
+        Зупинка, коли сума мінімальних ключів обох черг не менша за найкращий шлях.
+        Повертає (вузли, ребра) найкоротшого шляху або ([], []), якщо шляху немає.
+        """
+        forward, backward = self._buffers(), self._buffers(backward=True)
+        dist_f, pred_f, touched_f = forward.dist, forward.pred_edge, forward.touched
+        dist_b, pred_b, touched_b = backward.dist, backward.pred_edge, backward.touched
+        offsets, targets, sources = self.offsets, self.targets, self.sources
+        rev_offsets, rev_edges = self.reverse()
+
+        try:
+            dist_f[source] = 0.0
+            dist_b[target] = 0.0
+            touched_f.append(source)
+            touched_b.append(target)
+            queue_f = [(potential[source], 0.0, source)]
+            queue_b = [(-potential[target], 0.0, target)]
+            best, meet = (0.0, source) if source == target else (INF, -1)
+
+            while queue_f and queue_b:
+                if queue_f[0][0] + queue_b[0][0] >= best:
+                    break
+                if queue_f[0][0] <= queue_b[0][0]:
+                    _, d, u = heapq.heappop(queue_f)
+                    if d > dist_f[u]:
+                        continue
+                    for e in range(offsets[u], offsets[u + 1]):
+                        v = targets[e]
+                        nd = d + weights[e]
+                        if nd < dist_f[v]:
+                            if dist_f[v] == INF:
+                                touched_f.append(v)
+                            dist_f[v] = nd
+                            pred_f[v] = e
+                            heapq.heappush(queue_f, (nd + potential[v], nd, v))
+                            if nd + dist_b[v] < best:
+                                best, meet = nd + dist_b[v], v
+                else:
+                    _, d, u = heapq.heappop(queue_b)
+                    if d > dist_b[u]:
+                        continue
+                    for i in range(rev_offsets[u], rev_offsets[u + 1]):
+                        e = rev_edges[i]
+                        v = sources[e]
+                        nd = d + weights[e]
+                        if nd < dist_b[v]:
+                            if dist_b[v] == INF:
+                                touched_b.append(v)
+                            dist_b[v] = nd
+                            pred_b[v] = e
+                            heapq.heappush(queue_b, (nd - potential[v], nd, v))
+                            if nd + dist_f[v] < best:
+                                best, meet = nd + dist_f[v], v
+
+            if meet < 0:
+                return [], []
+            nodes, edges = self._unpack(pred_f, source, meet)
+            node = meet
+            while node != target:
+                edge = pred_b[node]
+                edges.append(edge)
+                node = targets[edge]
+                nodes.append(node)
+            return nodes, edges
+        finally:
+            forward.reset()
+            backward.reset()
+
+# Відстані від source до набору вузлів targets (пошук зупиняється, щойно всі цілі досягнуто)
+    def distances_to(self, source: int, targets: list, weights: list) -> list:
+        """
+        Пошук «один до багатьох». Повертає список відстаней у порядку targets
+        (INF для недосяжних).
+        """
+        buffers = self._buffers()
+        dist, touched = buffers.dist, buffers.touched
+        offsets, edge_targets = self.offsets, self.targets
+        remaining = set(targets)
+
+        try:
+            dist[source] = 0.0
+            touched.append(source)
+            queue = [(0.0, source)]
+            while queue and remaining:
+                d, u = heapq.heappop(queue)
+                if d > dist[u]:
+                    continue
+                remaining.discard(u)
+
+                for e in range(offsets[u], offsets[u + 1]):
+                    v = edge_targets[e]
+                    nd = d + weights[e]
+                    if nd < dist[v]:
+                        if dist[v] == INF:
+                            touched.append(v)
+                        dist[v] = nd
+                        heapq.heappush(queue, (nd, v))
+            return [dist[t] for t in targets]
+        finally:
+            buffers.reset()
+
+# Відстані від root до всіх вузлів (або від усіх вузлів до root при reverse=True)
+    def shortest_distances(self, root: int, weights: list, reverse: bool = False, limit: float = INF) -> list:
+        """
+        Пошук «один до всіх». Повертає новий список відстаней за індексом вузла
+        (INF для недосяжних вузлів і вузлів далі за limit).
+        """
+        return self.shortest_path_tree(root, weights, reverse, limit)[0]
+
+# Дерево найкоротших шляхів від root (або до root при reverse=True)
+    def shortest_path_tree(self, root: int, weights: list, reverse: bool = False, limit: float = INF,
+                           target: int = -1, stretch: float = INF, bound: list = None):
+        """
+        Повертає нові списки (відстані, попередні ребра) за індексом вузла; для reverse=True
+        попереднє ребро вузла — наступне ребро його шляху до root.
+        Якщо задано target, після його досягнення межа пошуку звужується до stretch * dist(target).
+        bound — нижні оцінки решти шляху за вузлом: вузол не додається, якщо nd + bound[v] > limit.
+        """
+        if reverse:
+            offsets, edge_ids = self.reverse()
+            ends = self.sources
+        else:
+            offsets, edge_ids = self.offsets, None
+            ends = self.targets
+
+        dist = [INF] * self.num_nodes
+        pred_edge = [-1] * self.num_nodes
+        dist[root] = 0.0
+        queue = [(0.0, root)]
+        while queue:
+            d, u = heapq.heappop(queue)
+            if d > dist[u]:
+                continue
+            if d > limit:
+                break
+            if u == target:
+                limit = min(limit, d * stretch)
+            for i in range(offsets[u], offsets[u + 1]):
+                e = edge_ids[i] if reverse else i
+                v = ends[e]
+                nd = d + weights[e]
+                if nd < dist[v] and nd <= limit and (bound is None or nd + bound[v] <= limit):
+                    dist[v] = nd
+                    pred_edge[v] = e
+                    heapq.heappush(queue, (nd, v))
+        return dist, pred_edge
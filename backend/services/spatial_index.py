@@ -0,0 +1,239 @@
+import math
+from collections import namedtuple
+import numpy as np
+from services.geo import LocalProjection, point_segment_distance
+
+# Далі за цю відстань від дороги адреса вважається поза зоною покриття графа
+MAX_SNAP_DISTANCE_M = 2000
+CELL_SIZE_M = 200
+
+_KEY_OFFSET = 1 << 20
+
+# Результат прив'язки точки до графа:
+# node — індекс вузла знімка, distance_m — відстань до точки прив'язки,
+# lon/lat — координати точки прив'язки, edge/offset_m — ребро і відстань від його початку
+SnapResult = namedtuple("SnapResult", ["node", "distance_m", "lon", "lat", "edge", "offset_m"])
+
+
+class OutsideCoverageError(ValueError):
+    """Точка знаходиться далі за допустиму відстань від будь-якої дороги графа."""
+
+
+def _cell_key(cx, cy):
+    return (cx + _KEY_OFFSET) * (2 * _KEY_OFFSET) + (cy + _KEY_OFFSET)
+
+
+def edge_points(snapshot):
+    """
+    Точки геометрії всіх ребер знімка одним масивом (або два кінцеві вузли, якщо геометрії немає).
+    Повертає (ребро точки, номер точки в ребрі, lon, lat).
+    """
+    geom_offsets = np.asarray(snapshot.geom_offsets)
+    geom_len = np.diff(geom_offsets)
+    has_geom = geom_len > 0
+    counts = np.where(has_geom, geom_len, 2)
+
+    pt_edge = np.repeat(np.arange(snapshot.num_edges, dtype=np.int64), counts)
+    pt_local = np.arange(len(pt_edge), dtype=np.int64) - np.repeat(np.cumsum(counts) - counts, counts)
+    geom_idx = np.minimum(geom_offsets[:-1][pt_edge] + pt_local, max(len(snapshot.geom_x) - 1, 0))
+    end_node = np.where(pt_local == 0, np.asarray(snapshot.sources)[pt_edge], np.asarray(snapshot.targets)[pt_edge])
+
+    if len(snapshot.geom_x):
+        lons = np.where(has_geom[pt_edge], np.asarray(snapshot.geom_x)[geom_idx], np.asarray(snapshot.node_x)[end_node])
+        lats = np.where(has_geom[pt_edge], np.asarray(snapshot.geom_y)[geom_idx], np.asarray(snapshot.node_y)[end_node])
+    else:
+        lons = np.asarray(snapshot.node_x)[end_node]
+        lats = np.asarray(snapshot.node_y)[end_node]
+    return pt_edge, pt_local, lons, lats
+
+
+class GridIndex:
+    """
+    Рівномірна сітка над прямокутниками (bbox) об'єктів у метричних координатах.
+    Об'єкт реєструється в усіх клітинках, які перекриває його bbox.
+    """
+    def __init__(self, min_x, min_y, max_x, max_y, cell_size: float):
+        self.cell_size = float(cell_size)
+        min_x, min_y = np.asarray(min_x, dtype=np.float64), np.asarray(min_y, dtype=np.float64)
+        max_x, max_y = np.asarray(max_x, dtype=np.float64), np.asarray(max_y, dtype=np.float64)
+        self.size = len(min_x)
+
+        ix0 = np.floor(min_x / self.cell_size).astype(np.int64)
+        iy0 = np.floor(min_y / self.cell_size).astype(np.int64)
+        ix1 = np.floor(max_x / self.cell_size).astype(np.int64)
+        iy1 = np.floor(max_y / self.cell_size).astype(np.int64)
+        widths = ix1 - ix0 + 1
+        counts = widths * (iy1 - iy0 + 1)
+
+        # Розгортання (об'єкт, клітинка) без циклу Python
+        items = np.repeat(np.arange(self.size, dtype=np.int64), counts)
+        starts = np.repeat(np.cumsum(counts) - counts, counts)
+        local = np.arange(len(items), dtype=np.int64) - starts
+        cx = ix0[items] + local % widths[items]
+        cy = iy0[items] + local // widths[items]
+
+        keys = _cell_key(cx, cy)
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        self.items = items[order]
+        unique, first = np.unique(keys, return_index=True)
+        last = np.append(first[1:], len(keys))
+        self._cells = dict(zip(unique.tolist(), zip(first.tolist(), last.tolist())))
+
+# Клітинка, що містить точку
+    def cell_of(self, x: float, y: float):
+        return math.floor(x / self.cell_size), math.floor(y / self.cell_size)
+
+# Об'єкти в переліку клітинок (можливі повтори)
+    def _collect(self, cells) -> np.ndarray:
+        chunks = []
+        for cx, cy in cells:
+            span = self._cells.get(_cell_key(cx, cy))
+            if span is not None:
+                chunks.append(self.items[span[0]:span[1]])
+        if not chunks:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(chunks))
+
+# Об'єкти в клітинках на «кільці» радіуса r навколо клітинки (cx, cy)
+    def ring(self, cx: int, cy: int, r: int) -> np.ndarray:
+        if r == 0:
+            return self._collect([(cx, cy)])
+        cells = [(cx + dx, cy + dy) for dx in range(-r, r + 1) for dy in (-r, r)]
+        cells += [(cx + dx, cy + dy) for dx in (-r, r) for dy in range(-r + 1, r)]
+        return self._collect(cells)
+
+# Об'єкти, чиї клітинки перетинають прямокутник
+    def query_bbox(self, min_x: float, min_y: float, max_x: float, max_y: float) -> np.ndarray:
+        cx0, cy0 = self.cell_of(min_x, min_y)
+        cx1, cy1 = self.cell_of(max_x, max_y)
+        return self._collect((cx, cy) for cx in range(cx0, cx1 + 1) for cy in range(cy0, cy1 + 1))
+
+# Найближчий об'єкт за функцією відстані distance_fn(ids) -> масив відстаней
+    def nearest(self, x: float, y: float, distance_fn, max_distance: float):
+        cx, cy = self.cell_of(x, y)
+        best, best_d = -1, math.inf
+        max_ring = int(max_distance // self.cell_size) + 1
+        for r in range(max_ring + 1):
+            ids = self.ring(cx, cy, r)
+            if len(ids):
+                d = distance_fn(ids)
+                j = int(np.argmin(d))
+                if d[j] < best_d:
+                    best, best_d = int(ids[j]), float(d[j])
+            # усі об'єкти за межами кільця r знаходяться далі ніж r * cell_size
+            if best_d <= r * self.cell_size:
+                break
+        if best_d > max_distance:
+            return -1, best_d
+        return best, best_d
+
+
+class GraphSpatialIndex:
+    """
+    Просторовий індекс вузлів і ребер знімка графа для прив'язки координат:
+    - будується один раз при завантаженні графа (сітка в локальній метричній проєкції)
+    - snap(points) прив'язує пачку точок до найближчих вузлів або ребер
+    - точки далі за max_distance_m повертаються як «поза зоною покриття»
+    """
+    def __init__(self, snapshot, cell_size_m: float = CELL_SIZE_M, max_distance_m: float = MAX_SNAP_DISTANCE_M):
+        self.snapshot = snapshot
+        self.max_distance_m = max_distance_m
+        self.projection = LocalProjection.around(snapshot.node_x, snapshot.node_y)
+
+        self.node_px, self.node_py = self.projection.forward(snapshot.node_x, snapshot.node_y)
+        self.nodes = GridIndex(self.node_px, self.node_py, self.node_px, self.node_py, cell_size_m)
+        self._build_segments(cell_size_m)
+
+# Відрізки геометрії всіх ребер (або пряма між вузлами, якщо геометрії немає)
+    def _build_segments(self, cell_size_m: float) -> None:
+        snap = self.snapshot
+        pt_edge, _, lons, lats = edge_points(snap)
+        px, py = self.projection.forward(lons, lats)
+
+        # Сусідні точки однієї геометрії утворюють відрізок
+        same = pt_edge[:-1] == pt_edge[1:]
+        self.seg_edge = pt_edge[:-1][same]
+        self.seg_ax, self.seg_ay = px[:-1][same], py[:-1][same]
+        self.seg_bx, self.seg_by = px[1:][same], py[1:][same]
+
+        # Відстань від початку ребра до початку відрізка
+        seg_len = np.hypot(self.seg_bx - self.seg_ax, self.seg_by - self.seg_ay)
+        cumulative = np.cumsum(seg_len) - seg_len
+        first_of_edge = np.ones(len(self.seg_edge), dtype=bool)
+        first_of_edge[1:] = self.seg_edge[1:] != self.seg_edge[:-1]
+        edge_start = np.maximum.accumulate(np.where(first_of_edge, np.arange(len(seg_len)), 0))
+        self.seg_offset = cumulative - cumulative[edge_start]
+        self.seg_len = seg_len
+        self.edge_geom_len = np.bincount(self.seg_edge, weights=seg_len, minlength=snap.num_edges)
+
+        self.segments = GridIndex(
+            np.minimum(self.seg_ax, self.seg_bx), np.minimum(self.seg_ay, self.seg_by),
+            np.maximum(self.seg_ax, self.seg_bx), np.maximum(self.seg_ay, self.seg_by),
+            cell_size_m,
+        )
+
+# Найближчий вузол: (індекс вузла, відстань у метрах) або (-1, відстань)
+    def _nearest_node_xy(self, px: float, py: float, max_distance_m: float):
+        return self.nodes.nearest(
+            px, py,
+            lambda ids: np.hypot(self.node_px[ids] - px, self.node_py[ids] - py),
+            max_distance_m,
+        )
+
+# Найближчий вузол для координат; поза зоною покриття — OutsideCoverageError
+    def nearest_node(self, lon: float, lat: float, max_distance_m: float = None) -> int:
+        max_distance_m = self.max_distance_m if max_distance_m is None else max_distance_m
+        px, py = self.projection.forward(lon, lat)
+        node, distance = self._nearest_node_xy(float(px), float(py), max_distance_m)
+        if node < 0:
+            raise OutsideCoverageError(
+                f"Точка ({lat:.5f}, {lon:.5f}) поза зоною покриття графа (>{max_distance_m:.0f} м від дороги)"
+            )
+        return node
+
+# Прив'язка до найближчого ребра: проєкція точки на відрізок геометрії
+    def _snap_to_edge(self, px: float, py: float, max_distance_m: float):
+        def distance_fn(ids):
+            d, _ = point_segment_distance(px, py, self.seg_ax[ids], self.seg_ay[ids], self.seg_bx[ids], self.seg_by[ids])
+            return d
+
+        seg, distance = self.segments.nearest(px, py, distance_fn, max_distance_m)
+        if seg < 0:
+            return None
+        _, t = point_segment_distance(px, py, self.seg_ax[seg], self.seg_ay[seg], self.seg_bx[seg], self.seg_by[seg])
+        t = float(t)
+        qx = self.seg_ax[seg] + t * (self.seg_bx[seg] - self.seg_ax[seg])
+        qy = self.seg_ay[seg] + t * (self.seg_by[seg] - self.seg_ay[seg])
+        lon, lat = self.projection.inverse(qx, qy)
+
+        edge = int(self.seg_edge[seg])
+        offset = float(self.seg_offset[seg] + t * self.seg_len[seg])
+        # найближчий кінець ребра вздовж геометрії — для алгоритмів, що працюють з вузлами
+        node = int(self.snapshot.sources[edge] if offset <= self.edge_geom_len[edge] / 2 else self.snapshot.targets[edge])
+        return SnapResult(node, distance, float(lon), float(lat), edge, offset)
+
+# Пакетна прив'язка точок [(lon, lat), ...]
+    def snap(self, points, to_edge: bool = False, max_distance_m: float = None) -> list:
+        """
+        Повертає список SnapResult (або None для точок поза зоною покриття).
+        """
+        max_distance_m = self.max_distance_m if max_distance_m is None else max_distance_m
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        pxs, pys = self.projection.forward(points[:, 0], points[:, 1])
+
+        results = []
+        for px, py in zip(pxs.tolist(), pys.tolist()):
+            if to_edge:
+                results.append(self._snap_to_edge(px, py, max_distance_m))
+                continue
+            node, distance = self._nearest_node_xy(px, py, max_distance_m)
+            if node < 0:
+                results.append(None)
+            else:
+                results.append(SnapResult(
+                    node, distance,
+                    float(self.snapshot.node_x[node]), float(self.snapshot.node_y[node]),
+                    None, None,
+                ))
+        return results
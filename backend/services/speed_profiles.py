@@ -0,0 +1,191 @@
+import os
+import sys
+import copy
+import bisect
+import numpy as np
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+SPEED_PROFILES_FORMAT_VERSION = 1
+SPEED_PROFILES_FILENAME = "speed_profiles.npz"
+
+DAY_SECONDS = 24 * 3600
+WEEK_SECONDS = 7 * DAY_SECONDS
+# Профілі задано в місцевому часі; час відправлення з часовим поясом переводиться в нього
+PROFILE_TIMEZONE = ZoneInfo("Europe/Kyiv")
+# Крок точок вбудованих профілів
+DEFAULT_STEP_SECONDS = 1800
+
+# Глибина «пробок» за класом дороги: у пік швидкість падає до (1 - глибина) від звичайної
+CONGESTION_DEPTH = {
+    "motorway": 0.35, "trunk": 0.4,
+    "primary": 0.45, "secondary": 0.45,
+    "tertiary": 0.35, "residential": 0.2,
+    "living_street": 0.05, "service": 0.05,
+}
+DEFAULT_CONGESTION_DEPTH = 0.25
+# Години пік (центр, півширина) у будні; у вихідні пік слабший
+RUSH_HOURS = ((8.5, 1.5), (18.0, 2.0))
+WEEKEND_RUSH_SHARE = 0.3
+# Уночі вільні дороги: швидкість трохи вища за середню
+NIGHT_HOURS = (0.0, 5.0)
+NIGHT_FACTOR = 1.1
+
+
+class SpeedProfiles:
+    """
+    Кусково-лінійні профілі швидкості за часом тижня у вигляді масивів:
+    - breakpoints — спільні для всіх профілів точки (секунди від понеділка 00:00)
+    - factors — (профілі, точки): коефіцієнт до звичайної швидкості класу дороги
+      (між точками — лінійна інтерполяція, після останньої — до першої наступного тижня)
+    - class_profile — профіль за класом дороги (class_names), edge_profile — необов'язкові
+      профілі окремих ребер (-1 — профіль класу)
+
+    Пам'ять: один int16/int32 на ребро і невелика таблиця профілів, без словників на ребро.
+    """
+    def __init__(self, breakpoints, factors, class_names, class_profile, edge_profile=None):
+        self.breakpoints = np.asarray(breakpoints, dtype=np.float64)
+        self.factors = np.asarray(factors, dtype=np.float32)
+        self.class_names = [str(c) for c in class_names]
+        self.class_profile = np.asarray(class_profile, dtype=np.int32)
+        self.edge_profile = None if edge_profile is None else np.asarray(edge_profile)
+        if self.factors.ndim != 2 or self.factors.shape[1] != len(self.breakpoints):
+            raise ValueError("Розмір factors не відповідає breakpoints")
+        if len(self.breakpoints) == 0 or self.breakpoints[0] != 0 or np.any(np.diff(self.breakpoints) <= 0) \
+                or self.breakpoints[-1] >= WEEK_SECONDS:
+            raise ValueError("breakpoints мають зростати від 0 у межах тижня")
+        if np.any(self.factors <= 0):
+            raise ValueError("Коефіцієнти швидкості мають бути додатними")
+
+# Профіль кожного ребра знімка (масив індексів у factors)
+    def edge_profiles(self, snapshot) -> np.ndarray:
+        by_name = dict(zip(self.class_names, self.class_profile.tolist()))
+        default = by_name.get("", 0)
+        class_map = np.array([by_name.get(c, default) for c in snapshot.highway_classes], dtype=np.int32)
+        profiles = class_map[np.asarray(snapshot.highway)]
+        if self.edge_profile is not None:
+            if len(self.edge_profile) != snapshot.num_edges:
+                raise ValueError("edge_profile не відповідає кількості ребер знімка")
+            override = np.asarray(self.edge_profile) >= 0
+            profiles[override] = np.asarray(self.edge_profile)[override]
+        return profiles
+
+    def save(self, path: str) -> None:
+        arrays = {
+            "format_version": np.array(SPEED_PROFILES_FORMAT_VERSION),
+            "breakpoints": self.breakpoints,
+            "factors": self.factors,
+            "class_names": np.array(self.class_names),
+            "class_profile": self.class_profile,
+        }
+        if self.edge_profile is not None:
+            arrays["edge_profile"] = self.edge_profile
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> "SpeedProfiles":
+        with np.load(path) as data:
+            version = int(data["format_version"])
+            if version != SPEED_PROFILES_FORMAT_VERSION:
+                raise ValueError(f"Непідтримувана версія профілів швидкості: {version}")
+            return cls(data["breakpoints"], data["factors"], data["class_names"], data["class_profile"],
+                       data["edge_profile"] if "edge_profile" in data else None)
+
+    @classmethod
+    def default(cls, class_names: list, step: int = DEFAULT_STEP_SECONDS) -> "SpeedProfiles":
+        """
+        Вбудовані профілі за класами доріг: ранковий і вечірній пік у будні,
+        слабший пік у вихідні, трохи вища швидкість уночі.
+        """
+        breakpoints = np.arange(0, WEEK_SECONDS, step, dtype=np.float64)
+        hours = breakpoints % DAY_SECONDS / 3600
+        weekend = breakpoints // DAY_SECONDS >= 5
+        rush = np.zeros_like(hours)
+        for centre, width in RUSH_HOURS:
+            rush = np.maximum(rush, np.clip(1 - np.abs(hours - centre) / width, 0, 1))
+        rush[weekend] *= WEEKEND_RUSH_SHARE
+        night = (hours >= NIGHT_HOURS[0]) & (hours < NIGHT_HOURS[1])
+
+        # "" — профіль для класів, яких немає в таблиці; класи з однаковою глибиною ділять профіль
+        names = [""] + [c for c in class_names if c]
+        class_depth = [CONGESTION_DEPTH.get(c, DEFAULT_CONGESTION_DEPTH) for c in names]
+        depths = sorted(set(class_depth))
+        factors = np.array([np.where(night, NIGHT_FACTOR, 1 - depth * rush) for depth in depths], dtype=np.float32)
+        return cls(breakpoints, factors, names, [depths.index(d) for d in class_depth])
+
+
+# Секунди від понеділка 00:00 для моменту відправлення (за замовчуванням — зараз)
+def week_seconds(departure: datetime = None) -> float:
+    departure = departure or datetime.now(PROFILE_TIMEZONE)
+    if departure.tzinfo is not None:
+        departure = departure.astimezone(PROFILE_TIMEZONE)
+    return (departure.weekday() * DAY_SECONDS + departure.hour * 3600 + departure.minute * 60
+            + departure.second + departure.microsecond / 1e6)
+
+
+class TimeDependentSpeeds:
+    """
+    Час проїзду ребер, що залежить від моменту в'їзду на ребро:
+    duration[e] (за звичайною швидкістю класу) / коефіцієнт профілю ребра в цей момент.
+
+    Дані для ядра пошуку — списки Python: duration, profile_of (профіль ребра),
+    table (рядки коефіцієнтів з повтором першої точки в кінці для переходу через тиждень)
+    і locate(t) -> (відрізок, частка) спільний для всіх профілів.
+    """
+    def __init__(self, snapshot, edge_weights, profiles: SpeedProfiles):
+        self.profiles = profiles
+        self.duration = edge_weights.duration.tolist()
+        self.profile_of = profiles.edge_profiles(snapshot).tolist()
+        factors = profiles.factors.astype(np.float64)
+        self.table = np.hstack([factors, factors[:, :1]]).tolist()
+        self.bounds = profiles.breakpoints.tolist() + [float(WEEK_SECONDS)]
+        # Найбільший коефіцієнт: ділення статичних оцінок на нього дає допустиму евристику
+        self.max_factor = float(factors.max())
+
+# Ті самі профілі з іншою базовою тривалістю ребер (наприклад, з урахуванням заторів)
+    def with_duration(self, duration: list) -> "TimeDependentSpeeds":
+        speeds = copy.copy(self)
+        speeds.duration = duration
+        return speeds
+
+    def locate(self, t: float):
+        t %= WEEK_SECONDS
+        i = bisect.bisect_right(self.bounds, t) - 1
+        return i, (t - self.bounds[i]) / (self.bounds[i + 1] - self.bounds[i])
+
+# Час проїзду ребра (с) при в'їзді в момент t (секунди тижня)
+    def travel_time(self, edge: int, t: float) -> float:
+        i, frac = self.locate(t)
+        row = self.table[self.profile_of[edge]]
+        return self.duration[edge] / (row[i] + (row[i + 1] - row[i]) * frac)
+
+# Тривалість проїзду послідовності ребер (с) при відправленні в момент departure (секунди тижня)
+    def path_duration(self, edges: list, departure: float) -> float:
+        elapsed = 0.0
+        for edge in edges:
+            elapsed += self.travel_time(edge, departure + elapsed)
+        return elapsed
+
+
+def speed_profiles_path(snapshot_path: str) -> str:
+    """
+    Файл профілів швидкості всередині знімка графа: data/kyiv_with_poi.snapshot/speed_profiles.npz
+    """
+    return os.path.join(snapshot_path, SPEED_PROFILES_FILENAME)
+
+
+def export_default(filepath: str = None) -> None:
+    """
+    Записує вбудовані профілі у файл знімка як відправну точку для власних даних.
+    """
+    from services.graph_registry import get_snapshot
+
+    snapshot = get_snapshot(filepath)
+    path = speed_profiles_path(snapshot.path)
+    SpeedProfiles.default(snapshot.highway_classes).save(path)
+    print(f"Профілі швидкості збережено: {path}")
+
+
+if __name__ == "__main__":
+    # python -m services.speed_profiles
+    export_default(sys.argv[1] if len(sys.argv) > 1 else None)
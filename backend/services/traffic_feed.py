@@ -0,0 +1,92 @@
+import os
+import json
+import threading
+from services.traffic_overlay import get_traffic_overlay
+
+# Файл-стрічка оновлень (NDJSON); порожній шлях — стрічку вимкнено
+TRAFFIC_FEED_PATH = os.getenv("TRAFFIC_FEED_PATH", "")
+TRAFFIC_FEED_INTERVAL = float(os.getenv("TRAFFIC_FEED_INTERVAL", "1.0"))
+
+
+class LocalTrafficFeed:
+    """
+    Локальна стрічка заторів і перекриттів (замість зовнішнього постачальника):
+    - файл NDJSON, у який дописуються рядки; рядок — одне оновлення (об'єкт)
+      або пакет (масив об'єктів) у форматі TrafficOverlay.apply
+    - фоновий потік читає лише нові рядки з останньої позиції і застосовує
+      все прочитане за один раз одним пакетом (одна нова версія оверлею)
+    - якщо файл скоротили або замінили, читання починається спочатку
+    """
+    def __init__(self, path: str, overlay=None, interval: float = TRAFFIC_FEED_INTERVAL):
+        self.path = path
+        self.overlay = overlay
+        self.interval = interval
+        self._offset = 0
+        self._inode = None
+        self._stop = threading.Event()
+        self._thread = None
+
+# Читає нові рядки і застосовує їх; повертає результат apply або None, якщо нового немає
+    def poll(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        if stat.st_ino != self._inode or stat.st_size < self._offset:
+            self._inode = stat.st_ino
+            self._offset = 0
+        if stat.st_size == self._offset:
+            return None
+
+        updates = []
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            for line in f:
+                # Незавершений рядок дочитується при наступному опитуванні
+                if not line.endswith(b"\n"):
+                    break
+                self._offset += len(line)
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    item = json.loads(line)
+                except ValueError as e:
+                    print(f"Стрічка трафіку: некоректний рядок ({e})")
+                    continue
+                updates.extend(item if isinstance(item, list) else [item])
+
+        if not updates:
+            return None
+        overlay = self.overlay or get_traffic_overlay()
+        result = overlay.apply(updates)
+        if result["rejected"]:
+            print(f"Стрічка трафіку: відхилено {len(result['rejected'])} з {len(updates)} оновлень")
+        return result
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"Стрічка трафіку: помилка {e}")
+
+    def start(self) -> "LocalTrafficFeed":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="traffic-feed", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+# Запускає стрічку, якщо задано TRAFFIC_FEED_PATH
+def start_traffic_feed(path: str = TRAFFIC_FEED_PATH):
+    if not path:
+        return None
+    print(f"Стрічка трафіку: {path}")
+    return LocalTrafficFeed(path).start()
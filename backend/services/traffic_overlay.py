@@ -0,0 +1,318 @@
+import time
+import threading
+import numpy as np
+from services.cache_store import LRUCache
+from services.graph_registry import get_snapshot
+
+INF = float('inf')
+
+# Термін дії оновлення без явного ttl/expires_at і найдовший дозволений, с
+DEFAULT_TTL = 15 * 60
+MAX_TTL = 24 * 3600
+# Найбільший коефіцієнт уповільнення; перекриття — окремий прапорець closed
+MAX_FACTOR = 100.0
+# Скільки колонок ваг (метрика і витрата) тримати пропатченими в пам'яті
+PATCHED_COLUMNS = 32
+# Колонка, на яку діють коефіцієнти уповільнення; перекриття діють на всі колонки
+SLOWDOWN_METRIC = "duration_weight"
+
+_EMPTY_EDGES = np.empty(0, dtype=np.int64)
+_EMPTY_FACTORS = np.empty(0, dtype=np.float64)
+
+
+class _PatchedColumn:
+    """
+    Пропатчені копії однієї колонки ваг (копіювання під час запису): кожна версія
+    оверлею отримує власний список, зібраний з копії попередньої версії оновленням лише
+    ребер, що змінились. Списки ніколи не змінюються після віддачі, тож пошук, що вже йде,
+    бачить рівно ту версію, з якою почав.
+    """
+    def __init__(self, base: list):
+        self.base = base
+        self.values = base
+        self.applied = {}
+        self.version = -1
+        self._lock = threading.Lock()
+
+    def update(self, version: int, target: dict) -> list:
+        with self._lock:
+            if version == self.version:
+                return self.values
+            if version < self.version:
+                # Стара версія (запит почався до нового пакета): окрема копія з бази
+                values = list(self.base)
+                for edge, value in target.items():
+                    values[edge] = value
+                return values
+            values, base = list(self.values), self.base
+            for edge in self.applied.keys() - target.keys():
+                values[edge] = base[edge]
+            for edge, value in target.items():
+                values[edge] = value
+            self.values = values
+            self.applied = target
+            self.version = version
+        return values
+
+
+class PatchedColumns:
+    """Пропатчені колонки за назвою (LRU): остання версія кожної — основа для наступної."""
+    def __init__(self, maxsize: int = PATCHED_COLUMNS):
+        self._columns = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+
+    def get(self, name: str, base: list) -> _PatchedColumn:
+        with self._lock:
+            column = self._columns.get(name)
+            if column is None or column.base is not base:
+                column = _PatchedColumn(base)
+                self._columns.set(name, column)
+        return column
+
+
+_local_columns = None
+_local_columns_lock = threading.Lock()
+
+
+# Пропатчені колонки процесу (для знімків стану, переданих у процеси пулу)
+def _get_local_columns() -> PatchedColumns:
+    global _local_columns
+    with _local_columns_lock:
+        if _local_columns is None:
+            _local_columns = PatchedColumns()
+    return _local_columns
+
+
+def column_name(metric: str, avg_consumption: float) -> str:
+    """Назва колонки ваг для patch(): від витрати залежить лише колонка пального."""
+    return f"{metric}@{round(float(avg_consumption), 3)}" if metric == "fuel_weight" else metric
+
+
+class TrafficView:
+    """
+    Стан оверлею на момент запиту: ребра і коефіцієнти (inf — перекриття).
+    Коефіцієнти уповільнення діють лише на тривалість (SLOWDOWN_METRIC): довжина і пальне
+    ребра від затору не змінюються; перекрите ребро недоступне за будь-якою метрикою.
+    """
+    def __init__(self, version: int, edges: np.ndarray, factors: np.ndarray, columns: PatchedColumns = None):
+        self.version = version
+        self.edges = edges
+        self.factors = factors
+        self.closed = edges[np.isinf(factors)]
+        self._columns = columns
+        self._patched = {}
+        self._patched_lock = threading.Lock()
+
+    # У процес пулу передається лише розріджена дельта; колонки там — свої для процесу
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_columns"] = None
+        state["_patched"] = {}
+        del state["_patched_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._columns = _get_local_columns()
+        self._patched_lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return len(self.edges) > 0
+
+# Чи змінює оверлей ваги метрики (для тривалості — будь-який запис, для інших — лише перекриття)
+    def affects(self, metric: str) -> bool:
+        return bool(len(self.edges if metric == SLOWDOWN_METRIC else self.closed))
+
+    def _delta(self, base, slowdown: bool) -> dict:
+        if not slowdown:
+            return dict.fromkeys(self.closed.tolist(), INF)
+        return {
+            edge: INF if factor == INF else base[edge] * factor
+            for edge, factor in zip(self.edges.tolist(), self.factors.tolist())
+        }
+
+# Колонка ваг метрики з урахуванням оверлею (список; без змін — та сама колонка без копіювання)
+    def patch(self, name: str, values: list, metric: str) -> list:
+        """
+        name ідентифікує колонку (метрика і витрата). Для кожної версії оверлею колонка
+        копіюється один раз (з попередньої версії, оновлюються лише ребра дельти) і далі
+        спільна для всіх маршрутизаторів, що отримали цей самий стан; новіші версії
+        отримують нові списки, тож стан запиту не змінюється під час пошуку.
+        """
+        slowdown = metric == SLOWDOWN_METRIC
+        if not self.affects(metric):
+            return values
+        with self._patched_lock:
+            patched = self._patched.get(name)
+            if patched is not None and patched[0] is values:
+                return patched[1]
+            delta = self._delta(values, slowdown)
+            if self._columns is None:
+                result = list(values)
+                for edge, value in delta.items():
+                    result[edge] = value
+            else:
+                result = self._columns.get(name, values).update(self.version, delta)
+            self._patched[name] = (values, result)
+        return result
+
+# Те саме для масиву NumPy (повертає нову копію)
+    def apply_array(self, values: np.ndarray, metric: str = None) -> np.ndarray:
+        values = np.array(values, dtype=np.float64)
+        if metric == SLOWDOWN_METRIC:
+            slow = ~np.isinf(self.factors)
+            values[self.edges[slow]] *= self.factors[slow]
+        values[self.closed] = INF
+        return values
+
+
+class TrafficOverlay:
+    """
+    Оверлей заторів і перекриттів поверх базових ваг знімка:
+    - оновлення надходять пакетами; кожне — уповільнення ребра (factor >= 1) або перекриття
+      (closed) з терміном дії; factor = 1 або clear знімає обмеження з ребра
+    - зберігається лише розріджена дельта {ребро: (коефіцієнт, час закінчення)};
+      граф і базові колонки ваг не копіюються і не змінюються
+    - кожен пакет і кожне закінчення терміну дії підвищують версію; view() віддає
+      стан поточної версії (масиви будуються ліниво, не на кожен пакет)
+    - уповільнення множить лише тривалість ребра, перекриття робить ребро недоступним
+      за всіма метриками; пропатчена колонка нової версії — копія попередньої з оновленими
+      ребрами дельти, тож запит до кінця бачить ту версію, з якою почав
+    - лише коефіцієнти >= 1: нижні оцінки A*/ALT за базовими вагами лишаються допустимими
+    """
+    def __init__(self, snapshot, clock=time.time):
+        self.snapshot = snapshot
+        self.clock = clock
+        self._entries = {}
+        self._version = 0
+        self._next_expiry = INF
+        self._view = TrafficView(0, _EMPTY_EDGES, _EMPTY_FACTORS)
+        self._columns = PatchedColumns()
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+# Ребра знімка, яких стосується оновлення: "edge" (номер ребра) або "from"/"to" (osmid, усі паралельні ребра)
+    def resolve(self, update: dict) -> list:
+        snapshot = self.snapshot
+        if update.get("edge") is not None:
+            edge = int(update["edge"])
+            if not 0 <= edge < snapshot.num_edges:
+                raise ValueError(f"Немає ребра {edge}")
+            return [edge]
+        try:
+            u = snapshot.index_of(update["from"])
+            v = snapshot.index_of(update["to"])
+        except KeyError as e:
+            raise ValueError(f"Невідомий вузол {e}")
+        start, end = int(snapshot.offsets[u]), int(snapshot.offsets[u + 1])
+        edges = (start + np.flatnonzero(np.asarray(snapshot.targets[start:end]) == v)).tolist()
+        if not edges:
+            raise ValueError(f"Між вузлами {update['from']} і {update['to']} немає ребра")
+        return edges
+
+    def _parse(self, update: dict, now: float):
+        edges = self.resolve(update)
+        if update.get("clear"):
+            return edges, None, None
+        if update.get("closed"):
+            factor = INF
+        else:
+            factor = float(update.get("factor", 1.0))
+            if not 1.0 <= factor <= MAX_FACTOR:
+                raise ValueError(f"Коефіцієнт має бути в межах 1..{MAX_FACTOR}: {factor}")
+            if factor == 1.0:
+                return edges, None, None
+        if update.get("expires_at") is not None:
+            expires = min(float(update["expires_at"]), now + MAX_TTL)
+        else:
+            expires = now + min(float(update.get("ttl", DEFAULT_TTL)), MAX_TTL)
+        if expires <= now:
+            return edges, None, None
+        return edges, factor, expires
+
+# Застосовує пакет оновлень однією версією; некоректні оновлення пропускаються
+    def apply(self, updates: list) -> dict:
+        """
+        Повертає {"version", "applied", "rejected": [{"index", "error"}]}.
+        """
+        now = self.clock()
+        parsed, rejected = [], []
+        for i, update in enumerate(updates):
+            try:
+                if not isinstance(update, dict):
+                    raise ValueError("Оновлення має бути об'єктом")
+                parsed.append(self._parse(update, now))
+            except (KeyError, TypeError, ValueError) as e:
+                rejected.append({"index": i, "error": str(e)})
+
+        with self._lock:
+            entries = self._entries
+            for edges, factor, expires in parsed:
+                for edge in edges:
+                    if factor is None:
+                        entries.pop(edge, None)
+                    else:
+                        entries[edge] = (factor, expires)
+                        self._next_expiry = min(self._next_expiry, expires)
+            if parsed:
+                self._version += 1
+            version = self._version
+        return {"version": version, "applied": len(parsed), "rejected": rejected}
+
+# Поточний стан для запиту (спочатку прибираються записи, термін яких минув)
+    def view(self) -> TrafficView:
+        now = self.clock()
+        with self._lock:
+            if now >= self._next_expiry:
+                self._expire(now)
+            view = self._view
+            if view.version != self._version:
+                view = self._build_view()
+                self._view = view
+        return view
+
+    def _expire(self, now: float) -> None:
+        expired = [edge for edge, (_, expires) in self._entries.items() if expires <= now]
+        for edge in expired:
+            del self._entries[edge]
+        self._next_expiry = min((expires for _, expires in self._entries.values()), default=INF)
+        if expired:
+            self._version += 1
+
+    def _build_view(self) -> TrafficView:
+        if not self._entries:
+            return TrafficView(self._version, _EMPTY_EDGES, _EMPTY_FACTORS)
+        edges = np.fromiter(self._entries.keys(), dtype=np.int64, count=len(self._entries))
+        factors = np.fromiter((f for f, _ in self._entries.values()), dtype=np.float64, count=len(self._entries))
+        return TrafficView(self._version, edges, factors, self._columns)
+
+    def clear(self) -> None:
+        with self._lock:
+            if self._entries:
+                self._entries.clear()
+                self._version += 1
+            self._next_expiry = INF
+
+    def status(self) -> dict:
+        view = self.view()
+        return {
+            "version": view.version,
+            "active": int(len(view.edges)),
+            "closed": int(len(view.closed)),
+        }
+
+
+_overlay = None
+_overlay_lock = threading.Lock()
+
+
+def get_traffic_overlay() -> TrafficOverlay:
+    global _overlay
+    with _overlay_lock:
+        if _overlay is None:
+            _overlay = TrafficOverlay(get_snapshot())
+    return _overlay
@@ -0,0 +1,142 @@
+INF = float('inf')
+
+# До стількох проміжних зупинок порядок шукається точно (Гелд — Карп, O(n² · 2ⁿ))
+EXACT_MAX_STOPS = 10
+# Вартість недосяжної пари у пошуку порядку: скінченна, щоб різниці не давали nan
+UNREACHABLE_COST = 1e15
+# Мінімальне покращення, яке вважається значущим
+_IMPROVEMENT_EPS = 1e-9
+
+
+def path_cost(matrix: list, order: list) -> float:
+    """
+    Вартість проходу точками в порядку order за (несиметричною) матрицею вартостей.
+    """
+    return sum(matrix[a][b] for a, b in zip(order, order[1:]))
+
+
+def _finite(matrix: list) -> list:
+    return [[UNREACHABLE_COST if value == INF else value for value in row] for row in matrix]
+
+
+def held_karp(matrix: list) -> list:
+    """
+    Точний найдешевший шлях від точки 0 до точки n-1 через усі інші точки.
+    """
+    n = len(matrix)
+    if n <= 2:
+        return list(range(n))
+    k = n - 2
+    full = (1 << k) - 1
+    dp = [[INF] * k for _ in range(full + 1)]
+    parent = [[-1] * k for _ in range(full + 1)]
+    for j in range(k):
+        dp[1 << j][j] = matrix[0][j + 1]
+
+    for mask in range(1, full + 1):
+        costs = dp[mask]
+        for j in range(k):
+            d = costs[j]
+            if d == INF or not mask >> j & 1:
+                continue
+            row = matrix[j + 1]
+            for nxt in range(k):
+                if mask >> nxt & 1:
+                    continue
+                new_mask = mask | 1 << nxt
+                nd = d + row[nxt + 1]
+                if nd < dp[new_mask][nxt]:
+                    dp[new_mask][nxt] = nd
+                    parent[new_mask][nxt] = j
+
+    last = min(range(k), key=lambda j: dp[full][j] + matrix[j + 1][n - 1])
+    order = []
+    mask = full
+    while last >= 0:
+        order.append(last + 1)
+        last, mask = parent[mask][last], mask & ~(1 << last)
+    order.reverse()
+    return [0] + order + [n - 1]
+
+
+def nearest_neighbour(matrix: list) -> list:
+    """
+    Жадібний порядок: щоразу найближча ще не відвідана точка.
+    """
+    n = len(matrix)
+    remaining = set(range(1, n - 1))
+    order = [0]
+    while remaining:
+        row = matrix[order[-1]]
+        nxt = min(remaining, key=lambda j: (row[j], j))
+        order.append(nxt)
+        remaining.remove(nxt)
+    if n > 1:
+        order.append(n - 1)
+    return order
+
+
+def two_opt(matrix: list, order: list) -> bool:
+    """
+    Одне покращення 2-opt (розворот відрізка) з урахуванням несиметричних вартостей;
+    змінює order на місці. Повертає True, якщо порядок покращився.
+    """
+    n = len(order)
+    # Префіксні суми вартостей уздовж порядку і проти нього: розворот оцінюється за O(1)
+    forward = [0.0] * n
+    backward = [0.0] * n
+    for p in range(1, n):
+        forward[p] = forward[p - 1] + matrix[order[p - 1]][order[p]]
+        backward[p] = backward[p - 1] + matrix[order[p]][order[p - 1]]
+
+    for i in range(1, n - 2):
+        before, first = order[i - 1], order[i]
+        for j in range(i + 1, n - 1):
+            last, after = order[j], order[j + 1]
+            delta = (matrix[before][last] + matrix[first][after] + backward[j] - backward[i]
+                     - matrix[before][first] - matrix[last][after] - (forward[j] - forward[i]))
+            if delta < -_IMPROVEMENT_EPS:
+                order[i:j + 1] = order[i:j + 1][::-1]
+                return True
+    return False
+
+
+def or_opt(matrix: list, order: list, max_segment: int = 3) -> bool:
+    """
+    Одне покращення Or-opt: перенесення відрізка з 1..max_segment точок в інше місце
+    (без розвороту); змінює order на місці. Повертає True, якщо порядок покращився.
+    """
+    n = len(order)
+    for length in range(1, max_segment + 1):
+        for i in range(1, n - length):
+            first, last = order[i], order[i + length - 1]
+            before, after = order[i - 1], order[i + length]
+            removed = matrix[before][after] - matrix[before][first] - matrix[last][after]
+            for p in range(n - 1):
+                if i - 1 <= p < i + length:
+                    continue
+                a, b = order[p], order[p + 1]
+                delta = removed + matrix[a][first] + matrix[last][b] - matrix[a][b]
+                if delta < -_IMPROVEMENT_EPS:
+                    segment = order[i:i + length]
+                    rest = order[:i] + order[i + length:]
+                    position = p + 1 if p < i else p + 1 - length
+                    order[:] = rest[:position] + segment + rest[position:]
+                    return True
+    return False
+
+
+def solve_path(matrix: list, exact_max_stops: int = EXACT_MAX_STOPS) -> list:
+    """
+    Порядок відвідування точок від 0 до n-1 через усі проміжні.
+    До exact_max_stops проміжних точок — точний розв'язок, далі — найближчий сусід
+    з покращеннями 2-opt і Or-opt до локального оптимуму.
+    """
+    matrix = _finite(matrix)
+    if len(matrix) - 2 <= exact_max_stops:
+        return held_karp(matrix)
+
+    order = nearest_neighbour(matrix)
+    while two_opt(matrix, order) or or_opt(matrix, order):
+        pass
+    return order
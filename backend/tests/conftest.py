@@ -0,0 +1,105 @@
+import os
+import sys
+import random
+import networkx as nx
+import pytest
+from shapely.geometry import LineString
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.geo import haversine_point_m
+from services.graph_snapshot import compile_snapshot
+from services.graph_service import GRAPHML_DIR, GRAPHML_FILENAME, snapshot_path_for
+from services import contraction, landmarks
+from services.graph_registry import registry, get_snapshot
+
+# Тестовий граф — сітка GRID × GRID перехресть біля центру Києва
+GRID = 12
+STEP = 0.004
+ORIGIN = (30.50, 50.44)
+HIGHWAYS = ["primary", "secondary", "tertiary", "residential", "service", "motorway"]
+FIXTURE_LANDMARKS = 6
+
+
+def build_grid_graph(seed: int = 7) -> nx.MultiDiGraph:
+    """
+    Сітка з різними класами доріг, вигинами, односторонніми вулицями та паралельними
+    ребрами (швидша об'їзна поруч із коротшою вулицею), тож пальне, довжина і час
+    обирають різні шляхи.
+    """
+    rng = random.Random(seed)
+    G = nx.MultiDiGraph(crs="epsg:4326")
+
+    def node(i, j):
+        return 1000 + i * GRID + j
+
+    for i in range(GRID):
+        for j in range(GRID):
+            G.add_node(node(i, j), x=ORIGIN[0] + j * STEP + rng.uniform(-0.0004, 0.0004),
+                       y=ORIGIN[1] + i * STEP + rng.uniform(-0.0004, 0.0004))
+
+    for i in range(GRID):
+        for j in range(GRID):
+            for di, dj in ((0, 1), (1, 0)):
+                a, b = i + di, j + dj
+                if a >= GRID or b >= GRID or rng.random() < 0.05:
+                    continue
+                u, v = node(i, j), node(a, b)
+                xu, yu = G.nodes[u]["x"], G.nodes[u]["y"]
+                xv, yv = G.nodes[v]["x"], G.nodes[v]["y"]
+                length = haversine_point_m(xu, yu, xv, yv) * rng.uniform(1.0, 1.3)
+                data = {
+                    "highway": HIGHWAYS[(i // 3 + j // 4) % len(HIGHWAYS)],
+                    "name": f"вулиця {i if di == 0 else GRID + j}",
+                    "poi_count": rng.choice([0, 0, 0, 1, 2, 5]),
+                }
+                directions = [(u, v)] if rng.random() < 0.1 else [(u, v), (v, u)]
+                for p, q in directions:
+                    G.add_edge(p, q, length=length, **data)
+                    if rng.random() < 0.15:
+                        xp, yp, xq, yq = G.nodes[p]["x"], G.nodes[p]["y"], G.nodes[q]["x"], G.nodes[q]["y"]
+                        bend = ((xp + xq) / 2 + 0.0006, (yp + yq) / 2 + 0.0006)
+                        G.add_edge(p, q, length=length * 1.4, highway="motorway", name="об'їзна",
+                                   poi_count=0, geometry=LineString([(xp, yp), bend, (xq, yq)]))
+    return G
+
+
+@pytest.fixture(scope="session")
+def graph_dir(tmp_path_factory):
+    """
+    Каталог із тестовим знімком на місці data/kyiv_with_poi.snapshot, ієрархіями CH
+    та орієнтирами ALT; поточний каталог змінюється на нього, тож реєстр графів
+    і маршрутизатори працюють із тестовим графом.
+    """
+    root = tmp_path_factory.mktemp("graph")
+    path = snapshot_path_for(os.path.join(root, GRAPHML_DIR, GRAPHML_FILENAME))
+    compile_snapshot(build_grid_graph()).save(path)
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.chdir(root)
+        registry.clear()
+        contraction.build_all()
+        landmarks.build_all(FIXTURE_LANDMARKS)
+        registry.clear()
+        yield root
+        registry.clear()
+
+
+@pytest.fixture(scope="session")
+def snapshot(graph_dir):
+    return get_snapshot()
+
+
+@pytest.fixture(scope="session")
+def node_pairs(snapshot):
+    """Пари вузлів (старт, фініш) з детермінованої вибірки, включно з кутами сітки."""
+    rng = random.Random(11)
+    n = snapshot.num_nodes
+    pairs = [(0, n - 1), (n - 1, 0), (GRID - 1, n - GRID)]
+    pairs += [tuple(rng.sample(range(n), 2)) for _ in range(25)]
+    return pairs
+
+
+def coords(snapshot, node: int) -> tuple:
+    """(lat, lon) вузла знімка — аргументи find_route."""
+    return float(snapshot.node_y[node]), float(snapshot.node_x[node])
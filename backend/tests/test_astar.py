@@ -0,0 +1,44 @@
+import math
+import pytest
+from services.graph_registry import get_engine
+from services.landmarks import LANDMARK_METRICS
+from services.routers.astar_fuel_router import AStarFuelRouter
+
+TOLERANCE = 1e-9
+
+
+def path_cost(weights, edges):
+    return sum(weights[e] for e in edges)
+
+
+@pytest.mark.parametrize("bidirectional", [True, False])
+@pytest.mark.parametrize("use_landmarks", [True, False])
+@pytest.mark.parametrize("metric", LANDMARK_METRICS)
+def test_astar_is_optimal(snapshot, node_pairs, metric, use_landmarks, bidirectional):
+    router = AStarFuelRouter("", "", 0, avg_consumption=9.0, bidirectional=bidirectional,
+                             use_landmarks=use_landmarks)
+    assert (router.landmarks is not None) == use_landmarks
+    weights = router.metric_weights(metric)
+    engine = get_engine()
+    for source, target in node_pairs:
+        _, expected = engine.dijkstra(source, target, weights)
+        nodes, edges = router._astar_search(source, target, metric)
+        assert bool(edges) == bool(expected)
+        if expected:
+            assert nodes[0] == source and nodes[-1] == target
+            assert math.isclose(path_cost(weights, edges), path_cost(weights, expected), rel_tol=TOLERANCE)
+
+
+@pytest.mark.parametrize("metric", LANDMARK_METRICS)
+def test_heuristic_bounds_are_admissible(snapshot, node_pairs, metric):
+    router = AStarFuelRouter("", "", 0, avg_consumption=9.0)
+    weights = router.metric_weights(metric)
+    engine = get_engine()
+    for source, target in node_pairs[:5]:
+        from_source = engine.shortest_distances(source, weights)
+        to_target = engine.shortest_distances(target, weights, reverse=True)
+        from_start, to_goal = router._heuristic(source, target, metric)
+        for node in range(snapshot.num_nodes):
+            assert from_start(node) <= from_source[node] * (1 + TOLERANCE) + TOLERANCE
+            assert to_goal(node) <= to_target[node] * (1 + TOLERANCE) + TOLERANCE
+        assert to_goal(target) == 0.0 and from_start(source) == 0.0
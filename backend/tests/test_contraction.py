@@ -0,0 +1,48 @@
+import math
+import pytest
+from conftest import coords
+from services.contraction import CH_METRICS
+from services.graph_registry import get_engine, get_hierarchy, get_edge_weights
+from services.routers.ch_router import CHRouter
+from services.routers.dijkstra_router import DijkstraFuelRouter
+from services.routing_core import INF
+
+
+def path_cost(weights, edges):
+    return sum(weights[e] for e in edges)
+
+
+@pytest.mark.parametrize("metric", CH_METRICS)
+def test_query_matches_dijkstra(snapshot, node_pairs, metric):
+    ch = get_hierarchy(metric)
+    assert ch is not None and ch.matches(snapshot)
+    engine = get_engine()
+    weights = get_edge_weights().profile(1.0)[metric]
+    for source, target in node_pairs:
+        _, expected = engine.dijkstra(source, target, weights)
+        cost, edges = ch.query(source, target)
+        if not expected:
+            assert cost == INF and edges == []
+            continue
+        assert math.isclose(cost, path_cost(weights, expected), rel_tol=1e-9)
+        # Розпаковані shortcut-и — неперервний шлях оригінальних ребер із тією самою вартістю
+        assert engine.sources[edges[0]] == source and engine.targets[edges[-1]] == target
+        for a, b in zip(edges, edges[1:]):
+            assert engine.targets[a] == engine.sources[b]
+        assert math.isclose(path_cost(weights, edges), cost, rel_tol=1e-9)
+
+
+def test_same_node(snapshot):
+    assert get_hierarchy("fuel_weight").query(5, 5) == (0.0, [])
+
+
+def test_router_matches_dijkstra_router(snapshot, node_pairs):
+    ch_router = CHRouter("", "", 0, avg_consumption=7.5)
+    dijkstra_router = DijkstraFuelRouter("", "", 0, avg_consumption=7.5)
+    for source, target in node_pairs[:10]:
+        args = coords(snapshot, source) + coords(snapshot, target)
+        _, _, fuel, _ = ch_router.find_route(*args, "fuel_weight")
+        _, _, expected_fuel, _ = dijkstra_router.find_route(*args, "fuel_weight")
+        assert math.isclose(fuel, expected_fuel, rel_tol=1e-9)
+        weights = ch_router.metric_weights("fuel_weight")
+        assert math.isclose(path_cost(weights, ch_router.route_edges), fuel, rel_tol=1e-9)
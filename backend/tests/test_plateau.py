@@ -0,0 +1,48 @@
+import math
+from conftest import coords
+from services.graph_registry import get_engine
+from services.route_pipeline import build_routes
+from services.routers.plateau_router import PlateauRouter
+
+
+def path_cost(weights, edges):
+    return sum(weights[e] for e in edges)
+
+
+def test_routes_are_distinct_and_first_is_optimal(snapshot, node_pairs):
+    router = PlateauRouter("", "", 0, avg_consumption=8.0, max_alternatives=3)
+    weights = router.metric_weights("fuel_weight")
+    engine = get_engine()
+    found_alternatives = 0
+    for source, target in node_pairs:
+        _, expected = engine.dijkstra(source, target, weights)
+        routes = router.plateau_search(source, target, weights)
+        if not expected:
+            assert routes == []
+            continue
+        best = path_cost(weights, expected)
+        assert math.isclose(path_cost(weights, routes[0]), best, rel_tol=1e-9)
+        assert len(routes) <= router.max_alternatives + 1
+        assert len({tuple(edges) for edges in routes}) == len(routes)
+        for edges in routes:
+            nodes = [source] + [engine.targets[e] for e in edges]
+            assert engine.sources[edges[0]] == source and nodes[-1] == target
+            assert all(engine.targets[a] == engine.sources[b] for a, b in zip(edges, edges[1:]))
+            assert len(set(nodes)) == len(nodes)
+            assert path_cost(weights, edges) <= best * router.stretch * (1 + 1e-9)
+        found_alternatives += len(routes) - 1
+    assert found_alternatives > 0
+
+
+def test_plateau_runs_only_when_alternatives_requested(snapshot):
+    start, end = coords(snapshot, 0), coords(snapshot, snapshot.num_nodes - 1)
+    args = ("", "", 0, 8.0, "fuel_weight", [start[1], start[0]], [end[1], end[0]])
+
+    best, alternatives = build_routes(*args)
+    assert best["name"] == "ch" and alternatives == []
+
+    best, alternatives = build_routes(*args, alternatives=3)
+    assert best["name"] == "plateau"
+    assert 0 < len(alternatives) <= 2
+    assert all(alt["nodes"] != best["route_nodes"] for alt in alternatives)
+    assert all(len(alt["edges"]) == len(alt["nodes"]) - 1 for alt in alternatives)
@@ -0,0 +1,29 @@
+import random
+import numpy as np
+import pytest
+from services.route_geometry import decode_polyline, encode_polyline
+
+# Приклад із документації формату Google Encoded Polyline ([lon, lat])
+REFERENCE = [[-120.2, 38.5], [-120.95, 40.7], [-126.453, 43.252]]
+REFERENCE_ENCODED = "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+
+
+def test_reference_example():
+    assert encode_polyline(REFERENCE) == REFERENCE_ENCODED
+    assert np.allclose(decode_polyline(REFERENCE_ENCODED), REFERENCE)
+
+
+@pytest.mark.parametrize("precision", [5, 6])
+def test_round_trip(precision):
+    rng = random.Random(precision)
+    coords = [[rng.uniform(30.2, 30.8), rng.uniform(50.2, 50.6)] for _ in range(200)]
+    coords.append(coords[-1])
+    decoded = decode_polyline(encode_polyline(coords, precision), precision)
+    assert len(decoded) == len(coords)
+    assert np.abs(np.asarray(decoded) - np.asarray(coords)).max() <= 0.5 / 10 ** precision + 1e-12
+
+
+def test_empty_and_unsupported_precision():
+    assert encode_polyline([]) == ""
+    with pytest.raises(ValueError):
+        encode_polyline(REFERENCE, precision=7)
@@ -0,0 +1,29 @@
+import math
+import numpy as np
+from conftest import coords
+from services.instruction_service import InstructionGenerator
+from services.route_geometry import path_coordinates, path_edges
+from services.routers.dijkstra_router import DijkstraFuelRouter
+
+
+def test_router_edges_keep_the_chosen_parallel_edge(snapshot, node_pairs):
+    router = DijkstraFuelRouter("", "", 0, avg_consumption=8.0)
+    length = np.asarray(snapshot.length)
+    checked = 0
+    for source, target in node_pairs:
+        path, distance_km, *_ = router.find_route(*coords(snapshot, source), *coords(snapshot, target),
+                                                  "duration_weight")
+        if not path:
+            continue
+        edges = router.route_edges
+        nodes = [snapshot.index_of(n) for n in path]
+        shortest = path_edges(snapshot, nodes).tolist()
+        if shortest == edges:
+            continue
+        # Швидша об'їзна довша за паралельну вулицю: кроки й геометрія мають іти нею
+        steps = InstructionGenerator.steps(snapshot, path, edges=edges)
+        assert math.isclose(sum(s["distance_m"] for s in steps), distance_km * 1000, rel_tol=1e-3)
+        assert math.isclose(length[edges].sum(), distance_km * 1000, rel_tol=1e-9)
+        assert len(path_coordinates(snapshot, path, edges=edges)) > len(path_coordinates(snapshot, path))
+        checked += 1
+    assert checked > 0
@@ -0,0 +1,96 @@
+import math
+import pytest
+from conftest import coords
+from services.graph_registry import get_edge_weights
+from services.routers.ant_colony_router import AntColonyRouter
+from services.traffic_overlay import INF, TrafficOverlay
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def overlay(snapshot, clock):
+    return TrafficOverlay(snapshot, clock=clock)
+
+
+def test_updates_bump_version_and_expire(overlay, clock):
+    assert overlay.view().version == 0
+    result = overlay.apply([{"edge": 3, "factor": 2.0, "ttl": 60}, {"edge": -1, "factor": 2.0}])
+    assert result["version"] == 1 and result["applied"] == 1
+    assert [r["index"] for r in result["rejected"]] == [1]
+
+    view = overlay.view()
+    assert view.version == 1 and view.affects("duration_weight") and not view.affects("fuel_weight")
+
+    clock.now += 61
+    expired = overlay.view()
+    assert expired.version == 2 and not expired.active
+    # Без змін версія не росте
+    assert overlay.view() is expired
+
+
+def test_slowdown_and_closure(overlay):
+    duration = get_edge_weights().profile(8.0)["duration_weight"]
+    fuel = get_edge_weights().profile(8.0)["fuel_weight"]
+    overlay.apply([{"edge": 3, "factor": 2.0}, {"edge": 5, "closed": True}])
+    view = overlay.view()
+
+    patched = view.patch("duration_weight", duration, "duration_weight")
+    assert math.isclose(patched[3], duration[3] * 2.0) and patched[5] == INF
+    assert patched[4] == duration[4]
+    patched_fuel = view.patch("fuel_weight@8.0", fuel, "fuel_weight")
+    assert patched_fuel[3] == fuel[3] and patched_fuel[5] == INF
+    # Базові колонки не змінюються, а повторний запит того самого стану не копіює колонку
+    assert duration[5] != INF
+    assert view.patch("duration_weight", duration, "duration_weight") is patched
+
+
+def test_views_are_copy_on_write(overlay):
+    duration = get_edge_weights().profile(8.0)["duration_weight"]
+    overlay.apply([{"edge": 3, "factor": 2.0}])
+    old = overlay.view()
+    old_values = old.patch("duration_weight", duration, "duration_weight")
+
+    overlay.apply([{"edge": 3, "clear": True}, {"edge": 7, "factor": 3.0}])
+    new = overlay.view()
+    new_values = new.patch("duration_weight", duration, "duration_weight")
+
+    assert new_values is not old_values
+    assert math.isclose(old_values[3], duration[3] * 2.0) and old_values[7] == duration[7]
+    assert new_values[3] == duration[3] and math.isclose(new_values[7], duration[7] * 3.0)
+    # Стара версія, запитана після нової, будується з бази, а не з новішої копії
+    assert old.patch("duration_weight", duration, "duration_weight") is old_values
+
+
+def test_ant_colony_smoke(snapshot, overlay):
+    start, end = coords(snapshot, 0), coords(snapshot, snapshot.num_nodes - 1)
+    routes = []
+    for _ in range(2):
+        router = AntColonyRouter("", "", 0, avg_consumption=8.0, num_ants=8, num_iterations=5, workers=1)
+        path, distance, fuel, duration = router.find_route(*start, *end)
+        assert path[0] == int(snapshot.node_osmid[0]) and path[-1] == int(snapshot.node_osmid[-1])
+        assert distance > 0 and fuel > 0 and duration > 0
+        edges = router.route_edges
+        assert all(router.engine.targets[a] == router.engine.sources[b] for a, b in zip(edges, edges[1:]))
+        routes.append(path)
+    # З однаковим seed результат відтворюваний
+    assert routes[0] == routes[1]
+
+    # Перекрите ребро оверлею колонія не використовує
+    closed = router.route_edges[0]
+    overlay.apply([{"edge": closed, "closed": True}])
+    router = AntColonyRouter("", "", 0, avg_consumption=8.0, num_ants=8, num_iterations=5, workers=1,
+                             traffic=overlay.view())
+    path, *_ = router.find_route(*start, *end)
+    assert path and closed not in router.route_edges
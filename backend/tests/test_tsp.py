@@ -0,0 +1,70 @@
+import math
+import random
+from itertools import permutations
+import pytest
+from services.tsp import INF, UNREACHABLE_COST, nearest_neighbour, path_cost, solve_path, two_opt
+
+
+def random_matrix(n: int, rng: random.Random) -> list:
+    """Несиметрична матриця вартостей із нулями на діагоналі."""
+    return [[0.0 if i == j else rng.uniform(1.0, 100.0) for j in range(n)] for i in range(n)]
+
+
+def brute_force(matrix: list) -> float:
+    n = len(matrix)
+    return min(path_cost(matrix, [0, *middle, n - 1]) for middle in permutations(range(1, n - 1)))
+
+
+def is_path_order(order: list, n: int) -> bool:
+    return order[0] == 0 and order[-1] == n - 1 and sorted(order) == list(range(n))
+
+
+@pytest.mark.parametrize("stops", range(0, 8))
+def test_exact_matches_brute_force(stops):
+    rng = random.Random(stops)
+    for _ in range(5):
+        matrix = random_matrix(stops + 2, rng)
+        order = solve_path(matrix)
+        assert is_path_order(order, len(matrix))
+        assert math.isclose(path_cost(matrix, order), brute_force(matrix), rel_tol=1e-12)
+
+
+@pytest.mark.parametrize("stops", range(2, 8))
+def test_local_search_is_valid_and_never_worse_than_greedy(stops):
+    rng = random.Random(100 + stops)
+    for _ in range(5):
+        matrix = random_matrix(stops + 2, rng)
+        order = solve_path(matrix, exact_max_stops=0)
+        assert is_path_order(order, len(matrix))
+        cost = path_cost(matrix, order)
+        assert brute_force(matrix) <= cost + 1e-9
+        assert cost <= path_cost(matrix, nearest_neighbour(matrix)) + 1e-9
+        # Локальний оптимум: жоден розворот відрізка не дешевший
+        for i in range(1, len(order) - 2):
+            for j in range(i + 1, len(order) - 1):
+                reversed_order = order[:i] + order[i:j + 1][::-1] + order[j + 1:]
+                assert path_cost(matrix, reversed_order) >= cost - 1e-9
+
+
+def test_two_opt_improves_the_recomputed_cost():
+    rng = random.Random(5)
+    for _ in range(20):
+        matrix = random_matrix(9, rng)
+        order = nearest_neighbour(matrix)
+        before = path_cost(matrix, order)
+        if two_opt(matrix, order):
+            assert path_cost(matrix, order) < before
+            assert is_path_order(order, len(matrix))
+
+
+def test_unreachable_pairs_are_avoided():
+    matrix = [
+        [0, 1, INF, 9],
+        [INF, 0, 1, INF],
+        [INF, INF, 0, 1],
+        [INF, INF, INF, 0],
+    ]
+    for exact_max_stops in (10, 0):
+        order = solve_path(matrix, exact_max_stops)
+        assert order == [0, 1, 2, 3]
+        assert path_cost(matrix, order) < UNREACHABLE_COST